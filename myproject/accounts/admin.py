@@ -1,3 +1,103 @@
+# accounts/admin.py
+"""
+Support views of the ledger tables. Built for tens of millions of rows:
+users are picked by id or exact username (no <select> of every user, no
+LIKE scans), page counts are estimated (accounts/paginators.py), the default
+ordering is the primary key, and the date hierarchy is built from the first
+and last date (see CalendarQuerySet).
+"""
+from datetime import date, datetime, time, timedelta
+
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+from .models import Income, CashEntry
+from .paginators import EstimatedCountPaginator
+
+CALENDAR_KINDS = ("year", "month", "day")
+
+
+class CalendarQuerySet(models.QuerySet):
+    """
+    dates()/datetimes() list every year, month or day between the first and
+    the last row. That takes two indexed ORDER BY ... LIMIT 1 lookups instead of
+    a SELECT DISTINCT over all matching rows. Periods without rows are listed too.
+    Only the admin date hierarchy should rely on this.
+    """
+
+    def _calendar(self, field_name, kind, order):
+        ordered = self.order_by(field_name).values_list(field_name, flat=True)
+        first, last = ordered.first(), ordered.reverse().first()
+        if first is None:
+            return []
+        is_datetime = isinstance(first, datetime)
+        aware = is_datetime and timezone.is_aware(first)
+        if is_datetime:
+            first, last = (timezone.localtime(v).date() if aware else v.date() for v in (first, last))
+        day = date(first.year, first.month if kind != "year" else 1, first.day if kind == "day" else 1)
+        starts = []
+        while day <= last:
+            starts.append(day)
+            if kind == "year":
+                day = date(day.year + 1, 1, 1)
+            elif kind == "month":
+                day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            else:
+                day += timedelta(days=1)
+        if is_datetime:
+            starts = [datetime.combine(d, time.min) for d in starts]
+            if aware:
+                starts = [timezone.make_aware(d) for d in starts]
+        return starts[::-1] if order == "DESC" else starts
+
+    def dates(self, field_name, kind, order="ASC"):
+        if kind not in CALENDAR_KINDS:
+            return super().dates(field_name, kind, order)
+        return self._calendar(field_name, kind, order)
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None):
+        if kind not in CALENDAR_KINDS or tzinfo is not None:
+            return super().datetimes(field_name, kind, order, tzinfo)
+        return self._calendar(field_name, kind, order)
+
+
+class SupportAdmin(admin.ModelAdmin):
+    """Base for the support views of per-user tables with many rows."""
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username",)  # see get_search_results
+    search_help_text = "Exact username"
+    ordering = ("-id",)  # newest first without sorting the table; click a column to sort by it
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        """Exact username, resolved to the user id first so the (user, ...) indexes are used; no LIKE scans."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        user_id = User.objects.filter(username=term).values_list("id", flat=True).first()
+        return (queryset.filter(user_id=user_id) if user_id else queryset.none()), False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.date_hierarchy:
+            qs = CalendarQuerySet(qs.model, query=qs.query.chain(), using=qs._db)
+        return qs
+
+
+@admin.register(Income)
+class IncomeAdmin(SupportAdmin):
+    list_display = ("id", "user", "amount", "date", "income_type")
+    list_filter = ("income_type",)
+    date_hierarchy = "date"
+
 
-# Register your models here.
+@admin.register(CashEntry)
+class CashEntryAdmin(SupportAdmin):
+    list_display = ("id", "user", "description", "amount", "is_income", "category", "date")
+    list_filter = ("is_income", "category")
+    date_hierarchy = "date"
@@ -0,0 +1,84 @@
+# accounts/fields.py
+"""
+Money is stored as integer minor units (cents) in a BIGINT column.
+
+On model instances a MoneyField reads as a 2-place Decimal, so forms, templates
+and admin keep working in currency units. Aggregations should use SumCents,
+which returns the raw integer SUM, and stay in integer cents until the value is
+serialized (as_units).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+
+CENT = Decimal("0.01")
+
+
+def parse_amount(value):
+    """User input (str/int/float/Decimal) -> Decimal with 2 places. Raises ValueError."""
+    try:
+        return Decimal(str(value).strip()).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"invalid amount: {value!r}")
+
+
+def to_cents(value):
+    """Currency units -> integer cents (None passes through)."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        return int(round(value * 100))
+    return int((Decimal(value) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Integer cents -> Decimal currency units."""
+    if cents is None:
+        return None
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def as_units(cents):
+    """Integer (or averaged float) cents -> float units, for JSON/display only."""
+    return round(float(cents or 0) / 100, 2)
+
+
+class MoneyField(models.BigIntegerField):
+    description = "Monetary amount stored as integer cents"
+
+    def from_db_value(self, value, expression, connection):
+        return from_cents(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return parse_amount(value)
+        except ValueError:
+            raise exceptions.ValidationError(self.error_messages["invalid"], code="invalid", params={"value": value})
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        return to_cents(value)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{"form_class": forms.DecimalField, "decimal_places": 2,
+                                               "max_digits": 17, **kwargs})
+
+
+# IntegerField rounds float bounds for gte/lt before get_prep_value; amounts must not be rounded
+MoneyField.register_lookup(GreaterThanOrEqual)
+MoneyField.register_lookup(LessThan)
+
+
+class SumCents(models.Sum):
+    """SUM over a MoneyField returned as raw integer cents (no Decimal conversion)."""
+
+    def __init__(self, expression, **extra):
+        extra.setdefault("output_field", models.BigIntegerField())
+        super().__init__(expression, **extra)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:28
+
+import accounts.fields
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+FIELDS = {"Income": ["amount"], "CashEntry": ["amount"]}
+
+
+def scale(factor):
+    # runs while the columns are still REAL (forwards) / again REAL (backwards)
+    def apply(apps, schema_editor):
+        for model_name, fields in FIELDS.items():
+            model = apps.get_model("accounts", model_name)
+            if factor > 1:
+                model.objects.update(**{f: Round(F(f) * factor) for f in fields})
+            else:
+                model.objects.update(**{f: F(f) * factor for f in fields})
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(scale(100), scale(0.01)),
+        migrations.AlterField(
+            model_name='cashentry',
+            name='amount',
+            field=accounts.fields.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='amount',
+            field=accounts.fields.MoneyField(),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_money_cents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashentry',
+            name='category',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Uncategorized'), (1, 'Groceries'), (2, 'Transport'), (3, 'Eating out & coffee'), (4, 'Bills & utilities'), (5, 'Shopping'), (6, 'Health'), (7, 'Rent & housing'), (8, 'Entertainment'), (9, 'Education'), (10, 'Income')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='cashentry',
+            index=models.Index(fields=['user', 'category', 'date'], name='cashentry_user_category_date'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_cashentry_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashentry',
+            index=models.Index(fields=['user', 'date'], name='cashentry_user_date'),
+        ),
+        migrations.AddIndex(
+            model_name='cashentry',
+            index=models.Index(fields=['date'], name='cashentry_date'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', 'date'], name='income_user_date'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['date'], name='income_date'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .fields import MoneyField
+
 class Income(models.Model):
     TYPE_CHOICES = (
         ('business', 'Business'),
@@ -8,19 +10,49 @@ class Income(models.Model):
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    amount = models.FloatField()
+    amount = MoneyField()
     date = models.DateField()
     income_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
 
+    class Meta:
+        indexes = [
+            # a user's entries by date, and the admin date hierarchy
+            models.Index(fields=['user', 'date'], name='income_user_date'),
+            models.Index(fields=['date'], name='income_date'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} on {self.date}"
 
+class Category(models.IntegerChoices):
+    # normalized CashEntry category, assigned by coach.categorize from the description
+    UNCATEGORIZED = 0, 'Uncategorized'
+    GROCERIES = 1, 'Groceries'
+    TRANSPORT = 2, 'Transport'
+    DINING = 3, 'Eating out & coffee'
+    BILLS = 4, 'Bills & utilities'
+    SHOPPING = 5, 'Shopping'
+    HEALTH = 6, 'Health'
+    HOUSING = 7, 'Rent & housing'
+    ENTERTAINMENT = 8, 'Entertainment'
+    EDUCATION = 9, 'Education'
+    INCOME = 10, 'Income'
+
 class CashEntry(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     description = models.CharField(max_length=255)
-    amount = models.FloatField()
+    amount = MoneyField()
     date = models.DateField()
     is_income = models.BooleanField(default=True)  # True = income, False = expense
+    category = models.PositiveSmallIntegerField(choices=Category.choices, default=Category.UNCATEGORIZED)
+
+    class Meta:
+        indexes = [
+            # per-category totals over a date window
+            models.Index(fields=['user', 'category', 'date'], name='cashentry_user_category_date'),
+            models.Index(fields=['user', 'date'], name='cashentry_user_date'),
+            models.Index(fields=['date'], name='cashentry_date'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.amount}"
@@ -0,0 +1,59 @@
+# accounts/paginators.py
+"""
+Paginator for admin changelists over very large tables.
+
+A changelist page is one indexed LIMIT/OFFSET query. The slow part is the
+COUNT(*) that Django runs to number the pages, which scans the whole table
+(or the whole filtered set). EstimatedCountPaginator counts differently:
+
+  - an unfiltered queryset uses the database's own estimate
+    (pg_class.reltuples on PostgreSQL, information_schema on MySQL) or the
+    primary key range elsewhere. Both are index or catalog lookups, and only
+    small tables get an exact count;
+  - a filtered queryset is counted exactly, but only up to COUNT_LIMIT rows.
+    Past that, pagination stops at the limit; narrow the filter to go deeper.
+
+Use it together with show_full_result_count = False.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+EXACT_BELOW = 10_000
+COUNT_LIMIT = 10_000
+
+
+def estimated_table_rows(model, using):
+    """Approximate row count of the model's table, or None if the backend has no cheap estimate."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None  # -1: never analyzed
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_below = EXACT_BELOW
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not hasattr(qs, "query"):
+            return super().count
+        if not qs.query.where and not qs.query.distinct:
+            estimate = estimated_table_rows(qs.model, qs.db)
+            if estimate is None:  # SQLite etc.: the primary key range, two index lookups
+                pks = qs.model._default_manager.using(qs.db).order_by("pk").values_list("pk", flat=True)
+                lo, hi = pks.first(), pks.reverse().first()
+                estimate = hi - lo + 1 if isinstance(hi, int) else 0
+            if estimate >= self.exact_below:
+                return estimate
+        return qs.order_by()[:self.count_limit].count()
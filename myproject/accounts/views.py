@@ -3,10 +3,14 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.db.models import Avg
 from .forms import SignupForm, LoginForm, IncomeForm, CashEntryForm
+from .fields import SumCents, as_units
 from .models import Income, CashEntry
+from coach.models import CoachingSettings
 import datetime
-from django.db.models import Sum
+from django.db.models import Q
 from datetime import date, timedelta
+from coach.metrics import query_budget
+from coach.throttle import bad_parameter, bounded_int, coalesce, request_key, throttle
 
 # ------------------------------
 # USER AUTH
@@ -19,6 +23,7 @@ def signup_view(request):
             user = form.save(commit=False)
             user.set_password(form.cleaned_data["password"])
             user.save()
+            CoachingSettings.objects.create(user=user)
             return redirect('login')
     else:
         form = SignupForm()
@@ -82,31 +87,48 @@ def income_history_view(request):
     return render(request, 'accounts/income_history.html', {'incomes': incomes})
 
 
+@query_budget(8)
 @login_required
+@bad_parameter
+@throttle("history")
 def income_variability_view(request):
-    # ---------- STEP 1: Fetch Income + Cash entries ----------
-    incomes = Income.objects.filter(user=request.user)
-    cash_entries = CashEntry.objects.filter(user=request.user)  # includes both income and expenses
-
-    if not incomes.exists() and not cash_entries.exists():
-        return render(request, 'accounts/variability.html', {"msg": "No income or cash data available"})
+    # history window; defaults to (and is clamped to) the COACH_PARAM_BOUNDS maximum, never the full history
+    days = bounded_int(request, "days", None)
+    context = coalesce(request_key(request, "accounts.views.income_variability_view"),
+                       lambda: _income_variability(request.user.id, date.today() - timedelta(days=days)),
+                       "accounts.views.income_variability_view")
+    return render(request, 'accounts/variability.html', context)
+
+
+def _income_variability(user_id, since):
+    # ---------- STEP 1: Per-date totals in cents (one grouped query per table) ----------
+    income_by_date = dict(
+        Income.objects.filter(user_id=user_id, date__gte=since).values('date')
+        .annotate(total=SumCents('amount')).values_list('date', 'total')
+    )
+    # cash entries split by is_income flag
+    cash_by_date = {
+        row['date']: row for row in
+        CashEntry.objects.filter(user_id=user_id, date__gte=since).values('date')
+        .annotate(cash_in=SumCents('amount', filter=Q(is_income=True)),
+                  cash_out=SumCents('amount', filter=Q(is_income=False)))
+    }
+
+    if not income_by_date and not cash_by_date:
+        return {"msg": "No income or cash data available"}
 
     # ---------- STEP 2: Group by dates ----------
     # Get all unique dates from both incomes and cash entries
-    income_dates = set(incomes.values_list('date', flat=True))
-    cash_dates = set(cash_entries.values_list('date', flat=True))
-    dates = income_dates.union(cash_dates)
+    dates = set(income_by_date).union(cash_by_date)
 
     daily_totals = []
     net_values = []
 
     for d in dates:
-        # sum of Income.amount on date d
-        income_total = incomes.filter(date=d).aggregate(total=Sum('amount'))['total'] or 0
-
-        # cash entries split by is_income flag
-        cash_income_total = cash_entries.filter(date=d, is_income=True).aggregate(total=Sum('amount'))['total'] or 0
-        cash_expense_total = cash_entries.filter(date=d, is_income=False).aggregate(total=Sum('amount'))['total'] or 0
+        income_total = income_by_date.get(d) or 0
+        cash = cash_by_date.get(d, {})
+        cash_income_total = cash.get('cash_in') or 0
+        cash_expense_total = cash.get('cash_out') or 0
 
         # net total = income + cash incomes - cash expenses
         net_total = (income_total + cash_income_total) - cash_expense_total
@@ -115,10 +137,10 @@ def income_variability_view(request):
         # but its value is now the net (income minus expenses)
         daily_totals.append({
             'date': d,
-            'income_total': round(income_total, 2),
-            'cash_income_total': round(cash_income_total, 2),
-            'cash_expense_total': round(cash_expense_total, 2),
-            'total_income': round(net_total, 2),   # preserved name for backward compatibility
+            'income_total': as_units(income_total),
+            'cash_income_total': as_units(cash_income_total),
+            'cash_expense_total': as_units(cash_expense_total),
+            'total_income': as_units(net_total),   # preserved name for backward compatibility
         })
 
         net_values.append(net_total)
@@ -129,11 +151,11 @@ def income_variability_view(request):
     else:
         avg_income = 0
 
-    # ---------- STEP 4: Render result ----------
-    return render(request, 'accounts/variability.html', {
-        'avg_income': round(avg_income, 2),
+    # ---------- STEP 4: Template context ----------
+    return {
+        'avg_income': as_units(avg_income),
         'daily_totals': sorted(daily_totals, key=lambda x: x['date'], reverse=True)
-    })
+    }
 
 # ------------------------------
 # CASH ENTRY
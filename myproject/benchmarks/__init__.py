@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+"""
+Reproducible performance benchmarks for the coach and accounts hot paths.
+
+Run with `python manage.py run_benchmarks`; see coach/management/commands/run_benchmarks.py.
+Datasets are seeded into a throwaway test database, so the dev database is never touched.
+"""
@@ -0,0 +1,57 @@
+# benchmarks/datasets.py
+"""Synthetic datasets at fixed scales (users x days x ledger entries per day)."""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import Income, CashEntry
+from coach import versions
+from coach.models import AdviceCard, CoachingSettings, SavedGoal
+
+User = get_user_model()
+
+# name -> (users, days, cash entries per day)
+SCALES = {
+    "small": (5, 30, 2),
+    "medium": (20, 180, 3),
+    "large": (50, 365, 5),
+}
+
+PASSWORD = "bench-pass"
+DESCRIPTIONS = ["groceries", "transport", "coffee", "bills", "shopping", "rent", "phone"]
+
+
+def seed(users, days, entries_per_day, seed=0):
+    """Bulk-insert a deterministic dataset. Returns the created users."""
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [User(username=f"bench{i}", email=f"bench{i}@example.com", password=password) for i in range(users)])
+    created = list(User.objects.filter(username__startswith="bench").order_by("id"))
+    CoachingSettings.objects.bulk_create([CoachingSettings(user=u) for u in created])
+
+    today = date.today()
+    incomes, cash, goals, cards = [], [], [], []
+    for u in created:
+        for i in range(days):
+            d = today - timedelta(days=i)
+            base = 250 if d.weekday() < 5 else 150
+            incomes.append(Income(user=u, amount=max(20, base + rng.randint(-80, 150)), date=d,
+                                  income_type=rng.choice(["business", "personal"])))
+            for _ in range(entries_per_day):
+                is_income = rng.random() < 0.2
+                cash.append(CashEntry(user=u, description=rng.choice(DESCRIPTIONS), amount=rng.randint(5, 300),
+                                      date=d, is_income=is_income))
+        goals += [SavedGoal(user=u, name="Emergency fund", target_amount=5000, current_amount=rng.randint(0, 5000)),
+                  SavedGoal(user=u, name="Vacation", target_amount=1500, current_amount=rng.randint(0, 1500))]
+        cards += [AdviceCard(user=u, title=f"Tip {n}", body="Benchmark advice card.", tag="savings_tip",
+                             read=n % 2 == 0) for n in range(20)]
+
+    Income.objects.bulk_create(incomes, batch_size=2000)
+    CashEntry.objects.bulk_create(cash, batch_size=2000)
+    SavedGoal.objects.bulk_create(goals, batch_size=2000)
+    AdviceCard.objects.bulk_create(cards, batch_size=2000)
+    versions.bump(*(u.id for u in created), kinds=versions.KINDS)  # bulk_create sends no signals
+    return created
@@ -0,0 +1,173 @@
+# benchmarks/runner.py
+"""Time and count queries for every coach/accounts endpoint and a full agent run."""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts import urls as accounts_urls
+from coach import agent
+from coach import urls as coach_urls
+from coach import urls_ui as coach_ui_urls
+from coach.models import AdviceCard, SavedGoal
+
+from . import datasets
+
+URLCONFS = (
+    ("/", accounts_urls),
+    ("/coach/", coach_urls),
+    ("/coach/ui/", coach_ui_urls),
+)
+
+# endpoints that only accept POST: (content_type, body builder(user, goal, card))
+POST_BODIES = {
+    "/coach/goals/bulk/": ("application/json",
+                           lambda goal, card: json.dumps({"contributions": [{"goal_id": goal.id, "delta": 1}]})),
+    "/coach/ui/advice/mark-read/": (None, lambda goal, card: {"card_id": card.id}),
+}
+
+# routed but not benchmarked: path -> reason
+SKIPPED = {
+    "/coach/provision/": "POST only; creates users and hashes their passwords",
+    "/coach/stream/": "streaming response, needs an ASGI server",
+}
+
+# a status other than 2xx that is the endpoint working as intended
+EXPECTED_STATUS = {
+    "/logout/": 302,
+    "/coach/ui/advice/mark-read/": 302,  # back to the advice page
+}
+
+METRICS_TOKEN = "benchmark"  # /coach/metrics/ is read like a scraper would
+
+
+def endpoints():
+    """Every benchmarked path routed by the urlconfs (path params left as placeholders), minus SKIPPED."""
+    for prefix, module in URLCONFS:
+        for pattern in module.urlpatterns:
+            path = prefix + str(pattern.pattern)
+            if path not in SKIPPED:
+                yield path
+
+
+def status_ok(path, status):
+    return 200 <= status < 300 or status == EXPECTED_STATUS.get(path)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def _summarize(timings, queries, status):
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+        "queries": queries,
+        "status": status,
+    }
+
+
+@override_settings(COACH_METRICS_TOKEN=METRICS_TOKEN)
+def bench_endpoints(user, repeat=5, warm_cache=False):
+    """{path: timings, queries, status}; "ok" is False for an unexpected status, whose timings mean little."""
+    client = Client(headers={"authorization": f"Bearer {METRICS_TOKEN}"})
+    goal = SavedGoal.objects.filter(user=user).first()
+    card = AdviceCard.objects.filter(user=user).first()
+    results = {}
+    for path in endpoints():
+        url = path.replace("<int:pk>", str(goal.id))
+        timings = []
+        for _ in range(repeat):
+            client.force_login(user)  # logout/ and login/ drop the session
+            if not warm_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                if url in POST_BODIES:
+                    content_type, body = POST_BODIES[url]
+                    extra = {"content_type": content_type} if content_type else {}
+                    res = client.post(url, body(goal, card), **extra)
+                else:
+                    res = client.get(url)
+                timings.append(time.perf_counter() - start)
+        results[path] = _summarize(timings, len(ctx.captured_queries), res.status_code)
+        results[path]["ok"] = status_ok(path, res.status_code)
+    return results
+
+
+def bench_agent(repeat=3):
+    timings = []
+    for _ in range(repeat):
+        AdviceCard.objects.exclude(dedup_key=None).delete()
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            agent.run()
+            timings.append(time.perf_counter() - start)
+    return _summarize(timings, len(ctx.captured_queries), None)
+
+
+def run_suite(scales, repeat=5, warm_cache=False, flush=None, log=print):
+    """
+    Seed each scale, benchmark it, and return a JSON-serializable report.
+    `flush` is called before seeding each scale to start from an empty database.
+    """
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": repeat,
+            "warm_cache": warm_cache,
+            "skipped": SKIPPED,
+        },
+        "scales": {},
+    }
+    for name in scales:
+        users, days, per_day = datasets.SCALES[name]
+        if flush:
+            flush()
+        log(f"seeding {name}: {users} users x {days} days x {per_day} entries/day")
+        seeded = datasets.seed(users, days, per_day)
+        report["scales"][name] = {
+            "dataset": {"users": users, "days": days, "entries_per_day": per_day},
+            "endpoints": bench_endpoints(seeded[0], repeat, warm_cache),
+            "agent": bench_agent(max(1, repeat // 2)),
+        }
+    return report
+
+
+def compare(report, baseline, threshold=0.2):
+    """
+    Regressions vs a stored baseline report: median latency more than `threshold`
+    (fraction) slower, or any increase in query count. An endpoint that answered
+    with an unexpected status is always a problem. Returns a list of strings.
+    """
+    problems = []
+    for scale, current in report["scales"].items():
+        problems += [f"{scale} {path}: status {result['status']}"
+                     for path, result in current["endpoints"].items() if result.get("ok") is False]
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        pairs = [(f"{scale} {path}", result, base["endpoints"].get(path))
+                 for path, result in current["endpoints"].items()]
+        pairs.append((f"{scale} agent", current["agent"], base.get("agent")))
+        for label, now, then in pairs:
+            if not then:
+                continue
+            if now["median_ms"] > then["median_ms"] * (1 + threshold):
+                problems.append(f"{label}: median {then['median_ms']}ms -> {now['median_ms']}ms")
+            if now["queries"] > then["queries"]:
+                problems.append(f"{label}: queries {then['queries']} -> {now['queries']}")
+    return problems
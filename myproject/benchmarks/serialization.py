@@ -0,0 +1,59 @@
+# benchmarks/serialization.py
+"""JSON encoding throughput: JsonResponse vs coach.responses (stdlib / orjson / gzip)."""
+import gzip
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.http import JsonResponse
+
+from coach import responses
+
+TAGS = ["low_income", "high_expense", "goal", "tip"]
+
+
+def advice_rows(n):
+    """n rows shaped like AdviceCard.objects.values(...) (what advice_feed returns)."""
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": i,
+        "title": "Income is low recently",
+        "body": f"Your average income over the last 7 days is {100 + i % 300}.25, which is below your threshold.",
+        "tag": TAGS[i % len(TAGS)],
+        "created_at": now - timedelta(minutes=i),
+        "read": i % 3 == 0,
+        "meta": {"avg7": 100 + i % 300 + 0.25, "amount": Decimal(i) / 4},
+    } for i in range(n)]
+
+
+def encoders():
+    yield "JsonResponse", lambda data: JsonResponse(data).content
+    yield "stdlib", responses.dumps_stdlib
+    if responses.orjson is not None:
+        yield "orjson", responses.dumps
+    yield "dumps+gzip", lambda data: gzip.compress(responses.dumps(data), compresslevel=6, mtime=0)
+
+
+def run(sizes=(50, 500, 5000), repeat=20):
+    """{rows: {encoder: {median_ms, bytes, mb_per_s, speedup}}}; speedup is vs JsonResponse."""
+    report = {}
+    for n in sizes:
+        payload = {"cards": advice_rows(n)}
+        results = {}
+        for name, encode in encoders():
+            size = len(encode(payload))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                encode(payload)
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            results[name] = {"median_ms": round(median * 1000, 3), "bytes": size,
+                             # throughput of the uncompressed JSON produced, so rows are comparable
+                             "mb_per_s": round(len(responses.dumps(payload)) / median / 1e6, 1)}
+        base = results["JsonResponse"]["median_ms"]
+        for r in results.values():
+            r["speedup"] = round(base / r["median_ms"], 2) if r["median_ms"] else None
+        report[n] = results
+    return report
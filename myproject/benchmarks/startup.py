@@ -0,0 +1,77 @@
+# benchmarks/startup.py
+"""
+Cold-start cost of a batch process: `django.setup()` plus importing the agent,
+in a fresh interpreter per run, for the web and the batch settings.
+
+Uses `python -X importtime`; the slowest imports (cumulative) are reported so
+regressions can be traced to the module that introduced them. check() holds
+the batch settings to a time budget and to loading none of HEAVY_MODULES;
+`run_benchmarks --startup` fails when it doesn't.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SETTINGS = ("myproject.settings", "myproject.settings_agent")
+BATCH_SETTINGS = "myproject.settings_agent"
+BUDGET_MS = 1500  # median cold start allowed for BATCH_SETTINGS
+
+# never needed to run the agent; their presence means something pulls in the web stack
+HEAVY_MODULES = ("rest_framework", "django.contrib.admin", "django.contrib.staticfiles", "django_crontab.crontab")
+
+_SCRIPT = (
+    "import sys, json, django; django.setup(); from coach import agent; "
+    "print(json.dumps([m for m in {heavy!r} if m in sys.modules]))"
+)
+
+
+def cold_start(settings_module, importtime=False):
+    """(seconds, heavy modules loaded, importtime stderr) for one fresh interpreter."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-c", _SCRIPT.format(heavy=HEAVY_MODULES)]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    return elapsed, proc.stdout.strip(), proc.stderr
+
+
+def slowest_imports(importtime_output, limit=10):
+    """[(cumulative µs, module)] from `-X importtime` output, slowest first."""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def run(repeat=5, settings_modules=SETTINGS):
+    report = {}
+    for module in settings_modules:
+        times = [cold_start(module)[0] for _ in range(repeat)]
+        _, heavy, imports = cold_start(module, importtime=True)
+        report[module] = {
+            "median_ms": round(statistics.median(times) * 1000, 1),
+            "heavy_modules": heavy,
+            "slowest_imports": [{"module": m, "ms": round(us / 1000, 1)} for us, m in slowest_imports(imports)],
+        }
+    return report
+
+
+def check(report, budget_ms=BUDGET_MS, settings_module=BATCH_SETTINGS):
+    """Human-readable problems with the batch settings' cold start in a run() report (empty if none)."""
+    r = report.get(settings_module)
+    if r is None:
+        return []
+    problems = []
+    if r["median_ms"] > budget_ms:
+        problems.append(f"{settings_module}: cold start {r['median_ms']:.1f}ms over the {budget_ms}ms budget")
+    if r["heavy_modules"] != "[]":
+        problems.append(f"{settings_module}: loads {r['heavy_modules']}")
+    return problems
@@ -1,3 +1,57 @@
+# coach/admin.py
+"""
+Support views of the coach tables (see accounts/admin.py for the approach).
+Per-row figures such as goal progress and per-user goal totals are SQL
+annotations on the page's query, not model methods called once per row.
+"""
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
-# Register your models here.
+from accounts.admin import SupportAdmin
+from accounts.fields import SumCents, from_cents
+from . import goals
+from .models import AdviceCard, CoachingSettings, SavedGoal
+
+
+@admin.register(AdviceCard)
+class AdviceCardAdmin(SupportAdmin):
+    list_display = ("id", "user", "tag", "title", "read", "created_at")
+    list_filter = ("read",)
+    date_hierarchy = "created_at"
+
+
+@admin.register(SavedGoal)
+class SavedGoalAdmin(SupportAdmin):
+    list_display = ("id", "user", "name", "target_amount", "current_amount", "progress_percent", "deadline",
+                    "projected_completion")
+
+    def get_queryset(self, request):
+        return goals.with_progress(super().get_queryset(request))  # SavedGoal.progress() in SQL, sortable
+
+    @admin.display(description="progress %", ordering="progress_pct")
+    def progress_percent(self, obj):
+        return round(obj.progress_pct, 1)
+
+
+@admin.register(CoachingSettings)
+class CoachingSettingsAdmin(SupportAdmin):
+    list_display = ("id", "user", "low_income_threshold", "high_expense_ratio", "notifications_enabled",
+                    "goal_count", "saved_total")
+    list_filter = ("notifications_enabled",)
+
+    def get_queryset(self, request):
+        # correlated subqueries: evaluated for the page's rows only, no join fan-out
+        user_goals = SavedGoal.objects.filter(user_id=OuterRef("user_id")).order_by().values("user_id")
+        return super().get_queryset(request).annotate(
+            n_goals=Coalesce(Subquery(user_goals.annotate(n=Count("id")).values("n")), 0),
+            saved_cents=Coalesce(Subquery(user_goals.annotate(total=SumCents("current_amount")).values("total")), 0),
+        )
+
+    @admin.display(description="goals", ordering="n_goals")
+    def goal_count(self, obj):
+        return obj.n_goals
+
+    @admin.display(description="saved in goals", ordering="saved_cents")
+    def saved_total(self, obj):
+        return from_cents(obj.saved_cents)
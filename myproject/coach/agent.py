@@ -0,0 +1,181 @@
+# coach/agent.py
+"""
+Rule-based advice agent.
+
+Users are processed in batches: rolling aggregates for a whole batch come
+from the optional memory-mapped store (coach/aggstore.py) or from the
+columnar ledger snapshots (coach/ledger.py: cache, or one query for the
+misses), rules are evaluated in Python, and the resulting cards
+are written with one bulk_create (cards already issued inside their dedup
+window are skipped, see insert_cards()). Used by the run_coach_agent command (all
+users) and by the evaluation queue worker (just the users whose ledger changed).
+"""
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from accounts.fields import as_units, to_cents
+from . import aggstore, ledger
+from .metrics import track_queries
+from .models import AdviceCard, AgentRun, make_dedup_key, settings_for
+from .pubsub import CARD_FIELDS, publish_cards
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# one card per user + tag per window (see make_dedup_key)
+LOW_INCOME_WINDOW_DAYS = 2
+HIGH_EXPENSE_WINDOW_DAYS = 3
+
+
+def evaluate_user(user_id, settings, aggs):
+    """Apply the advice rules to one user's coach.aggstore.Aggregates. No queries."""
+    cards = []
+    # average over the last 7 days with earnings
+    if not aggs.recent_days:
+        return cards
+    avg7 = aggs.recent_sum / aggs.recent_days
+
+    # low income advice
+    if avg7 < to_cents(settings.low_income_threshold):
+        cards.append(AdviceCard(
+            user_id=user_id,
+            title="Income is low recently",
+            body=(f"Your average income over the last {aggs.recent_days} days is "
+                  f"{as_units(avg7)}, which is below your threshold of "
+                  f"{settings.low_income_threshold}. Consider reducing discretionary expenses or building a buffer."),
+            tag="low_income",
+            meta={"avg7": as_units(avg7)},
+            dedup_key=make_dedup_key(user_id, "low_income", LOW_INCOME_WINDOW_DAYS),
+        ))
+
+    # expense ratio check (30-day window)
+    total_income, total_cash_income, total_expenses = aggs.income_30, aggs.cash_in_30, aggs.cash_out_30
+    net_income = total_income + total_cash_income
+    if net_income > 0:
+        expense_ratio = total_expenses / net_income
+        if expense_ratio > settings.high_expense_ratio:
+            cards.append(AdviceCard(
+                user_id=user_id,
+                title="Your expenses are high",
+                body=(f"Your spending is {round(expense_ratio*100,1)}% of your earnings over the last 30 days. "
+                      "Try cutting non-essential spending or set a small weekly limit."),
+                tag="high_expense",
+                meta={"expense_ratio": round(expense_ratio,3)},
+                dedup_key=make_dedup_key(user_id, "high_expense", HIGH_EXPENSE_WINDOW_DAYS),
+            ))
+    return cards
+
+
+def insert_cards(cards):
+    """
+    Insert the cards in one bulk_create that skips taken dedup_keys -- the
+    unique constraint decides, there is no read before the write -- and
+    return exactly the ones this call inserted, so overlapping runs (queue
+    and sweep) never count or publish the same card. Those are found by
+    re-reading the keys: a row is ours if it has our card's created_at.
+    """
+    cards = list({c.dedup_key: c for c in reversed(cards)}.values())[::-1]  # first card per key
+    if not cards:
+        return []
+    AdviceCard.objects.bulk_create(cards, batch_size=500, ignore_conflicts=True)
+    stored = {}
+    for i in range(0, len(cards), 500):
+        stored.update((key, (pk, created_at)) for pk, key, created_at in AdviceCard.objects.filter(
+            dedup_key__in=[c.dedup_key for c in cards[i:i + 500]]).values_list("id", "dedup_key", "created_at"))
+    inserted = []
+    for card in cards:
+        pk, created_at = stored.get(card.dedup_key, (None, None))
+        if created_at == card.created_at:
+            card.pk = pk
+            inserted.append(card)
+    return inserted
+
+
+def load_aggregates(user_ids, store=None, refresh=False):
+    """
+    {user_id: Aggregates}: from the memory-mapped store where it has a current
+    record, else from ledger snapshots. `refresh` rewrites the users' store
+    records first (their ledger just changed).
+    """
+    if store is None:
+        return {uid: aggstore.from_snapshot(s) for uid, s in ledger.snapshots_for(user_ids).items()}
+    aggs = store.refresh(user_ids) if refresh else store.get_many(user_ids)
+    missing = [uid for uid in user_ids if uid not in aggs]
+    if missing:
+        aggs.update(load_aggregates(missing))
+    return aggs
+
+
+def _timed(phases, name, start):
+    phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def run(user_ids=None, batch_size=500, trigger="command"):
+    """
+    Evaluate the given users (default: everyone) and write their advice cards.
+    Each call is recorded as an AgentRun (counts, cards per rule, query count and
+    time spent in the load / evaluate / write phases).
+    Returns {"users": evaluated, "cards": created, "errors": [(username, message)], "run": AgentRun}.
+    """
+    started_at = timezone.now()
+    phases = {}
+    created = {}
+    stats = {"users": 0, "cards": 0, "errors": []}
+    skipped = 0
+
+    with track_queries() as queries:
+        t = time.perf_counter()
+        users = User.objects.order_by("id")
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+        users = list(users.values_list("id", "username"))
+        store = aggstore.get_store()
+        _timed(phases, "load", t)
+
+        for i in range(0, len(users), batch_size):
+            batch = users[i:i + batch_size]
+            ids = [uid for uid, _ in batch]
+
+            t = time.perf_counter()
+            aggs = load_aggregates(ids, store, refresh=trigger == "queue")
+            user_settings = settings_for(ids, cached=False)  # never another process's stale copy
+            _timed(phases, "load", t)
+
+            t = time.perf_counter()
+            cards = []
+            for uid, username in batch:
+                if not aggs[uid].recent_days:  # no income data
+                    skipped += 1
+                    continue
+                try:
+                    cards.extend(evaluate_user(uid, user_settings[uid], aggs[uid]))
+                    stats["users"] += 1
+                except Exception as e:
+                    logger.exception("coach agent failed for user %s", username)
+                    stats["errors"].append((username, str(e)))
+            _timed(phases, "evaluate", t)
+
+            t = time.perf_counter()
+            inserted = [{f: getattr(c, f) for f in CARD_FIELDS} for c in insert_cards(cards)]
+            for row in inserted:
+                created[row["tag"]] = created.get(row["tag"], 0) + 1
+            stats["cards"] += len(inserted)
+            publish_cards(inserted)
+            _timed(phases, "write", t)
+
+    stats["run"] = AgentRun.objects.create(
+        trigger=trigger,
+        started_at=started_at,
+        finished_at=timezone.now(),
+        users_scanned=len(users),
+        users_evaluated=stats["users"],
+        users_skipped=skipped,
+        errors=len(stats["errors"]),
+        cards_created=created,
+        query_count=queries.queries,
+        phase_timings={k: round(v, 4) for k, v in phases.items()},
+    )
+    return stats
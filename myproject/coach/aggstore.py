@@ -0,0 +1,211 @@
+# coach/aggstore.py
+"""
+Optional memory-mapped store of per-user rolling aggregates for batch jobs.
+
+COACH_AGGREGATE_STORE names a file holding one fixed-width record per user,
+at slot = user id. Any number of agent worker processes can map it and read
+a user's 30/90-day totals without copying and without a database round trip.
+The ORM stays the source of truth:
+
+  - a record is "as of" a day and is ignored once that day has passed;
+  - a record carries the user's ledger data version (coach/versions.py) and
+    is ignored once the database holds a different one;
+  - the queue worker refreshes the records of the users it is about to
+    evaluate, i.e. after every ledger change window. `manage.py
+    aggregate_store --rebuild` rewrites the whole file (run it daily) and
+    `--check` verifies records against the ORM.
+
+Users without a usable record fall back to coach.ledger snapshots. Writers
+hold an exclusive flock. Each record has a sequence counter that is odd while
+the record is being written, so readers never use a torn record.
+"""
+import fcntl
+import mmap
+import os
+import struct
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from . import ledger, versions
+
+RECENT_DAYS = 7
+
+_MAGIC = b"COACHAGG"
+_HEADER = struct.Struct("<8sII")  # magic, format version, record size
+HEADER_SIZE = 64
+_SEQ = struct.Struct("<I")
+# seq, as_of (day ordinal), recent_days, pad, ledger version, then the Aggregates in cents
+_RECORD = struct.Struct("<IIIIq7q")
+FORMAT_VERSION = 1
+
+Aggregates = namedtuple("Aggregates", "recent_days recent_sum income_30 cash_in_30 cash_out_30 "
+                                      "income_90 cash_in_90 cash_out_90")
+
+
+def from_snapshot(snapshot, today=None):
+    """Aggregates of a coach.ledger.LedgerSnapshot (the ORM-backed path)."""
+    today = today or date.today()
+    recent = snapshot.recent_earnings(RECENT_DAYS)
+    return Aggregates(len(recent), sum(recent),
+                      *snapshot.totals(today - timedelta(days=30)),
+                      *snapshot.totals(today - timedelta(days=90)))
+
+
+def _offset(user_id):
+    return HEADER_SIZE + user_id * _RECORD.size
+
+
+class AggregateStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self._mm = None
+        self._inode = None
+
+    # --------- reading ----------
+    def _reader(self):
+        """Read-only map of the current file (remapped after a rebuild replaced it or it grew)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if self._mm is None or self._inode != st.st_ino or len(self._mm) != st.st_size:
+            if self._mm is not None:
+                self._mm.close()
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = st.st_ino
+            magic, fmt, size = _HEADER.unpack_from(self._mm)
+            if magic != _MAGIC or fmt != FORMAT_VERSION or size != _RECORD.size:
+                raise ValueError(f"{self.path} is not a coach aggregate store")
+        return self._mm
+
+    def read(self, user_id):
+        """(as_of date, ledger version, Aggregates) or None for an empty/torn slot."""
+        mm = self._reader()
+        off = _offset(user_id)
+        if mm is None or off + _RECORD.size > len(mm):
+            return None
+        seq, = _SEQ.unpack_from(mm, off)
+        record = _RECORD.unpack_from(mm, off)
+        if seq % 2 or record[0] != seq or _SEQ.unpack_from(mm, off)[0] != seq or not record[1]:
+            return None
+        return date.fromordinal(record[1]), record[4], Aggregates(record[2], *record[5:])
+
+    def get_many(self, user_ids, today=None):
+        """{user_id: Aggregates} for users whose record is current; others are left out."""
+        today = today or date.today()
+        known = versions.many(user_ids, versions.LEDGER)
+        found = {}
+        for uid in user_ids:
+            entry = self.read(uid)
+            if entry is None:
+                continue
+            as_of, version, aggs = entry
+            if as_of != today or known[uid][0] != version:
+                continue
+            found[uid] = aggs
+        return found
+
+    # --------- writing ----------
+    def _lock(self):
+        """fd of the current file, exclusively locked (retries if a rebuild swapped the file meanwhile)."""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _records(self, user_ids, today):
+        """{user_id: (version, Aggregates)} computed through the ORM path."""
+        known = versions.many(user_ids, versions.LEDGER)
+        snapshots = ledger.build(user_ids)
+        return {uid: (known[uid][0], from_snapshot(snapshots[uid], today)) for uid in user_ids}
+
+    @staticmethod
+    def _write(mm, records, today):
+        as_of = today.toordinal()
+        for uid, (version, aggs) in records.items():
+            off = _offset(uid)
+            seq, = _SEQ.unpack_from(mm, off)
+            seq += seq % 2  # recover from a writer that died mid-record
+            _SEQ.pack_into(mm, off, seq + 1)
+            _RECORD.pack_into(mm, off, seq + 1, as_of, aggs.recent_days, 0, version, *aggs[1:])
+            _SEQ.pack_into(mm, off, seq + 2)
+
+    def refresh(self, user_ids, today=None):
+        """Recompute these users' records in place. Returns their Aggregates."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        today = today or date.today()
+        records = self._records(user_ids, today)
+        fd = self._lock()
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE:
+                os.pwrite(fd, _HEADER.pack(_MAGIC, FORMAT_VERSION, _RECORD.size), 0)
+                size = HEADER_SIZE
+            needed = _offset(max(user_ids) + 1)
+            if needed > size:
+                os.ftruncate(fd, needed)
+            with mmap.mmap(fd, 0) as mm:
+                self._write(mm, records, today)
+        finally:
+            os.close(fd)  # releases the lock
+        return {uid: aggs for uid, (_, aggs) in records.items()}
+
+    def rebuild(self, user_ids, batch_size=500, today=None):
+        """Write a fresh file for these users and swap it in atomically. Returns how many were written."""
+        today = today or date.today()
+        user_ids = sorted(user_ids)
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        fd = self._lock()  # no in-place refresh may land in the file being replaced
+        try:
+            with open(tmp, "wb+") as f:
+                f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, _RECORD.size))
+                f.truncate(_offset((user_ids[-1] if user_ids else 0) + 1))
+                with mmap.mmap(f.fileno(), 0) as mm:
+                    for i in range(0, len(user_ids), batch_size):
+                        self._write(mm, self._records(user_ids[i:i + batch_size], today), today)
+                    mm.flush()
+            os.replace(tmp, self.path)
+        finally:
+            os.close(fd)
+        return len(user_ids)
+
+    def check(self, user_ids, today=None):
+        """[(user_id, problem)] where the store disagrees with the ORM (or has no current record)."""
+        today = today or date.today()
+        user_ids = list(user_ids)
+        actual = {uid: from_snapshot(s, today) for uid, s in ledger.build(user_ids).items()}
+        problems = []
+        for uid in user_ids:
+            entry = self.read(uid)
+            if entry is None:
+                problems.append((uid, "missing"))
+            elif entry[0] != today:
+                problems.append((uid, f"stale (as of {entry[0]})"))
+            elif entry[2] != actual[uid]:
+                diff = [f"{f}: {a} != {b}" for f, a, b in zip(Aggregates._fields, entry[2], actual[uid]) if a != b]
+                problems.append((uid, "; ".join(diff)))
+        return problems
+
+
+_stores = {}
+
+
+def get_store():
+    """The configured AggregateStore, or None when COACH_AGGREGATE_STORE is unset."""
+    path = getattr(settings, "COACH_AGGREGATE_STORE", None)
+    if not path:
+        return None
+    path = str(path)
+    if path not in _stores:
+        _stores[path] = AggregateStore(path)
+    return _stores[path]
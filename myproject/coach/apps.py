@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoachConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'coach'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401  (connects ledger-change receivers)
+        from .metrics import install_execute_wrapper
+        connection_created.connect(install_execute_wrapper)
@@ -0,0 +1,205 @@
+# coach/categorize.py
+"""
+Cash entry categorization.
+
+normalize() folds case, whitespace and punctuation, so "Coffee", "coffee "
+and "COFFEE" are one description. classify() then assigns a Category:
+
+  1. the user's CategoryOverride for that normalized description
+  2. the longest whole-word keyword found by an Aho-Corasick automaton built
+     once from KEYWORDS (one pass over the text, however many keywords;
+     "bus" does not match inside "business")
+  3. the first REGEX_RULES pattern that matches (one compiled alternation)
+  4. Category.UNCATEGORIZED
+
+Entries are classified when saved (coach/signals.py) and in bulk by
+`manage.py categorize_entries`.
+"""
+import functools
+import re
+from collections import deque
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import Category
+
+OVERRIDES_CACHE_TIMEOUT = 3600
+
+KEYWORDS = {
+    Category.GROCERIES: ["groceries", "grocery", "grocery store", "supermarket", "vegetables", "fruits",
+                         "milk", "bread", "kirana", "provisions"],
+    Category.TRANSPORT: ["transport", "bus", "train", "metro", "taxi", "cab", "uber", "ola", "lyft", "auto",
+                         "rickshaw", "fuel", "petrol", "diesel", "parking", "toll"],
+    Category.DINING: ["coffee", "cafe", "tea", "restaurant", "restaurants", "lunch", "dinner", "breakfast",
+                      "dinner out", "takeaway", "take away", "snacks", "uber eats", "swiggy", "zomato"],
+    Category.BILLS: ["bill", "bills", "electricity", "electricity bill", "water bill", "internet", "wifi",
+                     "broadband", "phone bill", "recharge", "insurance", "gas"],
+    Category.SHOPPING: ["shopping", "clothes", "shoes", "amazon", "flipkart", "electronics", "gift", "gifts"],
+    Category.HEALTH: ["pharmacy", "doctor", "medicine", "medicines", "hospital", "clinic", "dentist", "gym"],
+    Category.HOUSING: ["rent", "house rent", "landlord", "maintenance", "repairs"],
+    Category.ENTERTAINMENT: ["movie", "movies", "cinema", "netflix", "spotify", "concert", "games"],
+    Category.EDUCATION: ["books", "tuition", "school fees", "course", "fees", "stationery"],
+    Category.INCOME: ["tips", "side job", "refund", "cashback", "bonus", "salary", "freelance"],
+}
+
+# fallback patterns for what keywords can't express (tried in order)
+REGEX_RULES = [
+    (r"\bdr [a-z]+", Category.HEALTH),                    # "dr mehta"
+    (r"\b\w+ (bill|recharge|emi)\b", Category.BILLS),    # "mobile recharge", "car emi"
+    (r"\b(emi|loan|instal?ments?)\b", Category.BILLS),
+    (r"\b\w*(mart|bazaar)\b", Category.GROCERIES),       # "dmart", "bigbazaar"
+    (r"\b(wages?|payout|stipend)\b", Category.INCOME),
+]
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(description):
+    """Lowercase, punctuation/whitespace runs -> one space, trimmed."""
+    return _NON_WORD.sub(" ", (description or "").lower()).strip()
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over normalized keywords; best() = longest whole-word match."""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # per state: [(keyword length, value)]
+        for phrase, value in keywords.items():
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(phrase), value))
+
+        # failure links, breadth first (depth-1 states fail to the root)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                if state:
+                    f = self.fail[state]
+                    while f and ch not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def best(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state, best, best_len, n = 0, None, 0, len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                if length <= best_len:
+                    continue
+                start = i - length + 1
+                if (start == 0 or text[start - 1] == " ") and (i + 1 == n or text[i + 1] == " "):
+                    best, best_len = value, length
+        return best
+
+
+@functools.cache
+def _rules():
+    # compiled on first use, not at import (this module loads with the app registry)
+    matcher = KeywordMatcher({normalize(k): int(cat) for cat, words in KEYWORDS.items() for k in words})
+    regex = re.compile("|".join(f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(REGEX_RULES)))
+    return matcher, regex, {f"r{i}": int(cat) for i, (_, cat) in enumerate(REGEX_RULES)}
+
+
+def classify(description, overrides=None):
+    """Category (int) for a description; `overrides` is {normalized description: category}."""
+    text = normalize(description)
+    if overrides and text in overrides:
+        return overrides[text]
+    matcher, regex, regex_categories = _rules()
+    found = matcher.best(text)
+    if found is not None:
+        return found
+    m = regex.search(text)
+    if m:
+        return regex_categories[m.lastgroup]
+    return Category.UNCATEGORIZED
+
+
+# --------- per-user overrides (cached like CoachingSettings) ----------
+def overrides_cache_key(user_id):
+    return f"category_overrides:{user_id}"
+
+
+def overrides_for(user_ids, cached=True):
+    """
+    {user_id: {normalized description: category}}; one query for cache misses.
+    Like settings_for(), batch callers pass cached=False so they never use
+    another process's stale copy.
+    """
+    from .models import CategoryOverride
+    keys = {overrides_cache_key(uid): uid for uid in user_ids}
+    found = {keys[k]: v for k, v in cache.get_many(keys).items()} if cached else {}
+    missing = [uid for uid in keys.values() if uid not in found]
+    if missing:
+        for uid in missing:
+            found[uid] = {}
+        for uid, desc, cat in CategoryOverride.objects.filter(user_id__in=missing).values_list(
+                "user_id", "description", "category"):
+            found[uid][desc] = cat
+        cache.set_many({overrides_cache_key(uid): found[uid] for uid in missing}, OVERRIDES_CACHE_TIMEOUT)
+    return found
+
+
+def categorize_rows(rows, overrides):
+    """[(id, user_id, description, ...)] -> {category: [ids]} using each user's overrides."""
+    groups = {}
+    for pk, uid, description, *_ in rows:
+        groups.setdefault(classify(description, overrides.get(uid)), []).append(pk)
+    return groups
+
+
+def slug(category):
+    return Category(category).name.lower()
+
+
+def from_slug(value):
+    """Category for a slug ("groceries") or its integer value; ValueError otherwise."""
+    if isinstance(value, str) and not value.isdigit():
+        try:
+            return Category[value.upper()]
+        except KeyError:
+            raise ValueError(f"unknown category {value!r}")
+    return Category(int(value))
+
+
+def set_override(user_id, description, category):
+    """Save a user's override and re-categorize their matching entries. Returns how many changed."""
+    from accounts.models import CashEntry
+    from .models import CategoryOverride
+    from . import reports, versions
+    key = normalize(description)
+    if not key:
+        raise ValueError("empty description")
+    with transaction.atomic():
+        CategoryOverride.objects.update_or_create(user_id=user_id, description=key,
+                                                  defaults={"category": category})
+        # narrow by the longest word in SQL, compare normalized forms here
+        candidates = (CashEntry.objects.filter(user_id=user_id, description__icontains=max(key.split(), key=len))
+                      .exclude(category=category).values_list("id", "description", "date"))
+        matched = [(pk, day) for pk, desc, day in candidates if normalize(desc) == key]
+        ids = [pk for pk, _ in matched]
+        for i in range(0, len(ids), 1000):
+            CashEntry.objects.filter(id__in=ids[i:i + 1000]).update(category=category)
+        if ids:
+            # update() sends no signals: drop the statements these entries were frozen into
+            days = [day for _, day in matched]
+            reports.invalidate_span([user_id], min(days), max(days))
+            versions.bump(user_id, kinds=(versions.LEDGER,))
+    return len(ids)
@@ -0,0 +1,237 @@
+# coach/goals.py
+"""
+Goal progress engine.
+
+Progress is exposed as a queryset annotation (``progress_pct``) so lists can
+be sorted/filtered in SQL. Projected completion dates are derived from the
+user's recent net-savings rate (income + cash income - expenses over the last
+SAVINGS_WINDOW_DAYS) and stored on SavedGoal.projected_completion, so one
+aggregate per user is shared by all of that user's goals.
+
+All arithmetic here is done in integer cents (accounts.fields); amounts only
+become Decimal/float again on the model instance or in goal_to_dict.
+"""
+import math
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from accounts.fields import SumCents, from_cents, to_cents
+from accounts.models import Income, CashEntry
+from .models import GoalContribution, SavedGoal
+from . import versions
+
+SAVINGS_WINDOW_DAYS = 90
+
+# ?ordering= values accepted by the goals list endpoints
+ORDERINGS = {
+    "created": ("-created_at",),
+    "progress": ("progress_pct", "-created_at"),
+    "-progress": ("-progress_pct", "-created_at"),
+    "eta": (F("projected_completion").asc(nulls_last=True), "-created_at"),
+    "-eta": (F("projected_completion").desc(nulls_last=True), "-created_at"),
+}
+
+
+def with_progress(qs):
+    """Annotate a SavedGoal queryset with progress_pct (0 when target <= 0)."""
+    return qs.annotate(progress_pct=Case(
+        When(target_amount__gt=0, then=F("current_amount") * 100.0 / F("target_amount")),
+        default=Value(0.0),
+        output_field=FloatField(),
+    ))
+
+
+def savings_rates(user_ids, days=SAVINGS_WINDOW_DAYS, today=None):
+    """
+    Average daily net savings per user over the last `days` days, in cents/day.
+    Two grouped queries regardless of how many users/goals are involved.
+    Returns {user_id: rate}; users without ledger data get 0.
+    """
+    user_ids = list(user_ids)
+    since = (today or date.today()) - timedelta(days=days)
+    net = {uid: 0 for uid in user_ids}
+
+    incomes = (Income.objects.filter(user_id__in=user_ids, date__gte=since)
+               .values("user_id").annotate(total=SumCents("amount")))
+    for row in incomes:
+        net[row["user_id"]] += row["total"] or 0
+
+    cash = (CashEntry.objects.filter(user_id__in=user_ids, date__gte=since)
+            .values("user_id")
+            .annotate(cash_in=SumCents("amount", filter=Q(is_income=True)),
+                      cash_out=SumCents("amount", filter=Q(is_income=False))))
+    for row in cash:
+        net[row["user_id"]] += (row["cash_in"] or 0) - (row["cash_out"] or 0)
+
+    return {uid: total / days for uid, total in net.items()}
+
+
+def projected_completion(target, current, rate, today=None):
+    """Date the goal is reached at `rate` cents/day (target/current in cents), or None if never."""
+    today = today or date.today()
+    remaining = target - current
+    if remaining <= 0:
+        return today
+    if rate <= 0:
+        return None
+    return today + timedelta(days=math.ceil(remaining / rate))
+
+
+def project_goals(goals, rate, today=None):
+    """Set projection fields on goal instances in place (no queries)."""
+    now = timezone.now()
+    for g in goals:
+        g.projected_completion = projected_completion(
+            to_cents(g.target_amount), to_cents(g.current_amount), rate, today)
+        g.projection_updated_at = now
+    return goals
+
+
+def refresh_projections(user_ids, today=None):
+    """
+    Recompute projections for every goal of the given users.
+    Queries: 2 (rates) + 1 (goals) + bulk_update, independent of goal count.
+    """
+    rates = savings_rates(user_ids, today=today)
+    goals = list(SavedGoal.objects.filter(user_id__in=rates.keys())
+                 .only("id", "user_id", "target_amount", "current_amount"))
+    by_user = {}
+    for g in goals:
+        by_user.setdefault(g.user_id, []).append(g)
+    for uid, user_goals in by_user.items():
+        project_goals(user_goals, rates[uid], today)
+    SavedGoal.objects.bulk_update(goals, ["projected_completion", "projection_updated_at"], batch_size=500)
+    # bulk_update sends no signals
+    versions.bump(*by_user, kinds=(versions.GOALS,))
+    return len(goals)
+
+
+def refresh_all_projections(batch_size=500, today=None):
+    """refresh_projections() for every user with goals, batch_size users at a time. Returns (goals, users)."""
+    user_ids = list(SavedGoal.objects.values_list("user_id", flat=True).distinct().order_by("user_id"))
+    updated = sum(refresh_projections(user_ids[i:i + batch_size], today)
+                  for i in range(0, len(user_ids), batch_size))
+    return updated, len(user_ids)
+
+
+class GoalNotFound(Exception):
+    pass
+
+
+class GoalOverdrawn(Exception):
+    """A contribution would take current_amount below zero; args[0] is the goal ids."""
+
+
+def apply_contributions(user, deltas):
+    """
+    Atomically add {goal_id: delta} to the user's goals with one bulk_update.
+    current_amount is updated through F() so concurrent writers don't lose updates;
+    a negative delta that would overdraw a goal rolls everything back (GoalOverdrawn).
+    Returns the affected goals (annotated, with refreshed projections).
+    """
+    deltas = {int(gid): to_cents(delta) for gid, delta in deltas.items()}
+    with transaction.atomic():
+        owned = set(SavedGoal.objects.filter(user=user, id__in=deltas.keys())
+                    .values_list("id", flat=True))
+        missing = set(deltas) - owned
+        if missing:
+            raise GoalNotFound(sorted(missing))
+        SavedGoal.objects.bulk_update(
+            [SavedGoal(id=gid, current_amount=F("current_amount") + Value(delta))  # delta in cents
+             for gid, delta in deltas.items()],
+            ["current_amount"],
+        )
+        # checked after the update, so a concurrent withdrawal can't slip past it
+        overdrawn = sorted(SavedGoal.objects.filter(id__in=deltas.keys(), current_amount__lt=0)
+                           .values_list("id", flat=True))
+        if overdrawn:
+            raise GoalOverdrawn(overdrawn)
+        record_contributions(user.id, deltas)
+        refresh_projections([user.id])
+    return list(with_progress(SavedGoal.objects.filter(id__in=deltas.keys())).order_by("priority", "id"))
+
+
+def record_contributions(user_id, deltas):
+    """Log {goal_id: delta cents} as GoalContribution rows (one insert) for period statements."""
+    GoalContribution.objects.bulk_create([GoalContribution(user_id=user_id, goal_id=gid, amount=from_cents(delta))
+                                          for gid, delta in deltas.items() if delta])
+
+
+def allocate(goals, amount, strategy="priority"):
+    """
+    Split `amount` across goals without overfunding any of them.
+      - "priority": fill goals in priority order (then oldest first)
+      - "weight":   split proportionally to weight, redistributing what
+                    capped goals can't absorb
+    Returns ({goal_id: delta}, unallocated) as Decimals; the split itself is
+    done in whole cents so deltas always add up to exactly `amount`.
+    """
+    remaining = {g.id: max(to_cents(g.target_amount) - to_cents(g.current_amount), 0) for g in goals}
+    deltas = {}
+    amount = to_cents(amount)
+    left = amount
+    if strategy == "priority":
+        for g in sorted(goals, key=lambda g: (g.priority, g.created_at, g.id)):
+            give = min(left, remaining[g.id])
+            if give > 0:
+                deltas[g.id] = give
+                left -= give
+    elif strategy == "weight":
+        open_goals = sorted((g for g in goals if remaining[g.id] > 0 and g.weight > 0),
+                            key=lambda g: (-g.weight, g.id))
+        while left > 0 and open_goals:
+            total_weight = sum(g.weight for g in open_goals)
+            pot = left
+            for g in open_goals:
+                give = min(int(pot * g.weight / total_weight), remaining[g.id] - deltas.get(g.id, 0))
+                deltas[g.id] = deltas.get(g.id, 0) + give
+                left -= give
+            if left == pot:
+                # the pot is too small to split proportionally: hand out the last cents by weight
+                for g in open_goals:
+                    give = min(left, remaining[g.id] - deltas[g.id])
+                    deltas[g.id] += give
+                    left -= give
+            open_goals = [g for g in open_goals if remaining[g.id] > deltas[g.id]]
+    else:
+        raise ValueError(f"unknown strategy {strategy!r}")
+    deltas = {gid: from_cents(d) for gid, d in deltas.items() if d > 0}
+    return deltas, from_cents(left)
+
+
+def allocate_to_goals(user, amount, strategy="priority", goal_ids=None):
+    """Allocate a lump sum across the user's (unfinished) goals in one transaction."""
+    with transaction.atomic():
+        qs = SavedGoal.objects.select_for_update().filter(user=user)
+        if goal_ids is not None:
+            qs = qs.filter(id__in=goal_ids)
+        deltas, unallocated = allocate(list(qs), amount, strategy)
+        updated = apply_contributions(user, deltas) if deltas else []
+    return updated, unallocated
+
+
+GOAL_FIELDS = ("id", "name", "target_amount", "current_amount", "deadline", "priority", "weight",
+               "projected_completion")
+
+
+def goal_rows(qs):
+    """goal_to_dict() shape straight from a with_progress() queryset, as values() rows."""
+    return qs.values(*GOAL_FIELDS, progress=Round("progress_pct", 2))
+
+
+def goal_to_dict(g):
+    return {
+        "id": g.id,
+        "name": g.name,
+        "target_amount": float(g.target_amount),
+        "current_amount": float(g.current_amount),
+        "deadline": g.deadline,
+        "priority": g.priority,
+        "weight": g.weight,
+        "progress": round(g.progress_pct, 2),
+        "projected_completion": g.projected_completion,
+    }
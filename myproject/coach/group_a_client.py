@@ -1,22 +1,16 @@
 # coach/group_a_client.py
+from accounts.fields import as_units
 from accounts.models import Income, CashEntry
-from django.db.models import Sum
 
-def get_daily_income(user):
-    incomes = Income.objects.filter(user=user).values("date").annotate(total=Sum("amount"))
-    cash = CashEntry.objects.filter(user=user, is_income=True).values("date").annotate(total=Sum("amount"))
-
-    combined = {}
-    for entry in incomes:
-        d = entry["date"]
-        combined[d] = combined.get(d, 0) + float(entry["total"] or 0)
+def get_daily_income_cents(user):
+    # {date: income + cash income in integer cents}, from the cached columnar snapshot
+    from .ledger import snapshot_for
+    return snapshot_for(user.id).daily_earnings()
 
-    for entry in cash:
-        d = entry["date"]
-        combined[d] = combined.get(d, 0) + float(entry["total"] or 0)
 
-    # return dict keyed by date objects -> totals
-    return combined
+def get_daily_income(user):
+    # same as get_daily_income_cents, in float currency units
+    return {d: as_units(c) for d, c in get_daily_income_cents(user).items()}
 
 
 def get_transactions(user):
@@ -0,0 +1,213 @@
+# coach/ledger.py
+"""
+Columnar per-user daily ledger.
+
+A LedgerSnapshot holds one slot per day with ledger activity, in four packed
+arrays: day ordinals (int32) and income / cash income / expenses in integer
+cents (int64). It is built from one UNION ALL query, stored in the cache as a
+compact byte string, and read back without creating any per-row objects.
+Windows are found by bisecting the ordinals, so totals, averages and
+heatmaps become slice arithmetic instead of ORM rows turned into date dicts.
+
+Freshness follows the ledger data version (coach/versions.py), which lives in
+the database: every read checks it with one query for the whole batch, so a
+write from any process -- including bulk_create()/update() paths, which bump
+it themselves -- makes the cached snapshot stale. A snapshot is used only if
+it was stored under the current version. A created or deleted entry patches
+this process's cached snapshot forward by one version after commit (see
+patch()). Any other change just leaves a version mismatch, and the snapshot
+is rebuilt on the next read. A rebuild is cached only if the version did not
+move while it ran; otherwise a write it already contains would be patched in
+a second time.
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BigIntegerField, Q, Value
+
+from accounts.fields import SumCents, to_cents
+from accounts.models import Income, CashEntry
+from . import versions
+
+SNAPSHOT_TIMEOUT = 7 * 86400
+
+_HEADER = struct.Struct("<4sI")  # magic, number of days
+_MAGIC = b"LSN1"
+_SWAP = sys.byteorder == "big"  # stored little-endian
+
+
+class LedgerSnapshot:
+    __slots__ = ("days", "income", "cash_in", "cash_out")
+
+    def __init__(self, days=None, income=None, cash_in=None, cash_out=None):
+        self.days = days if days is not None else array("i")
+        self.income = income if income is not None else array("q")
+        self.cash_in = cash_in if cash_in is not None else array("q")
+        self.cash_out = cash_out if cash_out is not None else array("q")
+
+    def __len__(self):
+        return len(self.days)
+
+    def __eq__(self, other):
+        return isinstance(other, LedgerSnapshot) and all(
+            getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    # --------- serialization ----------
+    def to_bytes(self):
+        parts = [_HEADER.pack(_MAGIC, len(self.days))]
+        for column in (self.days, self.income, self.cash_in, self.cash_out):
+            if _SWAP:
+                column = array(column.typecode, column)
+                column.byteswap()
+            parts.append(column.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        magic, n = _HEADER.unpack_from(blob)
+        if magic != _MAGIC:
+            raise ValueError("not a ledger snapshot")
+        columns, offset = [], _HEADER.size
+        for typecode in ("i", "q", "q", "q"):
+            column = array(typecode)
+            size = column.itemsize * n
+            column.frombytes(blob[offset:offset + size])
+            if _SWAP:
+                column.byteswap()
+            columns.append(column)
+            offset += size
+        return cls(*columns)
+
+    # --------- slicing ----------
+    def window(self, start=None, end=None):
+        """(lo, hi) slot range of days in [start, end); None means unbounded."""
+        lo = bisect_left(self.days, start.toordinal()) if start else 0
+        hi = bisect_left(self.days, end.toordinal()) if end else len(self.days)
+        return lo, hi
+
+    def totals(self, start=None, end=None):
+        """(income, cash income, expenses) in cents over [start, end)."""
+        lo, hi = self.window(start, end)
+        return sum(self.income[lo:hi]), sum(self.cash_in[lo:hi]), sum(self.cash_out[lo:hi])
+
+    def daily_earnings(self, start=None, end=None):
+        """{date: income + cash income} for days with earnings, as get_daily_income_cents() returns."""
+        lo, hi = self.window(start, end)
+        return {date.fromordinal(d): i + c
+                for d, i, c in zip(self.days[lo:hi], self.income[lo:hi], self.cash_in[lo:hi]) if i or c}
+
+    def recent_earnings(self, n):
+        """Earnings of the last `n` days that had any, newest first."""
+        values = []
+        for i in range(len(self.days) - 1, -1, -1):
+            earned = self.income[i] + self.cash_in[i]
+            if earned:
+                values.append(earned)
+                if len(values) == n:
+                    break
+        return values
+
+    # --------- patching ----------
+    def add(self, day, income=0, cash_in=0, cash_out=0):
+        """Add amounts (cents, may be negative) to one day, inserting the slot if needed."""
+        ordinal = day.toordinal()
+        i = bisect_left(self.days, ordinal)
+        if i == len(self.days) or self.days[i] != ordinal:
+            self.days.insert(i, ordinal)
+            for column in (self.income, self.cash_in, self.cash_out):
+                column.insert(i, 0)
+        self.income[i] += income
+        self.cash_in[i] += cash_in
+        self.cash_out[i] += cash_out
+
+
+def build(user_ids):
+    """{user_id: LedgerSnapshot} from the database in one query."""
+    zero = Value(0, output_field=BigIntegerField())
+    fields = ("user_id", "date", "income", "cash_in", "cash_out")
+    incomes = (Income.objects.filter(user_id__in=user_ids).values("user_id", "date")
+               .annotate(income=SumCents("amount"), cash_in=zero, cash_out=zero).values_list(*fields))
+    cash = (CashEntry.objects.filter(user_id__in=user_ids).values("user_id", "date")
+            .annotate(income=zero,
+                      cash_in=SumCents("amount", filter=Q(is_income=True)),
+                      cash_out=SumCents("amount", filter=Q(is_income=False)))
+            .values_list(*fields))
+    snapshots = {uid: LedgerSnapshot() for uid in user_ids}
+    for uid, day, inc, cin, cout in incomes.union(cash, all=True).order_by("user_id", "date"):
+        s = snapshots[uid]
+        ordinal = (day if isinstance(day, date) else date.fromisoformat(str(day))).toordinal()
+        if s.days and s.days[-1] == ordinal:  # same day from both tables
+            s.income[-1] += inc or 0
+            s.cash_in[-1] += cin or 0
+            s.cash_out[-1] += cout or 0
+        else:
+            s.days.append(ordinal)
+            s.income.append(inc or 0)
+            s.cash_in.append(cin or 0)
+            s.cash_out.append(cout or 0)
+    return snapshots
+
+
+def _key(user_id):
+    return f"ledger_snapshot:{user_id}"
+
+
+def snapshots_for(user_ids):
+    """{user_id: LedgerSnapshot}, cached by ledger version; one query for all misses (plus a version re-check)."""
+    user_ids = list(user_ids)
+    current = {uid: v[0] for uid, v in versions.many(user_ids, versions.LEDGER).items()}
+    cached = cache.get_many([_key(uid) for uid in user_ids])
+    found, missing = {}, []
+    for uid in user_ids:
+        entry = cached.get(_key(uid))
+        if entry is not None and entry[0] == current[uid]:
+            found[uid] = LedgerSnapshot.from_bytes(entry[1])
+        else:
+            missing.append(uid)
+    if missing:
+        built = build(missing)
+        after = versions.many(missing, versions.LEDGER)
+        cache.set_many({_key(uid): (current[uid], built[uid].to_bytes())
+                        for uid in missing if after[uid][0] == current[uid]}, SNAPSHOT_TIMEOUT)
+        found.update(built)
+    return found
+
+
+def snapshot_for(user_id):
+    return snapshots_for([user_id])[user_id]
+
+
+def patch(instance, sign=1):
+    """
+    After commit, move the cached snapshot of instance's user forward by one
+    ledger version with instance's amount (sign=-1 for a delete). Runs after
+    ledger_changed has bumped the version. If any other write happened in
+    between, the versions don't line up, nothing is patched, and the next read
+    rebuilds.
+    """
+    user_id, day = instance.user_id, instance.date
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    amount = sign * to_cents(instance.amount)
+    if isinstance(instance, Income):
+        deltas = {"income": amount}
+    elif instance.is_income:
+        deltas = {"cash_in": amount}
+    else:
+        deltas = {"cash_out": amount}
+
+    def apply():
+        current, = versions.versions(user_id, versions.LEDGER)
+        entry = cache.get(_key(user_id))
+        if entry is None or not isinstance(current, int) or entry[0] != current - 1:
+            return
+        snapshot = LedgerSnapshot.from_bytes(entry[1])
+        snapshot.add(day, **deltas)
+        cache.set(_key(user_id), (current, snapshot.to_bytes()), SNAPSHOT_TIMEOUT)
+
+    transaction.on_commit(apply)
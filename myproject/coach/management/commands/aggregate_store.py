@@ -0,0 +1,47 @@
+# coach/management/commands/aggregate_store.py
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from coach.aggstore import get_store
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild, refresh or verify the memory-mapped aggregate store (COACH_AGGREGATE_STORE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="rewrite the store for every user")
+        parser.add_argument("--refresh", type=int, nargs="+", metavar="USER_ID", help="recompute these users in place")
+        parser.add_argument("--check", action="store_true", help="verify records against the database")
+        parser.add_argument("--sample", type=int, help="with --check: only verify N random users")
+        parser.add_argument("--batch-size", type=int, default=500, help="users per query")
+
+    def handle(self, *args, **options):
+        store = get_store()
+        if store is None:
+            raise CommandError("COACH_AGGREGATE_STORE is not set")
+        if not (options["rebuild"] or options["refresh"] or options["check"]):
+            raise CommandError("pass --rebuild, --refresh and/or --check")
+        user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+
+        if options["rebuild"]:
+            started = time.perf_counter()
+            written = store.rebuild(user_ids, batch_size=options["batch_size"])
+            self.stdout.write(f"Rebuilt {store.path}: {written} users in {time.perf_counter() - started:.1f}s.")
+        if options["refresh"]:
+            store.refresh(options["refresh"])
+            self.stdout.write(f"Refreshed {len(options['refresh'])} users.")
+        if options["check"]:
+            ids = random.sample(user_ids, min(options["sample"], len(user_ids))) if options["sample"] else user_ids
+            problems = []
+            for i in range(0, len(ids), options["batch_size"]):
+                problems += store.check(ids[i:i + options["batch_size"]])
+            for uid, problem in problems[:20]:
+                self.stdout.write(self.style.ERROR(f"user {uid}: {problem}"))
+            if problems:
+                raise CommandError(f"{len(problems)} of {len(ids)} records disagree with the database")
+            self.stdout.write(self.style.SUCCESS(f"Checked {len(ids)} users: store matches the database."))
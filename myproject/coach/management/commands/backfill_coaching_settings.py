@@ -0,0 +1,27 @@
+# coach/management/commands/backfill_coaching_settings.py
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from coach.models import CoachingSettings
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = "Create default CoachingSettings rows for users that don't have one yet (batched)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        missing = (User.objects.filter(coachingsettings__isnull=True)
+                   .order_by("id").values_list("id", flat=True))
+        created = 0
+        last_id = 0
+        while True:
+            ids = list(missing.filter(id__gt=last_id)[:options["batch_size"]])
+            if not ids:
+                break
+            CoachingSettings.objects.bulk_create(
+                [CoachingSettings(user_id=uid) for uid in ids], ignore_conflicts=True)
+            created += len(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Created settings for {created} users."))
@@ -0,0 +1,20 @@
+# coach/management/commands/build_period_snapshots.py
+from django.core.management.base import BaseCommand
+
+from coach.reports import MONTH, WEEK, build_all_snapshots
+
+
+class Command(BaseCommand):
+    help = "Freeze statements of closed months/ISO weeks into PeriodSnapshot rows (batched per user)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", choices=[MONTH, WEEK, "both"], default="both")
+        parser.add_argument("--count", type=int, default=24, help="closed periods to keep frozen per user")
+        parser.add_argument("--batch-size", type=int, default=200, help="users per batch")
+
+    def handle(self, *args, **options):
+        periods = [MONTH, WEEK] if options["period"] == "both" else [options["period"]]
+        stored, users = build_all_snapshots(periods, options["count"], options["batch_size"])
+        for period, created in stored.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"Stored {created} {period} snapshots across {users} users."))
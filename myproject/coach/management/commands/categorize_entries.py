@@ -0,0 +1,61 @@
+# coach/management/commands/categorize_entries.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CashEntry, Category
+from coach import reports, versions
+from coach.categorize import categorize_rows, overrides_for
+
+
+class Command(BaseCommand):
+    help = ("Assign categories to existing cash entries in primary-key batches "
+            "(by default only those still uncategorized)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20000, help="entries per batch/transaction")
+        parser.add_argument("--all", action="store_true", help="re-classify every entry, not just uncategorized ones")
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="limit to a user id (repeatable)")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        qs = CashEntry.objects.all()
+        if not options["all"]:
+            qs = qs.filter(category=Category.UNCATEGORIZED)
+        if options["user_ids"]:
+            qs = qs.filter(user_id__in=options["user_ids"])
+
+        started = time.perf_counter()
+        last_id, seen, changed = 0, 0, 0
+        while True:
+            # keyset pagination: each batch is an index range scan, however deep into the table
+            rows = list(qs.filter(id__gt=last_id).order_by("id")
+                        .values_list("id", "user_id", "description", "date", "category")[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            groups = categorize_rows(rows, overrides_for({uid for _, uid, *_ in rows}, cached=False))
+            new = {pk: category for category, ids in groups.items() for pk in ids}
+            moved = [row for row in rows if new[row[0]] != row[4]]
+            seen += len(rows)
+            if moved:
+                with transaction.atomic():
+                    # one UPDATE per category rather than one per row
+                    targets = {}
+                    for pk, *_ in moved:
+                        targets.setdefault(new[pk], []).append(pk)
+                    for category, ids in targets.items():
+                        for i in range(0, len(ids), 1000):
+                            changed += (CashEntry.objects.filter(id__in=ids[i:i + 1000])
+                                        .exclude(category=category).update(category=category))
+                    # update() sends no signals: drop the statements the moved entries were frozen into
+                    user_ids = {uid for _, uid, *_ in moved}
+                    days = [row[3] for row in moved]
+                    reports.invalidate_span(user_ids, min(days), max(days))
+                    versions.bump(*user_ids, kinds=(versions.LEDGER,))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {seen} entries classified ({seen / elapsed:.0f} rows/s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Classified {seen} entries, {changed} changed, in {time.perf_counter() - started:.1f}s."))
@@ -0,0 +1,42 @@
+# coach/management/commands/coach_scheduler.py
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from coach.scheduler import Scheduler, get_config
+
+
+class Command(BaseCommand):
+    requires_system_checks = []  # started by supervisors; `manage.py check` belongs in deploys
+    help = "Run the periodic coach jobs (agent sweep, queue, statements, projections, aggregates, pruning) in one resident process"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", help="comma-separated subset of jobs to schedule (default: all enabled)")
+        parser.add_argument("--once", action="store_true", help="run the jobs once now (if the lease is free) and exit")
+        parser.add_argument("--owner", help="lease owner id (default: host:pid:random)")
+
+    def handle(self, *args, **options):
+        only = [j.strip() for j in options["jobs"].split(",") if j.strip()] if options["jobs"] else None
+        try:
+            tick, lease, jobs = get_config(only)
+        except ValueError as e:
+            raise CommandError(e)
+        scheduler = Scheduler(jobs, tick_seconds=tick, lease_seconds=lease, owner=options["owner"])
+
+        if options["once"]:
+            try:
+                ran = scheduler.run_due(force=True)
+            finally:
+                scheduler.release()
+            if not ran:
+                raise CommandError("another scheduler holds the lease")
+            for name, result in ran:
+                style = self.style.ERROR if isinstance(result, Exception) else str
+                self.stdout.write(style(f"{name}: {result}"))
+            return
+
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        self.stdout.write(f"Scheduler {scheduler.owner} started: " + ", ".join(
+            f"{j.name} every {j.interval}s (+{j.jitter}s)" for j in jobs))
+        scheduler.run_forever()
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
@@ -0,0 +1,30 @@
+# coach/management/commands/drain_advice_queue.py
+import time
+
+from django.core.management.base import BaseCommand
+from coach.queue import drain
+
+
+class Command(BaseCommand):
+    requires_system_checks = []  # started by cron/supervisors; `manage.py check` belongs in deploys
+    help = "Evaluate advice for users whose ledger changed (drains the PendingEvaluation queue)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="drain what is due and exit")
+        parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            stats = drain(limit=options["batch_size"])
+            for username, error in stats["errors"]:
+                self.stdout.write(self.style.ERROR(f"Error for user {username}: {error}"))
+            if stats["users"]:
+                self.stdout.write(f"Evaluated {stats['users']} users, {stats['cards']} new cards.")
+            if options["once"]:
+                break
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                break
+        self.stdout.write(self.style.SUCCESS("Advice queue drained."))
@@ -0,0 +1,172 @@
+# coach/management/commands/generate_load_data.py
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import Income, CashEntry
+from coach import versions
+from coach.categorize import classify
+from coach.goals import refresh_projections
+from coach.models import CoachingSettings, SavedGoal
+from coach.queue import enqueue_evaluation
+
+User = get_user_model()
+
+# (category, relative frequency, min amount, max amount, description variants as users type them)
+EXPENSE_CATEGORIES = [
+    ("groceries", 30, 10, 180, ["groceries", "Groceries", "grocery store", "supermarket"]),
+    ("transport", 25, 2, 60, ["transport", "bus", "Uber", "fuel", "petrol "]),
+    ("coffee", 20, 2, 12, ["coffee", "Coffee", "coffee ", "COFFEE", "cafe"]),
+    ("eating_out", 12, 8, 90, ["restaurant", "lunch", "dinner out", "takeaway"]),
+    ("bills", 5, 40, 400, ["electricity bill", "Bills", "water bill", "internet"]),
+    ("shopping", 6, 15, 500, ["shopping", "clothes", "Amazon", "electronics"]),
+    ("health", 2, 10, 300, ["pharmacy", "doctor", "medicine"]),
+]
+CATEGORY_WEIGHTS = [c[1] for c in EXPENSE_CATEGORIES]
+
+GOAL_TEMPLATES = [
+    ("Emergency fund", 3000, 15000),
+    ("Vacation", 800, 4000),
+    ("New laptop", 600, 2500),
+    ("Wedding", 5000, 30000),
+    ("Education", 2000, 20000),
+]
+
+
+class Command(BaseCommand):
+    help = ("Generate a large deterministic dataset for load testing "
+            "(users, seasonal income, categorized expenses, goals) via bulk_create")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--days", type=int, default=365, help="days of history per user")
+        parser.add_argument("--expenses-per-day", type=float, default=3.0, help="mean cash expenses per user per day")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=50000, help="rows per bulk_create transaction")
+        parser.add_argument("--prefix", default="load", help="username prefix (users are <prefix><n>)")
+        parser.add_argument("--password", default="load-pass", help="password shared by all generated users")
+        parser.add_argument("--no-rollups", action="store_true", help="skip goal projection refresh at the end")
+        parser.add_argument("--fast-sqlite", action="store_true",
+                            help="relax SQLite durability (synchronous=OFF, WAL) while loading")
+
+    def handle(self, *args, **options):
+        n_users, prefix = options["users"], options["prefix"]
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"users with prefix {prefix!r} already exist; pick another --prefix")
+        if options["fast_sqlite"] and connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=OFF")
+
+        self.batch_size = options["batch_size"]
+        self.rows = 0
+        self.started = time.perf_counter()
+        today = date.today()
+        password = make_password(options["password"])
+
+        # users + settings first so ledger rows can reference their ids
+        user_ids = []
+        for start in range(0, n_users, self.batch_size):
+            chunk = [User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password=password)
+                     for i in range(start, min(start + self.batch_size, n_users))]
+            with transaction.atomic():
+                User.objects.bulk_create(chunk)
+                ids = list(User.objects.filter(username__in=[u.username for u in chunk])
+                           .order_by("id").values_list("id", flat=True))
+                CoachingSettings.objects.bulk_create([CoachingSettings(user_id=uid) for uid in ids])
+            user_ids += ids
+            self._progress(len(chunk) * 2, "users")
+
+        pending = {Income: [], CashEntry: [], SavedGoal: []}
+        for n, uid in enumerate(user_ids):
+            rng = random.Random(options["seed"] * 1_000_003 + n)
+            self._user_rows(uid, rng, today, options["days"], options["expenses_per_day"], pending)
+            if sum(len(v) for v in pending.values()) >= self.batch_size:
+                self._flush(pending)
+        self._flush(pending)
+        # bulk_create sends no signals: queue the evaluation a post_save would have
+        for start in range(0, len(user_ids), 1000):
+            enqueue_evaluation(*user_ids[start:start + 1000])
+
+        if not options["no_rollups"]:
+            for start in range(0, len(user_ids), 1000):
+                refresh_projections(user_ids[start:start + 1000], today)
+            self.stdout.write("Rollups rebuilt (goal projections).")
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {self.rows} rows for {n_users} users in {elapsed:.1f}s "
+            f"({self.rows / max(elapsed, 1e-9):,.0f} rows/s)."))
+
+    def _user_rows(self, uid, rng, today, days, expenses_per_day, pending):
+        # per-user profile: income level, weekend drop, payday, business vs personal mix
+        base = rng.lognormvariate(math.log(220), 0.5)
+        weekend_factor = rng.uniform(0.3, 0.9)
+        business_share = rng.random()
+        payday = rng.randint(1, 28)
+        spend_level = rng.uniform(0.5, 1.5)
+
+        for i in range(days):
+            d = today - timedelta(days=i)
+            season = 1 + 0.2 * math.sin(2 * math.pi * d.timetuple().tm_yday / 365.25)
+            amount = base * season * (weekend_factor if d.weekday() >= 5 else 1) * rng.uniform(0.6, 1.4)
+            if d.day == payday:
+                amount += base * 5
+            if rng.random() < 0.9:  # some days have no income at all
+                pending[Income].append(Income(
+                    user_id=uid, amount=round(amount, 2), date=d,
+                    income_type="business" if rng.random() < business_share else "personal"))
+
+            for _ in range(self._poisson(rng, expenses_per_day * spend_level)):
+                _, _, low, high, variants = rng.choices(EXPENSE_CATEGORIES, CATEGORY_WEIGHTS)[0]
+                description = rng.choice(variants)
+                # bulk_create skips the pre_save categorizer
+                pending[CashEntry].append(CashEntry(
+                    user_id=uid, description=description, category=classify(description),
+                    amount=round(rng.uniform(low, high), 2), date=d, is_income=False))
+            if rng.random() < 0.05:
+                description = rng.choice(["tips", "side job", "refund"])
+                pending[CashEntry].append(CashEntry(
+                    user_id=uid, description=description, category=classify(description),
+                    amount=round(rng.uniform(10, 200), 2), date=d, is_income=True))
+
+        for name, low, high in rng.sample(GOAL_TEMPLATES, rng.randint(0, 4)):
+            target = round(rng.uniform(low, high), -1)
+            pending[SavedGoal].append(SavedGoal(
+                user_id=uid, name=name, target_amount=target,
+                current_amount=round(target * rng.betavariate(1.5, 3), 2),
+                priority=rng.randint(0, 3)))
+
+    @staticmethod
+    def _poisson(rng, lam):
+        # Knuth; fine for the small means used here
+        limit, k, p = math.exp(-lam), 0, 1.0
+        while True:
+            p *= rng.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    def _flush(self, pending):
+        with transaction.atomic():
+            for model, objs in pending.items():
+                if objs:
+                    model.objects.bulk_create(objs, batch_size=5000)
+            # bulk_create sends no signals: invalidate cached snapshots/ETags like ledger_changed would
+            versions.bump(*{o.user_id for o in pending[Income] + pending[CashEntry]}, kinds=(versions.LEDGER,))
+            versions.bump(*{o.user_id for o in pending[SavedGoal]}, kinds=(versions.GOALS,))
+        count = sum(len(v) for v in pending.values())
+        for objs in pending.values():
+            objs.clear()
+        self._progress(count, "ledger rows")
+
+    def _progress(self, count, what):
+        self.rows += count
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"  +{count} {what}  ({self.rows} total, {self.rows / max(elapsed, 1e-9):,.0f} rows/s)")
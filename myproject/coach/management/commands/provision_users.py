@@ -0,0 +1,41 @@
+# coach/management/commands/provision_users.py
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from coach.provisioning import BATCH_SIZE, ProvisioningError, default_workers, provision
+
+
+class Command(BaseCommand):
+    help = "Create users with coach settings and starter goals from a CSV or JSON-lines file, in one transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with a username,email,password header, or .jsonl with one object per line")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="users per bulk_create batch")
+        parser.add_argument("--workers", type=int, help="password hashing processes (default: COACH_PROVISION_WORKERS / all cores)")
+        parser.add_argument("--no-starter-goals", action="store_true")
+        parser.add_argument("--skip-existing", action="store_true", help="skip usernames that already exist instead of failing")
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="") as f:
+            if options["path"].endswith((".jsonl", ".ndjson")):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = list(csv.DictReader(f))
+        try:
+            report = provision(rows, starter_goals=not options["no_starter_goals"],
+                               skip_existing=options["skip_existing"],
+                               batch_size=options["batch_size"], workers=options["workers"] or default_workers())
+        except ProvisioningError as e:
+            for i, msg in e.problems[:50]:
+                self.stdout.write(self.style.ERROR(f"row {i + 1}: {msg}"))
+            raise CommandError(f"{len(e.problems)} invalid rows, nothing was created")
+
+        for b in report["batches"]:
+            self.stdout.write(f"batch {b['batch']}: {b['users']} users, hashing {b['hash_wait_seconds']:.3f}s, "
+                              f"writing {b['write_seconds']:.3f}s ({b['users_per_second']:,.0f} users/s)")
+        if report["skipped"]:
+            self.stdout.write(f"Skipped {len(report['skipped'])} existing usernames.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisioned {report['created']} users in {report['seconds']:.2f}s "
+            f"({report['created'] / max(report['seconds'], 1e-9):,.0f} users/s)."))
@@ -0,0 +1,27 @@
+# coach/management/commands/prune_advice.py
+from django.core.management.base import BaseCommand, CommandError
+from coach.retention import get_policy, prune_advice, MODES
+
+
+class Command(BaseCommand):
+    help = "Archive, summarize or delete old read advice cards per COACH_ADVICE_RETENTION"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-last", type=int, help="keep the newest N cards per user")
+        parser.add_argument("--keep-days", type=int, help="keep cards younger than D days")
+        parser.add_argument("--mode", choices=MODES)
+        parser.add_argument("--batch-size", type=int, help="rows per delete transaction")
+        parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            policy = get_policy(keep_last=options["keep_last"], keep_days=options["keep_days"],
+                                mode=options["mode"], batch_size=options["batch_size"])
+        except ValueError as e:
+            raise CommandError(e)
+        count = prune_advice(policy, pause=options["pause"], dry_run=options["dry_run"])
+        verb = "Would prune" if options["dry_run"] else "Pruned"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} advice cards (mode={policy['mode']}, keep_last={policy['keep_last']}, "
+            f"keep_days={policy['keep_days']})."))
@@ -0,0 +1,15 @@
+# coach/management/commands/refresh_goal_projections.py
+from django.core.management.base import BaseCommand
+from coach.goals import refresh_all_projections
+
+
+class Command(BaseCommand):
+    help = "Recompute projected completion dates for all saved goals (batched per user)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="users per batch")
+
+    def handle(self, *args, **options):
+        updated, users = refresh_all_projections(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed projections for {updated} goals across {users} users."))
@@ -0,0 +1,101 @@
+# coach/management/commands/run_benchmarks.py
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks import datasets, runner, serialization, startup
+
+
+class Command(BaseCommand):
+    help = "Benchmark coach/accounts endpoints and the agent on synthetic datasets (uses a throwaway test DB)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default="small", help=f"comma-separated, from: {', '.join(datasets.SCALES)}")
+        parser.add_argument("--repeat", type=int, default=5, help="timed requests per endpoint")
+        parser.add_argument("--warm-cache", action="store_true", help="don't clear the cache between requests")
+        parser.add_argument("--output", help="write the JSON report to this file")
+        parser.add_argument("--baseline", help="compare against a previously stored JSON report")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="allowed median slowdown vs baseline (fraction, default 0.2)")
+        parser.add_argument("--serialization", action="store_true",
+                            help="only run the JSON encoding micro-benchmark (no database needed)")
+        parser.add_argument("--startup", action="store_true",
+                            help="only measure batch-process cold start per settings module (no database needed)")
+        parser.add_argument("--budget-ms", type=float, default=startup.BUDGET_MS,
+                            help=f"with --startup: allowed median cold start of {startup.BATCH_SETTINGS} "
+                                 f"(default {startup.BUDGET_MS})")
+
+    def handle(self, *args, **options):
+        if options["serialization"]:
+            return self.handle_serialization(options)
+        if options["startup"]:
+            return self.handle_startup(options)
+        scales = [s.strip() for s in options["scales"].split(",") if s.strip()]
+        unknown = set(scales) - set(datasets.SCALES)
+        if unknown:
+            raise CommandError(f"unknown scale(s): {', '.join(sorted(unknown))}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = runner.run_suite(
+                scales, repeat=options["repeat"], warm_cache=options["warm_cache"],
+                flush=lambda: call_command("flush", interactive=False, verbosity=0),
+                log=self.stdout.write,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for scale, result in report["scales"].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{scale}]"))
+            for path, r in result["endpoints"].items():
+                style = str if r["ok"] else self.style.ERROR
+                self.stdout.write(style(f"  {path:40} {r['median_ms']:>9.2f}ms  {r['queries']:>4}q  {r['status']}"))
+            a = result["agent"]
+            self.stdout.write(f"  {'agent run':40} {a['median_ms']:>9.2f}ms  {a['queries']:>4}q")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                problems = runner.compare(report, json.load(f), options["threshold"])
+            if problems:
+                for p in problems:
+                    self.stdout.write(self.style.ERROR(p))
+                raise CommandError(f"{len(problems)} regression(s) vs baseline")
+            self.stdout.write(self.style.SUCCESS("No regressions vs baseline."))
+
+    def handle_serialization(self, options):
+        report = serialization.run(repeat=max(options["repeat"], 5))
+        for rows, results in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{rows} advice rows]"))
+            for name, r in results.items():
+                self.stdout.write(f"  {name:14} {r['median_ms']:>9.3f}ms  {r['bytes']:>9} bytes  "
+                                  f"{r['mb_per_s']:>7.1f} MB/s  x{r['speedup']}")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def handle_startup(self, options):
+        report = startup.run(repeat=options["repeat"])
+        for module, r in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{module}] {r['median_ms']:.1f}ms  heavy: {r['heavy_modules']}"))
+            for imp in r["slowest_imports"]:
+                self.stdout.write(f"  {imp['module']:50} {imp['ms']:>8.1f}ms")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+        problems = startup.check(report, options["budget_ms"])
+        if problems:
+            for p in problems:
+                self.stdout.write(self.style.ERROR(p))
+            raise CommandError(f"{len(problems)} startup problem(s)")
@@ -1,76 +1,35 @@
 # coach/management/commands/run_coach_agent.py
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from coach.group_a_client import get_daily_income
-from coach.models import CoachingSettings, AdviceCard
-from datetime import date, timedelta
-
-User = get_user_model()
+from coach import agent
 
 class Command(BaseCommand):
+    requires_system_checks = []  # started by cron/supervisors; `manage.py check` belongs in deploys
     help = "Run the lightweight coach agent to generate advice cards"
 
-    def handle(self, *args, **options):
-        users = User.objects.all()
-        for u in users:
-            try:
-                settings, _ = CoachingSettings.objects.get_or_create(user=u)
-                daily = get_daily_income(u)
-                if not daily:
-                    continue
-
-                # sorted totals
-                items = sorted(daily.items(), key=lambda x: x[0])
-                totals = [v for (_, v) in items]
-                last7 = totals[-7:] if len(totals) >= 7 else totals
-                if not last7:
-                    continue
-                avg7 = sum(last7) / len(last7)
-
-                # low income advice
-                if avg7 < settings.low_income_threshold:
-                    recent = AdviceCard.objects.filter(
-                        user=u, tag="low_income",
-                        created_at__gte=date.today() - timedelta(days=2)
-                    )
-                    if not recent.exists():
-                        AdviceCard.objects.create(
-                            user=u,
-                            title="Income is low recently",
-                            body=(f"Your average income over the last {len(last7)} days is "
-                                  f"{round(avg7,2)}, which is below your threshold of "
-                                  f"{settings.low_income_threshold}. Consider reducing discretionary expenses or building a buffer."),
-                            tag="low_income",
-                            meta={"avg7": round(avg7,2)}
-                        )
-
-                # expense ratio check (30-day window)
-                from accounts.models import Income, CashEntry
-                from django.db.models import Sum
-                since = date.today() - timedelta(days=30)
-                total_income = float(Income.objects.filter(user=u, date__gte=since).aggregate(Sum('amount'))['amount__sum'] or 0)
-                total_cash_income = float(CashEntry.objects.filter(user=u, is_income=True, date__gte=since).aggregate(Sum('amount'))['amount__sum'] or 0)
-                total_expenses = float(CashEntry.objects.filter(user=u, is_income=False, date__gte=since).aggregate(Sum('amount'))['amount__sum'] or 0)
-                net_income = total_income + total_cash_income
-
-                if net_income > 0:
-                    expense_ratio = total_expenses / net_income
-                    if expense_ratio > settings.high_expense_ratio:
-                        recent = AdviceCard.objects.filter(
-                            user=u, tag="high_expense",
-                            created_at__gte=date.today() - timedelta(days=3)
-                        )
-                        if not recent.exists():
-                            AdviceCard.objects.create(
-                                user=u,
-                                title="Your expenses are high",
-                                body=(f"Your spending is {round(expense_ratio*100,1)}% of your earnings over the last 30 days. "
-                                      "Try cutting non-essential spending or set a small weekly limit."),
-                                tag="high_expense",
-                                meta={"expense_ratio": round(expense_ratio,3)}
-                            )
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error for user {u.username}: {e}"))
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="users loaded per batch")
+        parser.add_argument("--profile", action="store_true", help="run under cProfile and print the hottest functions")
+        parser.add_argument("--profile-sort", default="cumulative", help="pstats sort key (default: cumulative)")
+        parser.add_argument("--profile-limit", type=int, default=30, help="number of pstats rows to print")
+        parser.add_argument("--profile-out", help="also dump raw cProfile stats to this file")
 
+    def handle(self, *args, **options):
+        if options["profile"]:
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            stats = profiler.runcall(agent.run, batch_size=options["batch_size"])
+            if options["profile_out"]:
+                profiler.dump_stats(options["profile_out"])
+            pstats.Stats(profiler, stream=self.stdout).sort_stats(options["profile_sort"]).print_stats(options["profile_limit"])
+        else:
+            stats = agent.run(batch_size=options["batch_size"])
+
+        for username, error in stats["errors"]:
+            self.stdout.write(self.style.ERROR(f"Error for user {username}: {error}"))
+        run = stats["run"]
+        phases = ", ".join(f"{k}={v:.3f}s" for k, v in run.phase_timings.items())
+        self.stdout.write(
+            f"Scanned {run.users_scanned} users ({run.users_evaluated} evaluated, {run.users_skipped} skipped), "
+            f"created {sum(run.cards_created.values())} cards, {run.query_count} queries in {run.duration:.3f}s [{phases}]")
         self.stdout.write(self.style.SUCCESS("Agent run completed."))
@@ -3,6 +3,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from accounts.models import Income, CashEntry
 from coach.models import SavedGoal, CoachingSettings
+from coach.provisioning import STARTER_GOALS
 from datetime import date, timedelta
 import random
 
@@ -45,8 +46,8 @@ class Command(BaseCommand):
                     desc = random.choice(["groceries","transport","coffee","bills","shopping"])
                     CashEntry.objects.create(user=u, description=desc, amount=amt, date=d, is_income=False)
 
-            SavedGoal.objects.get_or_create(user=u, name="Emergency fund", defaults={"target_amount": 5000})
-            SavedGoal.objects.get_or_create(user=u, name="Vacation", defaults={"target_amount": 1500})
+            for name, target in STARTER_GOALS:
+                SavedGoal.objects.get_or_create(user=u, name=name, defaults={"target_amount": target})
 
             self.stdout.write(self.style.SUCCESS(f"Seeded data for {u.username}"))
 
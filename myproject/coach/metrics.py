@@ -0,0 +1,199 @@
+# coach/metrics.py
+"""
+Per-view request metrics: SQL query count, DB time, cache hits/misses and
+total latency. Collected by coach.middleware.RequestMetricsMiddleware,
+aggregated per process into histograms and exposed at /coach/metrics/ in
+Prometheus text format.
+
+Views declare a query budget with @query_budget(n) (or via the
+COACH_QUERY_BUDGETS setting, keyed by dotted view path). Exceeding it logs a
+warning, and raises QueryBudgetExceeded when COACH_QUERY_BUDGET_STRICT is on
+(QueryBudgetTest turns it on for every budgeted view).
+
+/coach/metrics/ is open to staff sessions and to scrapers presenting
+COACH_METRICS_TOKEN as a bearer token.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# innermost stats being measured (cache hits/misses), and every open
+# track_queries block (SQL); context variables so they follow the request into
+# sync_to_async worker threads under ASGI
+_current = ContextVar("coach_request_stats", default=None)
+_active = ContextVar("coach_active_stats", default=())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL queries a view may run."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Installed on every connection: counts each query into the stats active in this context."""
+    active = _active.get()
+    if not active:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for stats in active:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+
+def install_execute_wrapper(connection, **kwargs):
+    """connection_created receiver (also applied to open connections by track_queries)."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def current_stats():
+    return _current.get()
+
+
+def record_cache(hit, n=1):
+    """Count cache hits/misses against the request being measured (if any)."""
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += n
+        else:
+            stats.cache_misses += n
+
+
+class track_queries:
+    """
+    Context manager: count queries/DB time run in this context (on any
+    connection, including ones opened by sync_to_async threads) into `stats`.
+    Nested blocks each see their own and their children's queries.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats or RequestStats()
+
+    def __enter__(self):
+        for conn in connections.all():
+            install_execute_wrapper(conn)
+        self._tokens = (_current.set(self.stats), _active.set(_active.get() + (self.stats,)))
+        return self.stats
+
+    def __exit__(self, *exc):
+        _current.reset(self._tokens[0])
+        _active.reset(self._tokens[1])
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Registry:
+    """Process-wide aggregation of request metrics, keyed by view path."""
+
+    HISTOGRAMS = (
+        ("coach_request_duration_seconds", "Total request latency per view.", LATENCY_BUCKETS),
+        ("coach_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS),
+        ("coach_request_queries", "SQL queries per request.", QUERY_BUCKETS),
+    )
+    COUNTERS = (
+        ("coach_cache_hits_total", "Cache hits."),
+        ("coach_cache_misses_total", "Cache misses."),
+        ("coach_query_budget_exceeded_total", "Requests that exceeded their view's query budget."),
+        ("coach_throttled_total", "Requests rejected by the per-user rate limit."),
+        ("coach_coalesced_total", "Requests served by a concurrent identical request's computation."),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {name: {} for name, _, _ in self.HISTOGRAMS}
+        self.counters = {name: {} for name, _ in self.COUNTERS}
+
+    def _hist(self, name, view):
+        buckets = next(b for n, _, b in self.HISTOGRAMS if n == name)
+        return self.histograms[name].setdefault(view, Histogram(buckets))
+
+    def _inc(self, name, view, n=1):
+        self.counters[name][view] = self.counters[name].get(view, 0) + n
+
+    def observe(self, view, duration, stats, over_budget=False):
+        with self._lock:
+            self._hist("coach_request_duration_seconds", view).observe(duration)
+            self._hist("coach_request_db_seconds", view).observe(stats.db_time)
+            self._hist("coach_request_queries", view).observe(stats.queries)
+            self._inc("coach_cache_hits_total", view, stats.cache_hits)
+            self._inc("coach_cache_misses_total", view, stats.cache_misses)
+            if over_budget:
+                self._inc("coach_query_budget_exceeded_total", view)
+
+    def count(self, name, view, n=1):
+        with self._lock:
+            self._inc(name, view, n)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, help_text, _ in self.HISTOGRAMS:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for view, hist in sorted(self.histograms[name].items()):
+                    lines += hist.render(name, f'view="{view}"')
+            for name, help_text in self.COUNTERS:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for view, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{{view="{view}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
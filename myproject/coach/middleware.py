@@ -0,0 +1,70 @@
+# coach/middleware.py
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import REGISTRY, QueryBudgetExceeded, track_queries
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request (queries, DB time, cache hits/misses, latency),
+    reports it in a Server-Timing header, feeds the /coach/metrics/ histograms
+    and enforces per-view query budgets (see coach/metrics.py).
+    Keep it first in MIDDLEWARE so the latency covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # ASGI: sync views run in a worker thread but inherit the context, so
+        # track_queries still sees their queries. For streaming responses this
+        # measures time to the first byte, not the life of the stream.
+        start = time.perf_counter()
+        with track_queries() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def finish(self, request, response, stats, duration):
+        match = getattr(request, "resolver_match", None)
+        view = match._func_path if match else "unresolved"
+        budget = getattr(request, "_query_budget", None)
+        if budget is None:
+            budget = getattr(settings, "COACH_QUERY_BUDGETS", {}).get(view)
+        over_budget = budget is not None and stats.queries > budget
+        REGISTRY.observe(view, duration, stats, over_budget)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            f'cache;desc="hits={stats.cache_hits} misses={stats.cache_misses}"',
+            f"total;dur={duration * 1000:.1f}",
+        ])
+        if over_budget:
+            msg = f"{view} ran {stats.queries} queries (budget {budget})"
+            logger.warning("query budget exceeded: %s", msg)
+            if getattr(settings, "COACH_QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(msg)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = getattr(view_func, "query_budget", None)
+        return None
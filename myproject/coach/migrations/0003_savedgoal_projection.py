@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0002_coachingsettings_high_expense_ratio_advicecard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedgoal',
+            name='projected_completion',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedgoal',
+            name='projection_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
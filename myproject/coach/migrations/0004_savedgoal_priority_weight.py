@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0003_savedgoal_projection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedgoal',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='savedgoal',
+            name='weight',
+            field=models.FloatField(default=1),
+        ),
+    ]
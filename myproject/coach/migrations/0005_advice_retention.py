@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0004_savedgoal_priority_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdviceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('by_tag', models.JSONField(default=dict)),
+                ('first_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAdviceCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('tag', models.CharField(blank=True, max_length=50)),
+                ('created_at', models.DateTimeField()),
+                ('read', models.BooleanField(default=False)),
+                ('meta', models.JSONField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='advicecard',
+            index=models.Index(fields=['user', '-created_at'], name='coach_advic_user_id_da61d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='advicecard',
+            index=models.Index(fields=['user', 'tag', 'created_at'], name='coach_advic_user_id_7136bd_idx'),
+        ),
+        migrations.AddField(
+            model_name='advicesummary',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedadvicecard',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedadvicecard',
+            index=models.Index(fields=['user', '-created_at'], name='coach_archi_user_id_eab375_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0005_advice_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advicecard',
+            name='dedup_key',
+            field=models.CharField(blank=True, max_length=120, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='advicecard',
+            constraint=models.UniqueConstraint(fields=('dedup_key',), name='advicecard_unique_dedup_key'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0007_pendingevaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigger', models.CharField(choices=[('command', 'Command'), ('queue', 'Queue')], default='command', max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('users_scanned', models.PositiveIntegerField(default=0)),
+                ('users_evaluated', models.PositiveIntegerField(default=0)),
+                ('users_skipped', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('cards_created', models.JSONField(default=dict)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('phase_timings', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:28
+
+import accounts.fields
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+FIELDS = {"CoachingSettings": ["low_income_threshold"], "SavedGoal": ["target_amount", "current_amount"]}
+
+
+def scale(factor):
+    # runs while the columns are still REAL (forwards) / again REAL (backwards)
+    def apply(apps, schema_editor):
+        for model_name, fields in FIELDS.items():
+            model = apps.get_model("coach", model_name)
+            if factor > 1:
+                model.objects.update(**{f: Round(F(f) * factor) for f in fields})
+            else:
+                model.objects.update(**{f: F(f) * factor for f in fields})
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0008_agentrun'),
+    ]
+
+    operations = [
+        migrations.RunPython(scale(100), scale(0.01)),
+        migrations.AlterField(
+            model_name='coachingsettings',
+            name='low_income_threshold',
+            field=accounts.fields.MoneyField(default=300),
+        ),
+        migrations.AlterField(
+            model_name='savedgoal',
+            name='current_amount',
+            field=accounts.fields.MoneyField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='savedgoal',
+            name='target_amount',
+            field=accounts.fields.MoneyField(),
+        ),
+    ]
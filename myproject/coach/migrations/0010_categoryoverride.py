@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0009_money_cents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('category', models.PositiveSmallIntegerField(choices=[(0, 'Uncategorized'), (1, 'Groceries'), (2, 'Transport'), (3, 'Eating out & coffee'), (4, 'Bills & utilities'), (5, 'Shopping'), (6, 'Health'), (7, 'Rent & housing'), (8, 'Entertainment'), (9, 'Education'), (10, 'Income')])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'description'), name='categoryoverride_unique_user_description')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import accounts.fields
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0010_categoryoverride'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', accounts.fields.MoneyField()),
+                ('date', models.DateField(default=datetime.date.today)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('goal', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='coach.savedgoal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='coach_goalc_user_id_e2ac72_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('month', 'Month'), ('week', 'ISO week')], max_length=10)),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('income', accounts.fields.MoneyField(default=0)),
+                ('income_by_type', models.JSONField(default=dict)),
+                ('cash_income', accounts.fields.MoneyField(default=0)),
+                ('expenses', accounts.fields.MoneyField(default=0)),
+                ('expenses_by_category', models.JSONField(default=dict)),
+                ('goal_contributions', accounts.fields.MoneyField(default=0)),
+                ('goal_deltas', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'start'), name='periodsnapshot_unique_user_period_start')],
+            },
+        ),
+    ]
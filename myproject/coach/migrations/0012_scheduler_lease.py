@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0011_period_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('owner', models.CharField(max_length=255)),
+                ('acquired_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='agentrun',
+            name='trigger',
+            field=models.CharField(choices=[('command', 'Command'), ('queue', 'Queue'), ('scheduler', 'Scheduler')], default='command', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0012_scheduler_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advicecard',
+            index=models.Index(fields=['created_at'], name='advicecard_created_at'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:05
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# dedup windows of coach.agent when the keys were introduced (days)
+WINDOWS = {"low_income": 2, "high_expense": 3}
+
+
+def backfill(apps, schema_editor):
+    """
+    Cards from before 0006 have no dedup_key, so the first agent run after the
+    deploy would issue them again. Give the newest card per user + tag that is
+    still inside its window the key of the current bucket (coach.models.make_dedup_key).
+    """
+    AdviceCard = apps.get_model("coach", "AdviceCard")
+    now = timezone.now()
+    taken = set(AdviceCard.objects.exclude(dedup_key=None).values_list("dedup_key", flat=True))
+    for tag, days in WINDOWS.items():
+        bucket = int(now.timestamp() // (days * 86400))
+        cards, seen = [], set()
+        recent = (AdviceCard.objects.filter(tag=tag, dedup_key=None, created_at__gte=now - timedelta(days=days))
+                  .order_by("user_id", "-created_at").only("id", "user_id"))
+        for card in recent.iterator():
+            key = f"{card.user_id}:{tag}:{days}d:{bucket}"
+            if card.user_id in seen or key in taken:
+                continue
+            seen.add(card.user_id)
+            card.dedup_key = key
+            cards.append(card)
+        AdviceCard.objects.bulk_update(cards, ["dedup_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0013_advicecard_created_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
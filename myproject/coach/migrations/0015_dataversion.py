@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('coach', '0014_backfill_advicecard_dedup_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('ledger', models.BigIntegerField(default=0)),
+                ('goals', models.BigIntegerField(default=0)),
+                ('settings', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
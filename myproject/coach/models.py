@@ -1,38 +1,100 @@
 # coach/models.py
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import date
+
+from accounts.fields import MoneyField
+from accounts.models import Category
+from .metrics import record_cache
+
+SETTINGS_CACHE_TIMEOUT = 60  # seconds (COACH_SETTINGS_CACHE_SECONDS); entries are also dropped on save/delete
 
 class CoachingSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    low_income_threshold = models.FloatField(default=300)
+    low_income_threshold = MoneyField(default=300)
     notifications_enabled = models.BooleanField(default=True)
     high_expense_ratio = models.FloatField(default=0.6)  # if expense / income > this, warn
 
     def __str__(self):
         return f"Settings for {self.user.username}"
 
+    @staticmethod
+    def cache_key(user_id):
+        return f"coach_settings:{user_id}"
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Read-through cached settings; unsaved defaults if the user has no row."""
+        return settings_for([user_id])[user_id]
+
+
+def settings_for(user_ids, cached=True):
+    """
+    Bulk settings loader: {user_id: CoachingSettings}. Served from the cache where
+    possible, one query for the misses. Users without a row get an unsaved
+    instance with the default values -- nothing is written.
+
+    A save drops the entry only in the cache of the process that saved it, so
+    with a per-process cache other workers can serve old settings for up to
+    COACH_SETTINGS_CACHE_SECONDS. Batch callers pass cached=False: one query
+    for the whole batch, and the entries are refreshed.
+    """
+    keys = {CoachingSettings.cache_key(uid): uid for uid in user_ids}
+    found = {keys[k]: v for k, v in cache.get_many(keys).items()} if cached else {}
+    missing = [uid for uid in keys.values() if uid not in found]
+    record_cache(True, len(found))
+    record_cache(False, len(missing))
+    if missing:
+        loaded = {s.user_id: s for s in CoachingSettings.objects.filter(user_id__in=missing)}
+        for uid in missing:
+            found[uid] = loaded.get(uid) or CoachingSettings(user_id=uid)
+        cache.set_many({CoachingSettings.cache_key(uid): found[uid] for uid in missing},
+                       getattr(settings, "COACH_SETTINGS_CACHE_SECONDS", SETTINGS_CACHE_TIMEOUT))
+    return found
+
 
 class SavedGoal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
-    target_amount = models.FloatField()
-    current_amount = models.FloatField(default=0)
+    target_amount = MoneyField()
+    current_amount = MoneyField(default=0)
     deadline = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # used when allocating a lump sum across goals (lower priority value is funded first)
+    priority = models.PositiveSmallIntegerField(default=0)
+    weight = models.FloatField(default=1)
+    # filled by coach.goals from the user's recent net-savings rate
+    projected_completion = models.DateField(null=True, blank=True)
+    projection_updated_at = models.DateTimeField(null=True, blank=True)
 
     def progress(self):
         if self.target_amount <= 0:
             return 0
-        return (self.current_amount / self.target_amount) * 100
+        return float(self.current_amount / self.target_amount * 100)
 
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
 
+def make_dedup_key(user_id, tag, window_days, now=None):
+    """
+    Deterministic key for "one card per user + tag per window": the window is a
+    fixed time bucket of `window_days`, so every agent run inside the same bucket
+    produces the same key and the unique constraint rejects the duplicate.
+    Unlike a rolling window, a card issued at the end of one bucket doesn't
+    hold back the next card at the start of the following bucket.
+    """
+    bucket = int((now or timezone.now()).timestamp() // (window_days * 86400))
+    return f"{user_id}:{tag}:{window_days}d:{bucket}"
+
+
 class AdviceCard(models.Model):
     """
     A generated advice card (rule-based). Stored so frontend can show cards,
-    and agent can avoid duplicates (by tag + user + recent timestamp).
+    and agent can avoid duplicates (unique dedup_key, see make_dedup_key).
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -41,9 +103,203 @@ class AdviceCard(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
     meta = models.JSONField(null=True, blank=True)
+    dedup_key = models.CharField(max_length=120, null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], name='advicecard_unique_dedup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'tag', 'created_at']),
+            models.Index(fields=['created_at'], name='advicecard_created_at'),  # admin date hierarchy
+        ]
 
     def __str__(self):
         return f"[{self.user.username}] {self.title}"
+
+
+class ArchivedAdviceCard(models.Model):
+    """
+    Cold storage for advice cards pruned by coach.retention (mode "archive").
+    Keeps the original id so archived cards can be traced back.
+    """
+    original_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    tag = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField()
+    read = models.BooleanField(default=False)
+    meta = models.JSONField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
+    def __str__(self):
+        return f"[archived][{self.user.username}] {self.title}"
+
+
+class AdviceSummary(models.Model):
+    """
+    Per-user roll-up of pruned advice cards (mode "summarize"):
+    how many cards were compacted, per tag, and the period they covered.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    total = models.PositiveIntegerField(default=0)
+    by_tag = models.JSONField(default=dict)
+    first_created_at = models.DateTimeField(null=True, blank=True)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Advice summary for {self.user.username} ({self.total} cards)"
+
+
+class PendingEvaluation(models.Model):
+    """
+    DB-backed queue of users whose ledger changed and need advice re-evaluated.
+    One row per user: repeated writes only push run_after back (debounce), so a
+    bulk import coalesces into a single evaluation. See coach/queue.py.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Pending evaluation for user {self.user_id} after {self.run_after}"
+
+
+class AgentRun(models.Model):
+    """One execution of the advice agent (command/scheduler sweep or queue drain)."""
+    TRIGGER_CHOICES = (
+        ('command', 'Command'),
+        ('queue', 'Queue'),
+        ('scheduler', 'Scheduler'),
+    )
+
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='command')
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    users_scanned = models.PositiveIntegerField(default=0)
+    users_evaluated = models.PositiveIntegerField(default=0)
+    users_skipped = models.PositiveIntegerField(default=0)  # no income data
+    errors = models.PositiveIntegerField(default=0)
+    cards_created = models.JSONField(default=dict)          # {tag: count}
+    query_count = models.PositiveIntegerField(default=0)
+    phase_timings = models.JSONField(default=dict)          # {"load": s, "evaluate": s, "write": s}
+
+    class Meta:
+        ordering = ['-started_at']
+
+    @property
+    def duration(self):
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def __str__(self):
+        return f"Agent run {self.started_at:%Y-%m-%d %H:%M} ({self.trigger})"
+
+
+class CategoryOverride(models.Model):
+    """
+    A user's own category for a (normalized) cash entry description; takes
+    precedence over the built-in rules in coach.categorize.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    description = models.CharField(max_length=255)  # coach.categorize.normalize() form
+    category = models.PositiveSmallIntegerField(choices=Category.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'description'], name='categoryoverride_unique_user_description'),
+        ]
+
+    def __str__(self):
+        return f"{self.description!r} -> {self.get_category_display()} ({self.user.username})"
+
+
+class GoalContribution(models.Model):
+    """
+    One change to a goal's current_amount (signed), recorded by the goal
+    endpoints so statements can report what went into goals per period.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    goal = models.ForeignKey(SavedGoal, null=True, on_delete=models.SET_NULL)  # history outlives the goal
+    amount = MoneyField()
+    date = models.DateField(default=date.today)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'date'])]
+
+    def __str__(self):
+        return f"{self.amount:+} to goal {self.goal_id} on {self.date}"
+
+
+class PeriodSnapshot(models.Model):
+    """
+    Frozen statement of one closed period (calendar month or ISO week) for a
+    user, built by coach/reports.py. Amount breakdowns are stored as integer
+    cents; the open period is never stored.
+    """
+    MONTH = 'month'
+    WEEK = 'week'
+    PERIOD_CHOICES = (
+        (MONTH, 'Month'),
+        (WEEK, 'ISO week'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    end = models.DateField()  # exclusive
+    income = MoneyField(default=0)
+    income_by_type = models.JSONField(default=dict)         # {income_type: cents}
+    cash_income = MoneyField(default=0)
+    expenses = MoneyField(default=0)
+    expenses_by_category = models.JSONField(default=dict)   # {category slug: cents}
+    goal_contributions = MoneyField(default=0)
+    goal_deltas = models.JSONField(default=dict)            # {goal id: cents}
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'start'], name='periodsnapshot_unique_user_period_start'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_period_display()} from {self.start} for {self.user.username}"
+
+
+class SchedulerLease(models.Model):
+    """
+    Named lease held by the running coach_scheduler process (coach/scheduler.py).
+    Only the holder runs jobs; it renews the lease while alive, and a standby
+    process takes over once it expires.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    owner = models.CharField(max_length=255)  # host:pid:random
+    acquired_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} held by {self.owner} until {self.expires_at}"
+
+
+class DataVersion(models.Model):
+    """
+    Per-user data versions (coach/versions.py): one counter per kind of data,
+    bumped in the same transaction as the write. ETags and cached per-user
+    snapshots are validated against it, so every process sees every write.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    ledger = models.BigIntegerField(default=0)
+    goals = models.BigIntegerField(default=0)
+    settings = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Versions of user {self.user_id}: {self.ledger}/{self.goals}/{self.settings}"
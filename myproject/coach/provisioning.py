@@ -0,0 +1,166 @@
+# coach/provisioning.py
+"""
+Bulk user provisioning for partner integrations (POST /coach/provision/,
+`manage.py provision_users`).
+
+Each user gets a CoachingSettings row and the starter goals up front, instead
+of picking them up later through scattered get_or_create calls. Nearly all
+of the cost of creating a user is the full-strength password hash, and it is
+done before the transaction opens. The write lock is then held only for
+three bulk_creates per batch (users, settings, goals). It is a single
+transaction, so a failed import leaves nothing behind.
+
+Hashing is CPU-bound. The management command spreads it over a process pool
+(COACH_PROVISION_WORKERS, default: all cores). The API hashes inline: a web
+worker must not fork a pool, so a request is capped at
+COACH_PROVISION_MAX_USERS (a few hundred); larger imports go through the
+command.
+
+The input is validated before anything is hashed. Usernames must be valid
+and unique, and a username that already exists is an error unless
+skip_existing is set. provision() returns per-batch timings and throughput.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import CoachingSettings, SavedGoal
+from .queue import enqueue_evaluation
+
+User = get_user_model()
+
+STARTER_GOALS = [("Emergency fund", 5000), ("Vacation", 1500)]
+BATCH_SIZE = 500
+MAX_USERS = 200
+_INLINE_HASHES = 8  # below this a pool costs more than it saves
+
+
+def max_users():
+    """Largest import accepted per API request (COACH_PROVISION_MAX_USERS); the API hashes inline."""
+    return getattr(settings, "COACH_PROVISION_MAX_USERS", MAX_USERS)
+
+
+def default_workers():
+    """Hashing processes for the management command (COACH_PROVISION_WORKERS, default: all cores)."""
+    return getattr(settings, "COACH_PROVISION_WORKERS", None) or os.cpu_count() or 1
+
+
+class ProvisioningError(ValueError):
+    """Invalid input; `problems` is [(row index, message)]."""
+
+    def __init__(self, problems):
+        super().__init__(f"{len(problems)} invalid rows")
+        self.problems = problems
+
+
+def validate(rows, skip_existing=False):
+    """Normalized [{"username", "email", "password"}] to create, skipped usernames. Raises ProvisioningError."""
+    problems, seen, clean = [], set(), []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            problems.append((i, "not an object"))
+            continue
+        username, email = str(row.get("username") or "").strip(), str(row.get("email") or "").strip()
+        try:
+            if not username:
+                raise ValidationError("username is required")
+            User.username_validator(username)
+            if len(username) > User._meta.get_field("username").max_length:
+                raise ValidationError("username is too long")
+            if email:
+                validate_email(email)
+        except ValidationError as e:
+            problems.append((i, "; ".join(e.messages)))
+            continue
+        if username in seen:
+            problems.append((i, f"duplicate username {username!r}"))
+            continue
+        seen.add(username)
+        clean.append((i, {"username": username, "email": email, "password": row.get("password") or None}))
+
+    existing = set()
+    names = [r["username"] for _, r in clean]
+    for start in range(0, len(names), 1000):
+        existing.update(User.objects.filter(username__in=names[start:start + 1000]).values_list("username", flat=True))
+    if existing and not skip_existing:
+        problems += [(i, f"username {r['username']!r} is taken") for i, r in clean if r["username"] in existing]
+    if problems:
+        raise ProvisioningError(sorted(problems))
+    return [r for _, r in clean if r["username"] not in existing], sorted(existing)
+
+
+def _init_worker():
+    import django
+    django.setup()  # no-op under fork; spawn/forkserver workers need the settings
+
+
+def _hash_batch(passwords):
+    # no password: unusable hash, the partner signs the user in some other way
+    return [make_password(p) for p in passwords]
+
+
+def _hashed_batches(batches, workers):
+    """Yield (hashes, seconds waited) per batch; every batch is queued at once, so workers never idle."""
+    if workers <= 1 or sum(len(b) for b in batches) < _INLINE_HASHES:
+        for batch in batches:
+            t = time.perf_counter()
+            yield _hash_batch([r["password"] for r in batch]), time.perf_counter() - t
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        # split each batch over the workers so one batch keeps every core busy
+        pending = []
+        for batch in batches:
+            passwords = [r["password"] for r in batch]
+            step = -(-len(passwords) // workers)
+            pending.append([pool.submit(_hash_batch, passwords[i:i + step]) for i in range(0, len(passwords), step)])
+        for futures in pending:
+            t = time.perf_counter()
+            hashes = [h for f in futures for h in f.result()]
+            yield hashes, time.perf_counter() - t
+
+
+def provision(rows, starter_goals=True, skip_existing=False, batch_size=None, workers=1):
+    """
+    Create users with their settings and starter goals, hashing passwords in
+    `workers` processes (1: inline). Returns
+    {"created": n, "skipped": [username], "users": {username: id}, "batches": [...], "seconds": s}.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    started = time.perf_counter()
+    rows, skipped = validate(rows, skip_existing)
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    report = {"created": 0, "skipped": skipped, "users": {}, "batches": []}
+
+    hashed = list(_hashed_batches(batches, workers))  # outside the transaction: keeps the write lock short
+    with transaction.atomic():
+        for n, (batch, (hashes, hash_wait)) in enumerate(zip(batches, hashed)):
+            t = time.perf_counter()
+            User.objects.bulk_create([User(username=r["username"], email=r["email"], password=h)
+                                      for r, h in zip(batch, hashes)])
+            # re-read ids: not every backend returns them from bulk_create
+            ids = dict(User.objects.filter(username__in=[r["username"] for r in batch])
+                       .values_list("username", "id"))
+            CoachingSettings.objects.bulk_create([CoachingSettings(user_id=uid) for uid in ids.values()])
+            if starter_goals:
+                SavedGoal.objects.bulk_create([SavedGoal(user_id=uid, name=name, target_amount=target)
+                                               for uid in ids.values() for name, target in STARTER_GOALS])
+            write = time.perf_counter() - t
+            report["users"].update(ids)
+            report["created"] += len(batch)
+            report["batches"].append({
+                "batch": n,
+                "users": len(batch),
+                "hash_wait_seconds": round(hash_wait, 4),
+                "write_seconds": round(write, 4),
+                "users_per_second": round(len(batch) / max(hash_wait + write, 1e-9), 1),  # hashing + writing
+            })
+        enqueue_evaluation(*report["users"].values())  # bulk_create sends no signals
+    report["seconds"] = round(time.perf_counter() - started, 4)
+    return report
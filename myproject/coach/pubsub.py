@@ -0,0 +1,91 @@
+# coach/pubsub.py
+"""
+In-process publish/subscribe used to push advice to connected stream clients
+(coach/stream.py).
+
+Subscriptions live on the event loop serving the connection; publish() may be
+called from any thread (sync views, the agent) and hands messages over with
+call_soon_threadsafe. Each subscription has a small bounded queue: a client
+that stops reading loses its oldest messages rather than growing memory.
+
+This is deliberately a local stand-in for a broker. Writers in *other*
+processes (cron agent, drain_advice_queue) are picked up by the stream's
+database poller instead.
+"""
+import asyncio
+import threading
+
+QUEUE_SIZE = 100
+
+# AdviceCard values() published as "advice" events (same shape as /coach/advice/ plus user_id)
+CARD_FIELDS = ("id", "user_id", "title", "body", "tag", "created_at", "read", "meta")
+
+
+class Subscription:
+    __slots__ = ("user_id", "loop", "queue")
+
+    def __init__(self, user_id, loop, maxsize=QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def _put(self, message):
+        # runs on self.loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}  # user_id -> set of Subscription
+
+    def subscribe(self, user_id):
+        """Register a subscription on the running event loop."""
+        sub = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def user_ids(self):
+        with self._lock:
+            return set(self._subs)
+
+    def publish(self, user_id, event, data):
+        """Deliver (event, data) to every subscription of the user. Returns how many."""
+        with self._lock:
+            subs = list(self._subs.get(user_id, ()))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for sub in subs:
+            if sub.loop is running:
+                sub._put((event, data))
+            else:
+                try:
+                    sub.loop.call_soon_threadsafe(sub._put, (event, data))
+                except RuntimeError:  # loop already closed; its subscriptions are going away
+                    pass
+        return len(subs)
+
+
+broker = Broker()
+
+
+def publish_cards(rows):
+    """Push new card rows (CARD_FIELDS values() dicts) to this process's subscribers."""
+    for row in rows:
+        broker.publish(row["user_id"], "advice", row)
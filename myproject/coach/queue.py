@@ -0,0 +1,65 @@
+# coach/queue.py
+"""
+Near-real-time advice: ledger writes enqueue a per-user evaluation which a
+local worker (`manage.py drain_advice_queue`) picks up.
+
+Writes are debounced: each enqueue pushes the user's run_after to
+now + COACH_EVAL_DEBOUNCE_SECONDS, and a user is evaluated once things go
+quiet, or at the latest COACH_EVAL_MAX_WAIT_SECONDS after the first request.
+bulk_create() and update() send no signals, so bulk writers (generate_load_data,
+provisioning) call enqueue_evaluation() themselves, once per batch of users.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PendingEvaluation
+
+
+def _debounce():
+    return timedelta(seconds=getattr(settings, "COACH_EVAL_DEBOUNCE_SECONDS", 30))
+
+
+def _max_wait():
+    return timedelta(seconds=getattr(settings, "COACH_EVAL_MAX_WAIT_SECONDS", 300))
+
+
+def enqueue_evaluation(*user_ids):
+    """Request (or re-debounce) an evaluation for the given users with one upsert."""
+    run_after = timezone.now() + _debounce()
+    PendingEvaluation.objects.bulk_create(
+        [PendingEvaluation(user_id=uid, run_after=run_after) for uid in set(user_ids)],
+        update_conflicts=True, unique_fields=["user"], update_fields=["run_after"],
+    )
+
+
+def _due(now):
+    return Q(run_after__lte=now) | Q(requested_at__lte=now - _max_wait())
+
+
+def claim_due(limit=500, now=None):
+    """Remove up to `limit` due requests from the queue and return their user ids."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(PendingEvaluation.objects.filter(_due(now)).order_by("run_after")
+                    .values_list("id", "user_id")[:limit])
+        # re-check due-ness on delete: a request re-debounced meanwhile stays queued
+        PendingEvaluation.objects.filter(_due(now), id__in=[pk for pk, _ in rows]).delete()
+    return [uid for _, uid in rows]
+
+
+def drain(limit=500, now=None):
+    """Evaluate every due user (in chunks of `limit`). Returns the summed agent stats."""
+    from . import agent  # not at import: signals load this module for enqueue_evaluation()
+    totals = {"users": 0, "cards": 0, "errors": []}
+    while True:
+        user_ids = claim_due(limit, now)
+        if not user_ids:
+            return totals
+        stats = agent.run(user_ids, trigger="queue")
+        totals["users"] += stats["users"]
+        totals["cards"] += stats["cards"]
+        totals["errors"] += stats["errors"]
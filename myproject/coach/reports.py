@@ -0,0 +1,195 @@
+# coach/reports.py
+"""
+Period statements: calendar months and ISO weeks.
+
+A statement covers income by type, cash income, expenses by category, net
+and goal contributions for one period. A closed period is computed once and
+frozen in a PeriodSnapshot; only the current, open period is recomputed on
+request. Whatever changes a closed period drops its snapshot, and the next
+read recomputes it: a backdated write, an edit (both the old and the new
+date, see invalidate()) and a re-categorization (invalidate_span()). A 24-month trend is one indexed read of
+stored rows plus three grouped queries over the open month, instead of a scan
+of two years of ledger.
+
+Goal deltas come from GoalContribution rows, i.e. changes made through the
+goal endpoints.
+
+All arithmetic is in integer cents; statement() converts at the edge.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from accounts.fields import SumCents, as_units, from_cents, to_cents
+from accounts.models import Income, CashEntry
+from .categorize import slug
+from .models import GoalContribution, PeriodSnapshot
+
+MONTH = PeriodSnapshot.MONTH
+WEEK = PeriodSnapshot.WEEK
+MAX_PERIODS = 60
+
+_TRUNC = {MONTH: TruncMonth, WEEK: TruncWeek}
+
+
+def period_start(period, day):
+    """First day of the month / Monday of the ISO week containing `day`."""
+    if period == MONTH:
+        return day.replace(day=1)
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"unknown period {period!r}")
+
+
+def next_start(period, start):
+    if period == MONTH:
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=7)
+
+
+def recent_starts(period, count, today=None):
+    """Starts of the last `count` periods, oldest first; the last one is the open period."""
+    start = period_start(period, today or date.today())
+    starts = [start]
+    for _ in range(count - 1):
+        start = period_start(period, start - timedelta(days=1))
+        starts.append(start)
+    return starts[::-1]
+
+
+def label(period, start):
+    if period == MONTH:
+        return start.strftime("%Y-%m")
+    year, week, _ = start.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def compute(user_ids, period, starts):
+    """
+    Unsaved PeriodSnapshots for every (user, start) pair. Three grouped
+    queries over the covered date range, whatever the number of users/periods.
+    """
+    user_ids = list(user_ids)
+    bucket = _TRUNC[period]("date")
+    window = {"user_id__in": user_ids, "date__gte": min(starts), "date__lt": next_start(period, max(starts))}
+    totals = {(uid, s): {"income": {}, "cash_income": 0, "expenses": {}, "goals": {}}
+              for uid in user_ids for s in starts}
+
+    for row in (Income.objects.filter(**window)
+                .values("user_id", "income_type", start=bucket).annotate(total=SumCents("amount"))):
+        t = totals.get((row["user_id"], row["start"]))
+        if t is not None:
+            t["income"][row["income_type"] or "other"] = row["total"]
+
+    for row in (CashEntry.objects.filter(**window)
+                .values("user_id", "is_income", "category", start=bucket).annotate(total=SumCents("amount"))):
+        t = totals.get((row["user_id"], row["start"]))
+        if t is None:
+            continue
+        if row["is_income"]:
+            t["cash_income"] += row["total"]
+        else:
+            key = slug(row["category"])
+            t["expenses"][key] = t["expenses"].get(key, 0) + row["total"]
+
+    for row in (GoalContribution.objects.filter(**window)
+                .values("user_id", "goal_id", start=bucket).annotate(total=SumCents("amount"))):
+        t = totals.get((row["user_id"], row["start"]))
+        if t is not None:
+            key = str(row["goal_id"] or "deleted")
+            t["goals"][key] = t["goals"].get(key, 0) + row["total"]
+
+    return [
+        PeriodSnapshot(
+            user_id=uid, period=period, start=s, end=next_start(period, s),
+            income=from_cents(sum(t["income"].values())), income_by_type=t["income"],
+            cash_income=from_cents(t["cash_income"]),
+            expenses=from_cents(sum(t["expenses"].values())), expenses_by_category=t["expenses"],
+            goal_contributions=from_cents(sum(t["goals"].values())), goal_deltas=t["goals"],
+        )
+        for (uid, s), t in totals.items()
+    ]
+
+
+def snapshot_to_dict(snap, closed=True):
+    income, cash_income, expenses = to_cents(snap.income), to_cents(snap.cash_income), to_cents(snap.expenses)
+    return {
+        "period": snap.period,
+        "label": label(snap.period, snap.start),
+        "start": snap.start,
+        "end": snap.end - timedelta(days=1),  # inclusive for clients
+        "closed": closed,
+        "income": as_units(income),
+        "income_by_type": {k: as_units(v) for k, v in snap.income_by_type.items()},
+        "cash_income": as_units(cash_income),
+        "expenses": as_units(expenses),
+        "expenses_by_category": {k: as_units(v) for k, v in snap.expenses_by_category.items()},
+        "net": as_units(income + cash_income - expenses),
+        "goal_contributions": as_units(to_cents(snap.goal_contributions)),
+        "goal_deltas": {k: as_units(v) for k, v in snap.goal_deltas.items()},
+    }
+
+
+def statement(user_id, period, count, today=None):
+    """
+    The last `count` periods for one user, oldest first. Stored closed
+    periods are read back; missing ones are computed once and frozen, the
+    open period is computed every time.
+    """
+    starts = recent_starts(period, count, today)
+    open_start = starts[-1]
+    snaps = {s.start: s for s in PeriodSnapshot.objects.filter(
+        user_id=user_id, period=period, start__gte=starts[0], start__lt=open_start)}
+    missing = [s for s in starts if s not in snaps]
+    fresh = compute([user_id], period, missing)
+    PeriodSnapshot.objects.bulk_create([s for s in fresh if s.start != open_start], ignore_conflicts=True)
+    snaps.update((s.start, s) for s in fresh)
+    return [snapshot_to_dict(snaps[s], closed=s != open_start) for s in starts]
+
+
+def build_snapshots(user_ids, period, count, today=None):
+    """Freeze the last `count` closed periods for these users where missing. Returns how many were stored."""
+    starts = recent_starts(period, count + 1, today)[:-1]
+    have = set(PeriodSnapshot.objects.filter(user_id__in=user_ids, period=period, start__gte=starts[0])
+               .values_list("user_id", "start"))
+    fresh = [s for s in compute(user_ids, period, starts) if (s.user_id, s.start) not in have]
+    PeriodSnapshot.objects.bulk_create(fresh, batch_size=1000, ignore_conflicts=True)
+    return len(fresh)
+
+
+def build_all_snapshots(periods=(MONTH, WEEK), count=24, batch_size=200):
+    """build_snapshots() for every user, batch_size users at a time. Returns ({period: stored}, users)."""
+    user_ids = list(get_user_model().objects.order_by("id").values_list("id", flat=True))
+    stored = {}
+    for period in periods:
+        stored[period] = sum(build_snapshots(user_ids[i:i + batch_size], period, count)
+                             for i in range(0, len(user_ids), batch_size))
+    return stored, len(user_ids)
+
+
+def invalidate(user_id, *days, today=None):
+    """
+    Drop the frozen snapshots covering `days` after a ledger write. An edit
+    passes the entry's old and new date. No query if all of them fall in open
+    periods.
+    """
+    days = [date.fromisoformat(d) if isinstance(d, str) else d for d in days if d]
+    today = today or date.today()
+    closed = [d for d in days if d < max(period_start(MONTH, today), period_start(WEEK, today))]
+    if not closed:
+        return 0
+    covering = Q()
+    for day in set(closed):
+        covering |= Q(start__lte=day, end__gt=day)
+    deleted, _ = PeriodSnapshot.objects.filter(covering, user_id=user_id).delete()
+    return deleted
+
+
+def invalidate_span(user_ids, first, last):
+    """Drop the users' frozen snapshots overlapping [first, last], e.g. after re-categorizing entries."""
+    if first is None:
+        return 0
+    deleted, _ = PeriodSnapshot.objects.filter(user_id__in=user_ids, start__lte=last, end__gt=first).delete()
+    return deleted
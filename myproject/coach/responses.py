@@ -0,0 +1,79 @@
+# coach/responses.py
+"""
+JSON response layer for the coach API.
+
+FastJsonResponse encodes with orjson when it is installed and falls back to
+the stdlib encoder otherwise. Both produce the same bytes: dates/datetimes
+as DjangoJSONEncoder writes them, Decimal amounts as numbers, and non-ASCII
+text as raw UTF-8 (the stdlib encoder runs with ensure_ascii=False), so the
+encoder in use is invisible to clients and to anything cached. orjson only
+takes str dict keys; data with other keys goes through the stdlib encoder,
+which writes int keys as strings and rejects dates like json.dumps does.
+
+Querysets' values() rows can be passed straight in -- no per-field dict
+building in the view. Views that return large feeds are wrapped in
+django.views.decorators.gzip.gzip_page.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class CoachJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder, but money (Decimal) is written as a number."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        if isinstance(o, QuerySet):
+            return list(o)
+        return super().default(o)
+
+
+_encoder = CoachJSONEncoder()
+
+
+def _orjson_default(o):
+    # datetimes are the common case in feeds: same format as DjangoJSONEncoder, without its isinstance chain
+    if type(o) is datetime:
+        r = o.isoformat()
+        if o.microsecond:
+            r = r[:23] + r[26:]
+        if r.endswith("+00:00"):
+            r = r[:-6] + "Z"
+        return r
+    return _encoder.default(o)
+
+
+def dumps_stdlib(data):
+    return json.dumps(data, cls=CoachJSONEncoder, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(data):
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:  # e.g. a non-str dict key: encode (or fail) exactly as the stdlib does
+            pass
+    return dumps_stdlib(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in for JsonResponse(data) using dumps() above."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
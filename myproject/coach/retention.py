@@ -0,0 +1,120 @@
+# coach/retention.py
+"""
+Advice card retention.
+
+A card stays "hot" in AdviceCard if it is unread, among the user's newest
+`keep_last` cards, or younger than `keep_days`. Everything else is pruned
+according to `mode`:
+  - "archive":   copied to ArchivedAdviceCard, then deleted
+  - "summarize": folded into the user's AdviceSummary, then deleted
+  - "delete":    deleted
+Work is done in short transactions of at most `batch_size` rows so SQLite
+never holds the write lock for long.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import AdviceCard, ArchivedAdviceCard, AdviceSummary
+
+DEFAULT_POLICY = {
+    "keep_last": 50,
+    "keep_days": 30,
+    "mode": "archive",
+    "batch_size": 500,
+}
+MODES = ("archive", "summarize", "delete")
+
+CARD_FIELDS = ("id", "user_id", "title", "body", "tag", "created_at", "read", "meta")
+
+
+def get_policy(**overrides):
+    policy = dict(DEFAULT_POLICY)
+    policy.update(getattr(settings, "COACH_ADVICE_RETENTION", {}))
+    policy.update({k: v for k, v in overrides.items() if v is not None})
+    if policy["mode"] not in MODES:
+        raise ValueError(f"unknown retention mode {policy['mode']!r}")
+    return policy
+
+
+def prunable_ids(user_ids, policy, now=None):
+    """Ids of cards of `user_ids` that fall outside the hot set."""
+    cutoff = (now or timezone.now()) - timedelta(days=policy["keep_days"])
+    # rank over *all* of the user's cards, then apply read/age filters outside the window
+    beyond_last_n = (AdviceCard.objects.filter(user_id__in=user_ids)
+                     .annotate(rank=Window(RowNumber(), partition_by=[F("user_id")],
+                                           order_by=[F("created_at").desc(), F("id").desc()]))
+                     .filter(rank__gt=policy["keep_last"])
+                     .values("id"))
+    return list(AdviceCard.objects.filter(id__in=beyond_last_n, read=True, created_at__lt=cutoff)
+                .order_by("id").values_list("id", flat=True))
+
+
+def _archive(rows):
+    ArchivedAdviceCard.objects.bulk_create([
+        ArchivedAdviceCard(original_id=r["id"], user_id=r["user_id"], title=r["title"], body=r["body"],
+                           tag=r["tag"], created_at=r["created_at"], read=r["read"], meta=r["meta"])
+        for r in rows
+    ])
+
+
+def _summarize(rows):
+    existing = {s.user_id: s for s in AdviceSummary.objects.filter(user_id__in={r["user_id"] for r in rows})}
+    created = {}
+    for r in rows:
+        uid = r["user_id"]
+        s = existing.get(uid) or created.get(uid)
+        if s is None:
+            s = created[uid] = AdviceSummary(user_id=uid, by_tag={})
+        s.total += 1
+        tag = r["tag"] or "untagged"
+        s.by_tag[tag] = s.by_tag.get(tag, 0) + 1
+        if s.first_created_at is None or r["created_at"] < s.first_created_at:
+            s.first_created_at = r["created_at"]
+        if s.last_created_at is None or r["created_at"] > s.last_created_at:
+            s.last_created_at = r["created_at"]
+    if existing:
+        AdviceSummary.objects.bulk_update(
+            existing.values(), ["total", "by_tag", "first_created_at", "last_created_at", "updated_at"])
+    AdviceSummary.objects.bulk_create(created.values())
+
+
+def prune_batch(ids, mode):
+    """Move/compact/delete one batch of cards in its own short transaction."""
+    with transaction.atomic():
+        if mode != "delete":
+            rows = list(AdviceCard.objects.filter(id__in=ids).values(*CARD_FIELDS))
+            if mode == "archive":
+                _archive(rows)
+            else:
+                _summarize(rows)
+        deleted, _ = AdviceCard.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def prune_advice(policy=None, user_chunk=1000, pause=0.0, dry_run=False, now=None):
+    """
+    Apply the retention policy to every user with read cards older than keep_days.
+    Returns the number of cards pruned (or that would be, with dry_run).
+    """
+    policy = policy or get_policy()
+    cutoff = (now or timezone.now()) - timedelta(days=policy["keep_days"])
+    user_ids = list(AdviceCard.objects.filter(read=True, created_at__lt=cutoff)
+                    .values_list("user_id", flat=True).distinct().order_by("user_id"))
+    total = 0
+    batch_size = policy["batch_size"]
+    for i in range(0, len(user_ids), user_chunk):
+        ids = prunable_ids(user_ids[i:i + user_chunk], policy, now)
+        if dry_run:
+            total += len(ids)
+            continue
+        for j in range(0, len(ids), batch_size):
+            total += prune_batch(ids[j:j + batch_size], policy["mode"])
+            if pause:
+                time.sleep(pause)
+    return total
@@ -0,0 +1,226 @@
+# coach/scheduler.py
+"""
+Resident scheduler for the periodic coach jobs (`manage.py coach_scheduler`).
+
+Cron starts a fresh interpreter for every run and pays for Django setup, a
+new database connection and cold caches each time. This process is started
+once instead. Each job runs every `interval` seconds plus a random
+`jitter`, so jobs and deployments don't fire in lockstep. Between ticks the
+process keeps its database connection, the compiled categorization rules and
+the aggregate store map, so a sweep costs only its own work and sub-hourly
+cadences become cheap.
+
+It does not keep a per-process cache (LocMemCache) between jobs: a web
+worker's save clears only its own copy, so cached settings and category
+overrides would never refresh here. Such a cache is cleared after every job;
+with a shared backend (Redis, Memcached) the entries stay warm.
+
+A SchedulerLease row makes sure only one scheduler is active. The holder
+renews the lease before every job, and standby processes poll until it
+expires. On SIGTERM/SIGINT the running job is allowed to finish, then the
+lease is released.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import agent, aggstore, goals, queue, reports, retention
+from .models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+LEASE_NAME = "coach_scheduler"
+
+DEFAULTS = {
+    "tick_seconds": 5,       # how often due jobs are checked / a standby retries the lease
+    "lease_seconds": 300,    # must be longer than the slowest job
+    "jobs": {                # seconds; a job with interval None is disabled
+        "queue": {"interval": 15, "jitter": 3},
+        "agent": {"interval": 600, "jitter": 60},
+        "statements": {"interval": 3600, "jitter": 300},
+        "projections": {"interval": 86400, "jitter": 900},
+        "aggregates": {"interval": 86400, "jitter": 900},
+        "prune": {"interval": 86400, "jitter": 3600},
+    },
+}
+
+Job = namedtuple("Job", "name func interval jitter")
+
+
+# --------- jobs ----------
+def drain_queue():
+    stats = queue.drain()
+    return f"{stats['users']} users evaluated, {stats['cards']} cards, {len(stats['errors'])} errors"
+
+
+def agent_sweep():
+    run = agent.run(trigger="scheduler")["run"]
+    return (f"{run.users_evaluated}/{run.users_scanned} users evaluated, "
+            f"{sum(run.cards_created.values())} cards, {run.errors} errors")
+
+
+def freeze_statements():
+    stored, users = reports.build_all_snapshots()
+    return f"{sum(stored.values())} period snapshots stored across {users} users"
+
+
+def refresh_projections():
+    updated, users = goals.refresh_all_projections()
+    return f"projections refreshed for {updated} goals across {users} users"
+
+
+def rebuild_aggregates():
+    store = aggstore.get_store()
+    if store is None:
+        return "no COACH_AGGREGATE_STORE configured"
+    written = store.rebuild(User.objects.values_list("id", flat=True))
+    return f"{written} aggregate records written"
+
+
+def prune():
+    return f"{retention.prune_advice(retention.get_policy())} advice cards pruned"
+
+
+JOB_FUNCTIONS = {
+    "queue": drain_queue,
+    "agent": agent_sweep,
+    "statements": freeze_statements,
+    "projections": refresh_projections,
+    "aggregates": rebuild_aggregates,
+    "prune": prune,
+}
+
+
+def get_config(only=None):
+    """(tick_seconds, lease_seconds, [Job]) from DEFAULTS and COACH_SCHEDULER; `only` restricts the jobs."""
+    custom = getattr(settings, "COACH_SCHEDULER", {})
+    config = {**DEFAULTS, **{k: v for k, v in custom.items() if k != "jobs"}}
+    specs = {name: dict(spec) for name, spec in DEFAULTS["jobs"].items()}
+    for name, spec in custom.get("jobs", {}).items():
+        specs.setdefault(name, {}).update(spec)
+    unknown = (set(specs) | set(only or ())) - set(JOB_FUNCTIONS)
+    if unknown:
+        raise ValueError(f"unknown scheduler jobs: {', '.join(sorted(unknown))}")
+    jobs = [Job(name, JOB_FUNCTIONS[name], spec["interval"], spec.get("jitter", 0))
+            for name, spec in specs.items()
+            if spec.get("interval") and (only is None or name in only)]
+    return config["tick_seconds"], config["lease_seconds"], jobs
+
+
+# --------- lease ----------
+def acquire_lease(owner, seconds, name=LEASE_NAME, now=None):
+    """Take or renew the named lease for `seconds`. True if `owner` holds it afterwards."""
+    now = now or timezone.now()
+    expires_at = now + timedelta(seconds=seconds)
+    if SchedulerLease.objects.filter(Q(owner=owner) | Q(expires_at__lte=now), name=name).update(
+            acquired_at=Case(When(owner=owner, then=F("acquired_at")), default=Value(now)),
+            owner=owner, expires_at=expires_at):
+        return True
+    try:
+        with transaction.atomic():
+            SchedulerLease.objects.create(name=name, owner=owner, acquired_at=now, expires_at=expires_at)
+    except IntegrityError:  # held by someone else
+        return False
+    return True
+
+
+def release_lease(owner, name=LEASE_NAME):
+    SchedulerLease.objects.filter(name=name, owner=owner).delete()
+
+
+def _clear_process_cache():
+    """Drop a per-process cache; other processes' writes never invalidate it."""
+    for backend in caches.all(initialized_only=True):
+        if isinstance(backend, LocMemCache):
+            backend.clear()
+
+
+def _close_broken_connections():
+    """Keep connections open across ticks; only drop ones a failed job left unusable."""
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None and conn.errors_occurred and not conn.is_usable():
+            conn.close()
+
+
+class Scheduler:
+    def __init__(self, jobs, tick_seconds=5, lease_seconds=300, owner=None):
+        self.jobs = list(jobs)
+        self.tick_seconds = tick_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{random.getrandbits(32):08x}"
+        self.stopping = threading.Event()
+        self.leader = False
+        self.next_run = {}  # job name -> time.monotonic() when due
+
+    def stop(self, *args):
+        """Finish the running job, then exit (usable as a signal handler)."""
+        self.stopping.set()
+
+    def renew(self):
+        """Take/renew the lease. On gaining it, spread the first runs over each job's jitter."""
+        try:
+            held = acquire_lease(self.owner, self.lease_seconds)
+        except Exception:
+            logger.exception("scheduler lease renewal failed")
+            _close_broken_connections()
+            held = False
+        if held and not self.leader:
+            logger.info("scheduler %s is active", self.owner)
+            now = time.monotonic()
+            self.next_run = {job.name: now + random.uniform(0, job.jitter) for job in self.jobs}
+        elif self.leader and not held:
+            logger.warning("scheduler %s lost its lease, standing by", self.owner)
+        self.leader = held
+        return held
+
+    def run_due(self, force=False):
+        """Run every due job (all of them with `force`) while holding the lease. Returns [(name, result)]."""
+        ran = []
+        for job in self.jobs:
+            if self.stopping.is_set():
+                break
+            if not force and self.next_run.get(job.name, 0) > time.monotonic():
+                continue
+            if not self.renew():
+                break
+            started = time.monotonic()
+            try:
+                result = job.func()
+                logger.info("scheduler job %s: %s (%.2fs)", job.name, result, time.monotonic() - started)
+            except Exception as e:
+                logger.exception("scheduler job %s failed", job.name)
+                result = e
+            finally:
+                self.next_run[job.name] = started + job.interval + random.uniform(0, job.jitter)
+                _close_broken_connections()
+                _clear_process_cache()
+            ran.append((job.name, result))
+        return ran
+
+    def release(self):
+        if self.leader:
+            release_lease(self.owner)
+            self.leader = False
+
+    def run_forever(self):
+        try:
+            while not self.stopping.is_set():
+                if self.renew():
+                    self.run_due()
+                self.stopping.wait(self.tick_seconds)
+        finally:
+            self.release()
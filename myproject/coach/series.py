@@ -0,0 +1,96 @@
+# coach/series.py
+"""
+Bucketed ledger time series: income, cash income, expenses and net per day,
+ISO week or month over a [start, end) range.
+
+One round trip: the Income and CashEntry aggregates are grouped by the
+truncated date and sent as a single UNION ALL statement. The rows are then
+placed into preallocated zero arrays by bucket index, so gaps cost nothing
+and the series always has one slot per bucket. Values are integer cents.
+
+expense_analysis, emergency_buffer and the heatmaps are thin wrappers over
+series(); GET /coach/series/ exposes it directly.
+"""
+from array import array
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db.models import BigIntegerField, Q, Value
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from accounts.fields import SumCents
+from accounts.models import Income, CashEntry
+from .reports import MONTH, WEEK, next_start, period_start
+
+DAY = "day"
+GRANULARITIES = (DAY, WEEK, MONTH)
+MAX_BUCKETS = 1000
+
+_TRUNC = {DAY: TruncDay, WEEK: TruncWeek, MONTH: TruncMonth}
+_MIN_DAYS = {DAY: 1, WEEK: 7, MONTH: 28}
+
+Series = namedtuple("Series", "granularity buckets income cash_income expenses")
+
+
+def bucket_start(granularity, day):
+    return day if granularity == DAY else period_start(granularity, day)
+
+
+def bucket_starts(granularity, start, end):
+    """Start date of every bucket overlapping [start, end)."""
+    if granularity not in _TRUNC:
+        raise ValueError(f"unknown granularity {granularity!r}")
+    if (end - start).days > MAX_BUCKETS * _MIN_DAYS[granularity]:
+        raise ValueError(f"more than {MAX_BUCKETS} buckets")
+    starts, b = [], bucket_start(granularity, start)
+    while b < end:
+        starts.append(b)
+        b = b + timedelta(days=1) if granularity == DAY else next_start(granularity, b)
+    return starts
+
+
+def series(user_id, start, end, granularity=DAY):
+    """Series of integer-cent arrays, one slot per bucket in [start, end)."""
+    buckets = bucket_starts(granularity, start, end)
+    n = len(buckets)
+    income, cash_income, expenses = array("q", bytes(8 * n)), array("q", bytes(8 * n)), array("q", bytes(8 * n))
+    if not n:
+        return Series(granularity, buckets, income, cash_income, expenses)
+
+    bucket = _TRUNC[granularity]("date")
+    zero = Value(0, output_field=BigIntegerField())
+    window = {"user_id": user_id, "date__gte": start, "date__lt": end}
+    # same column order on both sides: bucket, income, cash_income, expenses
+    incomes = (Income.objects.filter(**window).annotate(bucket=bucket).values("bucket")
+               .annotate(income=SumCents("amount"), cash_in=zero, cash_out=zero)
+               .values_list("bucket", "income", "cash_in", "cash_out"))
+    cash = (CashEntry.objects.filter(**window).annotate(bucket=bucket).values("bucket")
+            .annotate(income=zero,
+                      cash_in=SumCents("amount", filter=Q(is_income=True)),
+                      cash_out=SumCents("amount", filter=Q(is_income=False)))
+            .values_list("bucket", "income", "cash_in", "cash_out"))
+
+    index = {b: i for i, b in enumerate(buckets)}
+    for b, inc, cash_in, cash_out in incomes.union(cash, all=True):
+        i = index[b if isinstance(b, date) else date.fromisoformat(str(b)[:10])]
+        income[i] += inc or 0
+        cash_income[i] += cash_in or 0
+        expenses[i] += cash_out or 0
+    return Series(granularity, buckets, income, cash_income, expenses)
+
+
+def net(s):
+    return array("q", (a + b - c for a, b, c in zip(s.income, s.cash_income, s.expenses)))
+
+
+def earnings(s):
+    """Income + cash income per bucket (what the low-income checks call daily income)."""
+    return array("q", (a + b for a, b in zip(s.income, s.cash_income)))
+
+
+def weekday_totals(s):
+    """{0 (Mon) .. 6 (Sun): earnings cents} of a daily series."""
+    totals = dict.fromkeys(range(7), 0)
+    for b, amount in zip(s.buckets, earnings(s)):
+        totals[b.weekday()] += amount
+    return totals
@@ -0,0 +1,84 @@
+# coach/signals.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Income, CashEntry, Category
+from .categorize import classify, overrides_cache_key, overrides_for
+from .models import CategoryOverride, CoachingSettings, SavedGoal
+from .queue import enqueue_evaluation
+from . import ledger, reports, versions
+
+User = get_user_model()
+
+
+def _deleting_user(origin):
+    """True if a post_delete was caused by deleting the user (instance or queryset)."""
+    return isinstance(origin, User) or getattr(origin, "model", None) is User
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=CashEntry)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    """An edit can move an entry to another period or change its description: remember the stored row."""
+    instance._previous = None
+    if not raw and not instance._state.adding:
+        fields = ("date", "description", "category") if sender is CashEntry else ("date",)
+        instance._previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._previous_date = instance._previous and instance._previous["date"]
+
+
+@receiver(pre_save, sender=CashEntry)
+def categorize_entry(sender, instance, update_fields=None, **kwargs):
+    """
+    Classify an uncategorized entry, and reclassify one whose description
+    changed. A category set by the same save is the user's choice and stays.
+    """
+    if update_fields is not None and "category" not in update_fields:
+        return
+    previous = instance._previous
+    renamed = (previous is not None and instance.description != previous["description"]
+               and instance.category == previous["category"])
+    if renamed or instance.category == Category.UNCATEGORIZED:
+        overrides = overrides_for([instance.user_id])[instance.user_id]
+        instance.category = classify(instance.description, overrides)
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=CashEntry)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=CashEntry)
+def ledger_changed(sender, instance, **kwargs):
+    if _deleting_user(kwargs.get("origin")):
+        return  # cascade from a user delete: nothing left to evaluate, and a queue row would break the FK
+    versions.bump(instance.user_id, kinds=(versions.LEDGER,))
+    if kwargs["signal"] is post_delete:
+        ledger.patch(instance, sign=-1)
+    elif kwargs.get("created"):
+        ledger.patch(instance)
+    reports.invalidate(instance.user_id, instance.date, getattr(instance, "_previous_date", None))
+    enqueue_evaluation(instance.user_id)
+
+
+@receiver(post_save, sender=CoachingSettings)
+@receiver(post_delete, sender=CoachingSettings)
+def settings_changed(sender, instance, **kwargs):
+    if _deleting_user(kwargs.get("origin")):
+        return
+    cache.delete(CoachingSettings.cache_key(instance.user_id))
+    versions.bump(instance.user_id, kinds=(versions.SETTINGS,))
+
+
+@receiver(post_save, sender=SavedGoal)
+@receiver(post_delete, sender=SavedGoal)
+def goal_changed(sender, instance, **kwargs):
+    if _deleting_user(kwargs.get("origin")):
+        return
+    versions.bump(instance.user_id, kinds=(versions.GOALS,))
+
+
+@receiver(post_save, sender=CategoryOverride)
+@receiver(post_delete, sender=CategoryOverride)
+def category_override_changed(sender, instance, **kwargs):
+    cache.delete(overrides_cache_key(instance.user_id))
@@ -1,38 +1,111 @@
 // coach/static/coach/coach.js
 document.addEventListener('DOMContentLoaded', function() {
-  document.querySelectorAll('.js-mark-read').forEach(form => {
-    form.addEventListener('submit', async (e) => {
-      e.preventDefault();
-      const formData = new FormData(form);
-      // use fetch to submit
-      const cardId = formData.get('card_id');
-      try {
-        const res = await fetch(form.action, {
-          method: 'POST',
-          headers: {
-            'X-Requested-With': 'XMLHttpRequest',
-            'X-CSRFToken': getCookie('csrftoken')
-          },
-          body: formData
-        });
-        if (res.ok) {
-          // mark UI as read
-          form.style.display = 'none';
-          const parent = form.closest('article');
-          if (parent) {
-            const span = document.createElement('span');
-            span.className = 'muted';
-            span.innerText = 'Read';
-            parent.querySelector('.card-head')?.appendChild(span);
-          }
+  // delegated so cards pushed by the advice stream work too
+  document.addEventListener('submit', async (e) => {
+    const form = e.target.closest('.js-mark-read');
+    if (!form) return;
+    e.preventDefault();
+    const formData = new FormData(form);
+    // use fetch to submit
+    try {
+      const res = await fetch(form.action, {
+        method: 'POST',
+        headers: {
+          'X-Requested-With': 'XMLHttpRequest',
+          'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: formData
+      });
+      if (res.ok) {
+        // mark UI as read
+        form.style.display = 'none';
+        const parent = form.closest('article');
+        if (parent) {
+          const span = document.createElement('span');
+          span.className = 'muted';
+          span.innerText = 'Read';
+          parent.querySelector('.card-head')?.appendChild(span);
         }
-      } catch (err) {
-        console.error(err);
       }
-    });
+    } catch (err) {
+      console.error(err);
+    }
   });
+
+  const feed = document.getElementById('advice-feed');
+  if (feed) startAdviceFeed(feed);
 });
 
+// ---- live advice: SSE push, falling back to ETag-revalidated polling ----
+function startAdviceFeed(feed) {
+  const list = document.getElementById('advice-list');
+  let lastId = 0;
+  list.querySelectorAll('[data-card-id]').forEach(el => {
+    lastId = Math.max(lastId, Number(el.dataset.cardId));
+  });
+
+  function addCard(card) {
+    if (card.id <= lastId) return;
+    lastId = card.id;
+    list.prepend(renderCard(card, feed.dataset.markReadUrl));
+    document.getElementById('advice-empty').hidden = true;
+  }
+
+  function showStatus(status) {
+    const el = document.getElementById('income-status');
+    if (status.status === 'low_income_warning') {
+      el.textContent = `Income is low: recent average ${status.average_recent} is below your threshold of ${status.threshold}.`;
+      el.hidden = false;
+    } else {
+      el.hidden = true;
+    }
+  }
+
+  function poll() {
+    // the browser revalidates with If-None-Match, so unchanged feeds cost a 304
+    fetch(feed.dataset.pollUrl, {cache: 'no-cache', credentials: 'same-origin'})
+      .then(res => res.ok ? res.json() : null)
+      .then(data => data && data.cards.slice().reverse().forEach(addCard))
+      .catch(err => console.error(err));
+  }
+
+  if (!window.EventSource) {
+    setInterval(poll, 30000);
+    return;
+  }
+  const source = new EventSource(`${feed.dataset.streamUrl}?last_id=${lastId}`);
+  source.addEventListener('advice', e => addCard(JSON.parse(e.data)));
+  source.addEventListener('status', e => showStatus(JSON.parse(e.data)));
+  source.onerror = () => {
+    // CLOSED means the server refused the stream (e.g. no ASGI server): poll instead
+    if (source.readyState === EventSource.CLOSED) setInterval(poll, 30000);
+  };
+}
+
+function renderCard(card, markReadUrl) {
+  const article = document.createElement('article');
+  article.className = 'card';
+  article.dataset.cardId = card.id;
+  article.innerHTML = `
+    <header class="card-head">
+      <h3></h3>
+      <form method="post" class="inline-form js-mark-read">
+        <input type="hidden" name="csrfmiddlewaretoken">
+        <input type="hidden" name="card_id">
+        <button class="btn small" type="submit">Mark read</button>
+      </form>
+    </header>
+    <p></p>
+    <small class="muted"></small>`;
+  article.querySelector('h3').textContent = card.title;
+  article.querySelector('form').action = markReadUrl;
+  article.querySelector('[name=csrfmiddlewaretoken]').value = getCookie('csrftoken');
+  article.querySelector('[name=card_id]').value = card.id;
+  article.querySelector('p').textContent = card.body;
+  article.querySelector('small').textContent = `${card.tag} • ${new Date(card.created_at).toLocaleString()}`;
+  return article;
+}
+
 // simple CSRF helper
 function getCookie(name) {
   const v = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)');
@@ -0,0 +1,166 @@
+# coach/stream.py
+"""
+Server-Sent Events stream of new advice cards and low-income status changes
+(GET /coach/stream/), replacing client polling of /coach/advice/.
+
+Needs an ASGI server (e.g. `uvicorn myproject.asgi:application`): every
+connection is one idle coroutine, so a process can hold thousands of them.
+Under WSGI the view answers 501 and clients fall back to polling.
+
+Events:
+  event: advice   id: <card id>  data: the card as in /coach/advice/
+  event: status   data: the /coach/low-income-alert/ payload
+  ": keepalive" comments every COACH_STREAM_HEARTBEAT_SECONDS
+
+Delivery: cards created in this process are published straight to
+coach.pubsub.broker (see agent.run). One poller task per process covers
+writers in other processes with a single primary-key range query per
+COACH_STREAM_POLL_SECONDS, independent of the number of connections, and
+re-checks the low-income status only for users whose ledger/settings data
+version changed (coach/versions.py, one query for all connected users).
+Clients reconnecting with Last-Event-ID get the
+cards they missed.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import AdviceCard
+from .pubsub import CARD_FIELDS, broker, publish_cards
+from .responses import dumps
+from .views import low_income_status
+from . import versions
+
+BACKLOG_LIMIT = 50
+
+
+def _heartbeat():
+    return getattr(settings, "COACH_STREAM_HEARTBEAT_SECONDS", 15)
+
+
+def _poll_interval():
+    return getattr(settings, "COACH_STREAM_POLL_SECONDS", 2)
+
+
+def _event(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+class Poller:
+    """Per-process background task feeding the broker from the database."""
+
+    def __init__(self):
+        self.task = None
+        self.last_id = None
+        self.seen_versions = {}
+        self.last_status = {}
+
+    def ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.last_id = None
+            self.task = loop.create_task(self._run())
+
+    async def _run(self):
+        # exits once the last client has gone; the next subscriber restarts it
+        while broker.user_ids():
+            rows, statuses = await sync_to_async(self.poll)(broker.user_ids())
+            publish_cards(rows)
+            for uid, status in statuses.items():
+                broker.publish(uid, "status", status)
+            await asyncio.sleep(_poll_interval())
+
+    def poll(self, user_ids):
+        """New cards of connected users and changed statuses since the last poll."""
+        if self.last_id is None:
+            self.last_id = AdviceCard.objects.order_by("-id").values_list("id", flat=True).first() or 0
+            return [], {}
+        rows = list(AdviceCard.objects.filter(id__gt=self.last_id).order_by("id").values(*CARD_FIELDS)[:1000])
+        if rows:
+            self.last_id = rows[-1]["id"]
+
+        statuses = {}
+        current = versions.many(user_ids, versions.LEDGER, versions.SETTINGS)
+        for uid, v in current.items():
+            previous = self.seen_versions.get(uid)
+            self.seen_versions[uid] = v
+            if previous is None or previous == v:
+                continue
+            status = low_income_status(User(id=uid))
+            if status["status"] != self.last_status.get(uid):
+                self.last_status[uid] = status["status"]
+                statuses[uid] = status
+        for uid in set(self.seen_versions) - user_ids:
+            del self.seen_versions[uid]
+        return [r for r in rows if r["user_id"] in user_ids], statuses
+
+
+poller = Poller()
+
+
+def _initial_state(user, last_id):
+    if poller.last_id is None:
+        # start the poller's window before this client's snapshot below
+        poller.last_id = AdviceCard.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    if last_id:
+        backlog = list(AdviceCard.objects.filter(user=user, id__gt=last_id)
+                       .order_by("id").values(*CARD_FIELDS)[:BACKLOG_LIMIT])
+    else:
+        backlog = []
+        last_id = (AdviceCard.objects.filter(user=user).order_by("-id")
+                   .values_list("id", flat=True).first() or 0)
+    status = low_income_status(user)
+    poller.last_status[user.id] = status["status"]
+    poller.seen_versions[user.id] = versions.versions(user.id, versions.LEDGER, versions.SETTINGS)
+    return backlog, last_id, status
+
+
+async def _events(user, last_id):
+    # subscribe before reading the backlog so nothing created in between is lost
+    sub = broker.subscribe(user.id)
+    poller.ensure_running()
+    try:
+        yield "retry: 5000\n\n"
+        backlog, last_id, status = await sync_to_async(_initial_state)(user, last_id)
+        for card in backlog:
+            last_id = card["id"]
+            yield _event("advice", card, card["id"])
+        yield _event("status", status)
+        while True:
+            try:
+                event, data = await asyncio.wait_for(sub.get(), _heartbeat())
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event == "advice":
+                if data["id"] <= last_id:  # published in-process and seen by the poller
+                    continue
+                last_id = data["id"]
+                yield _event(event, data, data["id"])
+            else:
+                yield _event(event, data)
+    finally:
+        broker.unsubscribe(sub)
+
+
+@require_GET
+async def advice_stream(request):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("the advice stream needs an ASGI server; poll /coach/advice/ instead", status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.GET.get("last_id") or 0)
+    except ValueError:
+        return HttpResponseBadRequest("invalid Last-Event-ID")
+    response = StreamingHttpResponse(_events(user, last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let a reverse proxy buffer the stream
+    return response
@@ -1,9 +1,10 @@
 # coach/tests.py
-from django.test import TestCase, Client
+from django.test import TestCase, Client, LiveServerTestCase, override_settings
 from django.contrib.auth.models import User
 from accounts.models import Income, CashEntry
 from coach.models import CoachingSettings, AdviceCard
 from datetime import date, timedelta
+from io import StringIO
 
 class CoachAPITest(TestCase):
     def setUp(self):
@@ -35,7 +36,1118 @@ class CoachAPITest(TestCase):
     def test_agent_creates_advice(self):
         # run agent command
         from django.core.management import call_command
-        call_command("run_coach_agent")
+        call_command("run_coach_agent", stdout=StringIO())
+        # avg income 350 >= default threshold 300 and expenses are 14% of income: no advice
+        self.assertFalse(AdviceCard.objects.filter(user=self.user).exists())
+
+        CoachingSettings.objects.create(user=self.user, low_income_threshold=1000)
+        call_command("run_coach_agent", stdout=StringIO())
         cards = AdviceCard.objects.filter(user=self.user)
-        # either zero or more but should not crash
-        self.assertTrue(cards.exists() or not cards.exists())
+        self.assertEqual(list(cards.values_list("tag", flat=True)), ["low_income"])
+        self.assertEqual(cards.get().meta, {"avg7": 350.0})
+
+
+class GoalEngineTest(TestCase):
+    def setUp(self):
+        from coach.models import SavedGoal
+        self.user = User.objects.create_user(username="guser", password="pass")
+        self.client = Client()
+        self.client.login(username="guser", password="pass")
+        # 900 net over the 90-day window -> 10/day
+        Income.objects.create(user=self.user, amount=1000, date=date.today() - timedelta(days=5), income_type="business")
+        CashEntry.objects.create(user=self.user, amount=100, date=date.today() - timedelta(days=5), description="rent", is_income=False)
+        self.small = SavedGoal.objects.create(user=self.user, name="small", target_amount=100, current_amount=80)
+        self.big = SavedGoal.objects.create(user=self.user, name="big", target_amount=1000, current_amount=100)
+
+    def test_refresh_projections_uses_savings_rate(self):
+        from coach.goals import refresh_projections
+        self.assertEqual(refresh_projections([self.user.id]), 2)
+        self.small.refresh_from_db()
+        self.big.refresh_from_db()
+        self.assertEqual(self.small.projected_completion, date.today() + timedelta(days=2))
+        self.assertEqual(self.big.projected_completion, date.today() + timedelta(days=90))
+
+    def test_list_sorted_and_filtered_by_progress(self):
+        res = self.client.get("/coach/goals/?ordering=-progress")
+        names = [g["name"] for g in res.json()["goals"]]
+        self.assertEqual(names, ["small", "big"])
+        res = self.client.get("/coach/goals/?min_progress=50")
+        self.assertEqual([g["name"] for g in res.json()["goals"]], ["small"])
+        self.assertEqual(res.json()["goals"][0]["progress"], 80.0)
+
+    def test_bulk_contributions(self):
+        import json
+        res = self.client.post("/coach/goals/bulk/", json.dumps({"contributions": [
+            {"goal_id": self.small.id, "delta": 10},
+            {"goal_id": self.big.id, "delta": 400},
+        ]}), content_type="application/json")
+        self.assertEqual(res.status_code, 200)
+        progress = {g["name"]: g["progress"] for g in res.json()["goals"]}
+        self.assertEqual(progress, {"small": 90.0, "big": 50.0})
+
+    def test_bulk_rejects_foreign_goal(self):
+        import json
+        from coach.models import SavedGoal
+        other = User.objects.create_user(username="other", password="pass")
+        foreign = SavedGoal.objects.create(user=other, name="x", target_amount=10)
+        res = self.client.post("/coach/goals/bulk/", json.dumps({"contributions": [
+            {"goal_id": self.small.id, "delta": 10},
+            {"goal_id": foreign.id, "delta": 10},
+        ]}), content_type="application/json")
+        self.assertEqual(res.status_code, 404)
+        self.small.refresh_from_db()
+        self.assertEqual(self.small.current_amount, 80)
+
+    def test_bulk_rejects_overdrawing_withdrawal(self):
+        import json
+        res = self.client.post("/coach/goals/bulk/", json.dumps({"contributions": [
+            {"goal_id": self.big.id, "delta": -50},
+            {"goal_id": self.small.id, "delta": -81},
+        ]}), content_type="application/json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["goal_ids"], [self.small.id])
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.current_amount, 100)
+
+    def test_allocate_by_priority_and_weight(self):
+        import json
+        self.big.priority = 1
+        self.big.save()
+        res = self.client.post("/coach/goals/bulk/", json.dumps({"allocate": {"amount": 50}}),
+                               content_type="application/json")
+        data = res.json()
+        self.assertEqual({g["name"]: g["current_amount"] for g in data["goals"]}, {"small": 100, "big": 130})
+        self.assertEqual(data["unallocated"], 0)
+
+        from coach.goals import allocate
+        self.small.current_amount, self.big.current_amount = 0, 0
+        deltas, left = allocate([self.small, self.big], 400, "weight")
+        self.assertEqual(deltas, {self.small.id: 100, self.big.id: 300})
+        self.assertEqual(left, 0)
+
+
+class MoneyFieldTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="muser", password="pass")
+        self.client = Client()
+        self.client.login(username="muser", password="pass")
+
+    def test_amounts_are_exact_cents(self):
+        from decimal import Decimal
+        from accounts.fields import SumCents
+        for _ in range(10):
+            CashEntry.objects.create(user=self.user, amount=0.1, date=date.today(), description="x", is_income=False)
+        entry = CashEntry.objects.first()
+        self.assertEqual(entry.amount, Decimal("0.10"))
+        self.assertEqual(CashEntry.objects.aggregate(total=SumCents("amount"))["total"], 100)
+        res = self.client.get("/coach/expense-analysis/?days=7")
+        self.assertEqual(res.json()["total_expenses"], 1.0)
+
+    def test_weight_split_adds_up_to_the_cent(self):
+        from decimal import Decimal
+        from coach.goals import allocate
+        from coach.models import SavedGoal
+        goals = [SavedGoal.objects.create(user=self.user, name=n, target_amount=1000) for n in "abc"]
+        deltas, left = allocate(goals, Decimal("100.00"), "weight")
+        self.assertEqual(sum(deltas.values()), Decimal("100.00"))
+        self.assertEqual(sorted(deltas.values()), [Decimal("33.33"), Decimal("33.33"), Decimal("33.34")])
+        self.assertEqual(left, 0)
+
+
+class JsonResponseLayerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="juser", password="pass")
+        self.client = Client()
+        self.client.login(username="juser", password="pass")
+        for i in range(3):
+            AdviceCard.objects.create(user=self.user, title=f"card {i}", body="b" * 200, tag="tip", meta={"n": i})
+
+    def test_orjson_and_stdlib_encode_identically(self):
+        from decimal import Decimal
+        from django.utils import timezone
+        from coach import responses
+        data = {"now": timezone.now(), "day": date.today(), "amount": Decimal("12.30"), "rows": [{"a": 1}],
+                "note": "\u20b9 500 caf\u00e9"}
+        self.assertEqual(responses.dumps(data), responses.dumps_stdlib(data))
+        self.assertIn("\u20b9".encode(), responses.dumps_stdlib(data))
+        keyed = {"by_id": {1: "a", 2: "b"}}
+        self.assertEqual(responses.dumps(keyed), responses.dumps_stdlib(keyed))
+        for encode in (responses.dumps, responses.dumps_stdlib):
+            with self.assertRaises(TypeError):
+                encode({date.today(): 1})
+
+    def test_large_feed_is_gzipped_when_accepted(self):
+        import gzip
+        import json
+        res = self.client.get("/coach/advice/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertTrue(res["ETag"].startswith("W/"))
+        cards = json.loads(gzip.decompress(res.content))["cards"]
+        self.assertEqual(sorted(c["meta"]["n"] for c in cards), [0, 1, 2])
+        res = self.client.get("/coach/advice/")
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(len(res.json()["cards"]), 3)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="euser", password="pass")
+        self.client = Client()
+        self.client.login(username="euser", password="pass")
+        Income.objects.create(user=self.user, amount=500, date=date.today(), income_type="business")
+        self.card = AdviceCard.objects.create(user=self.user, title="t", body="b", tag="tip")
+
+    def assertRevalidates(self, url, change):
+        res = self.client.get(url)
+        etag = res["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_advice_feed(self):
+        def mark_read():
+            self.card.read = True
+            self.card.save()
+        self.assertRevalidates("/coach/advice/", mark_read)
+        self.assertRevalidates("/coach/advice/", lambda: AdviceCard.objects.create(
+            user=self.user, title="t2", body="b", tag="tip"))
+
+    def test_aggregates_follow_data_versions(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.assertRevalidates("/coach/low-income-alert/", lambda: CoachingSettings.objects.create(
+            user=self.user, low_income_threshold=1000))
+        self.assertRevalidates("/coach/low-income-alert/", lambda: Income.objects.create(
+            user=self.user, amount=1, date=date.today(), income_type="business"))
+        self.assertEqual(self.client.get("/coach/low-income-alert/").json()["average_recent"], 501.0)
+
+        res = self.client.get("/coach/heatmap/")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/coach/heatmap/", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if "accounts_" in q["sql"]])
+
+    def test_goals_list(self):
+        from coach.models import SavedGoal
+        self.assertRevalidates("/coach/goals/", lambda: SavedGoal.objects.create(
+            user=self.user, name="g", target_amount=100))
+
+    def test_validators_live_in_the_database(self):
+        from django.core.cache import cache
+        from coach.goals import refresh_projections
+        from coach.models import SavedGoal
+
+        def other_process_write():
+            cache.clear()  # nothing this process cached may carry the validator
+            refresh_projections([self.user.id])  # bulk_update: no signals
+        SavedGoal.objects.create(user=self.user, name="g", target_amount=100)
+        self.assertRevalidates("/coach/goals/", other_process_write)
+
+    def test_goal_detail_tags_differ_per_goal_and_writes_skip_them(self):
+        import json
+        from coach.models import SavedGoal
+        a = SavedGoal.objects.create(user=self.user, name="a", target_amount=100)
+        b = SavedGoal.objects.create(user=self.user, name="b", target_amount=100)
+        etag = self.client.get(f"/coach/goals/{a.id}/")["ETag"]
+        self.assertNotEqual(self.client.get(f"/coach/goals/{b.id}/")["ETag"], etag)
+        self.assertEqual(self.client.get(f"/coach/goals/{b.id}/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        res = self.client.put(f"/coach/goals/{a.id}/", json.dumps({"name": "a2"}), content_type="application/json",
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.has_header("ETag"))
+
+
+@override_settings(COACH_STREAM_POLL_SECONDS=0.05, COACH_STREAM_HEARTBEAT_SECONDS=0.2)
+class AdviceStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="suser", password="pass")
+
+    def tearDown(self):
+        # the stream caches settings/status for this user id; don't leak them into later tests
+        from django.core.cache import cache
+        cache.clear()
+
+    async def next_event(self, it):
+        import asyncio
+        return await asyncio.wait_for(it.get(), 5)
+
+    async def test_pushes_cards_and_status_changes(self):
+        import asyncio
+        import json
+        from coach.pubsub import broker
+        from coach.stream import poller
+        await self.async_client.aforce_login(self.user)
+        res = await self.async_client.get("/coach/stream/")
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+
+        # consume in a task and cancel it at the end, like the ASGI handler on disconnect
+        it = asyncio.Queue()
+        async def consume():
+            async for part in res.streaming_content:
+                await it.put(part.decode())
+        consumer = asyncio.create_task(consume())
+        self.assertEqual(await self.next_event(it), "retry: 5000\n\n")
+        self.assertIn('"status":"normal"', await self.next_event(it))
+
+        # written "elsewhere": picked up by the poller
+        card = await AdviceCard.objects.acreate(user=self.user, title="t", body="b", tag="tip")
+        event = await self.next_event(it)
+        self.assertTrue(event.startswith(f"id: {card.id}\nevent: advice\n"))
+        self.assertEqual(json.loads(event.split("data: ")[1])["title"], "t")
+
+        await CoachingSettings.objects.acreate(user=self.user, low_income_threshold=1000)
+        self.assertIn('"status":"low_income_warning"', await self.next_event(it))
+        self.assertEqual(await self.next_event(it), ": keepalive\n\n")
+
+        consumer.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await consumer
+        self.assertEqual(broker.user_ids(), set())
+        await poller.task
+
+    def test_needs_asgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/coach/stream/").status_code, 501)
+
+
+class AdviceRetentionTest(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        self.user = User.objects.create_user(username="ruser", password="pass")
+        old = timezone.now() - timedelta(days=60)
+        unread = AdviceCard.objects.create(user=self.user, title="unread", body="b", tag="low_income")
+        for i in range(5):
+            AdviceCard.objects.create(user=self.user, title=f"card {i}", body="b", tag="low_income", read=True)
+        AdviceCard.objects.update(created_at=old)
+        self.unread_id = unread.id
+
+    def test_archive_keeps_last_n_and_unread(self):
+        from coach.retention import get_policy, prune_advice
+        from coach.models import ArchivedAdviceCard
+        pruned = prune_advice(get_policy(keep_last=2, keep_days=30, mode="archive", batch_size=2))
+        # 6 cards: newest 2 are kept, the unread one is never pruned
+        self.assertEqual(pruned, 3)
+        self.assertEqual(AdviceCard.objects.filter(user=self.user).count(), 3)
+        self.assertTrue(AdviceCard.objects.filter(id=self.unread_id).exists())
+        self.assertEqual(ArchivedAdviceCard.objects.filter(user=self.user).count(), 3)
+
+    def test_summarize_and_command(self):
+        from django.core.management import call_command
+        from coach.models import AdviceSummary
+        call_command("prune_advice", "--keep-last=0", "--mode=summarize", stdout=StringIO())
+        summary = AdviceSummary.objects.get(user=self.user)
+        self.assertEqual(summary.total, 5)
+        self.assertEqual(summary.by_tag, {"low_income": 5})
+        self.assertEqual(list(AdviceCard.objects.values_list("id", flat=True)), [self.unread_id])
+
+
+class AdviceDedupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="duser", password="pass")
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        CashEntry.objects.create(user=self.user, amount=45, date=date.today(), description="food", is_income=False)
+
+    def test_repeated_runs_are_idempotent(self):
+        from django.core.management import call_command
+        out = StringIO()
+        call_command("run_coach_agent", stdout=out)
+        call_command("run_coach_agent", stdout=out)
+        tags = sorted(AdviceCard.objects.filter(user=self.user).values_list("tag", flat=True))
+        self.assertEqual(tags, ["high_expense", "low_income"])
+
+    def test_unique_dedup_key(self):
+        from django.db import IntegrityError
+        from coach.models import make_dedup_key
+        key = make_dedup_key(self.user.id, "low_income", 2)
+        AdviceCard.objects.create(user=self.user, title="a", body="b", tag="low_income", dedup_key=key)
+        with self.assertRaises(IntegrityError):
+            AdviceCard.objects.create(user=self.user, title="a", body="b", tag="low_income", dedup_key=key)
+
+    def test_backfill_keeps_cards_from_before_the_key(self):
+        from importlib import import_module
+        from django.apps import apps
+        from django.core.management import call_command
+        for _ in range(2):  # issued by the old agent, without a key
+            AdviceCard.objects.create(user=self.user, title="a", body="b", tag="low_income")
+        import_module("coach.migrations.0014_backfill_advicecard_dedup_key").backfill(apps, None)
+        self.assertEqual(AdviceCard.objects.exclude(dedup_key=None).count(), 1)
+        call_command("run_coach_agent", stdout=StringIO())
+        self.assertEqual(AdviceCard.objects.filter(user=self.user, tag="low_income").count(), 2)
+
+
+class AdviceQueueTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="quser", password="pass")
+
+    def test_ledger_writes_are_coalesced(self):
+        from coach.models import PendingEvaluation
+        for i in range(5):
+            CashEntry.objects.create(user=self.user, amount=80, date=date.today(), description="x", is_income=False)
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        self.assertEqual(PendingEvaluation.objects.filter(user=self.user).count(), 1)
+
+    def test_drain_evaluates_due_users(self):
+        from django.utils import timezone
+        from coach.models import PendingEvaluation
+        from coach.queue import drain
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        # still inside the debounce window
+        self.assertEqual(drain()["users"], 0)
+        stats = drain(now=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(stats["users"], 1)
+        self.assertFalse(PendingEvaluation.objects.exists())
+        self.assertTrue(AdviceCard.objects.filter(user=self.user, tag="low_income").exists())
+
+
+    def test_deleting_a_user_with_ledger_rows(self):
+        from django.db import connection
+        from coach.models import PendingEvaluation
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        self.user.delete()
+        self.assertFalse(PendingEvaluation.objects.exists())
+        connection.check_constraints()
+
+
+class CoachingSettingsCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username="suser", password="pass")
+
+    def test_for_user_defaults_without_writing(self):
+        s = CoachingSettings.for_user(self.user.id)
+        self.assertIsNone(s.pk)
+        self.assertEqual(s.low_income_threshold, 300)
+        self.assertFalse(CoachingSettings.objects.exists())
+
+    def test_cached_and_invalidated_on_save(self):
+        CoachingSettings.objects.create(user=self.user, low_income_threshold=100)
+        self.assertEqual(CoachingSettings.for_user(self.user.id).low_income_threshold, 100)
+        with self.assertNumQueries(0):
+            CoachingSettings.for_user(self.user.id)
+        s = CoachingSettings.objects.get(user=self.user)
+        s.low_income_threshold = 200
+        s.save()
+        self.assertEqual(CoachingSettings.for_user(self.user.id).low_income_threshold, 200)
+
+    def test_batch_readers_skip_the_cache(self):
+        from coach.models import settings_for
+        s = CoachingSettings.objects.create(user=self.user, low_income_threshold=100)
+        CoachingSettings.for_user(self.user.id)
+        CoachingSettings.objects.filter(pk=s.pk).update(low_income_threshold=250)  # e.g. another worker
+        self.assertEqual(CoachingSettings.for_user(self.user.id).low_income_threshold, 100)
+        self.assertEqual(settings_for([self.user.id], cached=False)[self.user.id].low_income_threshold, 250)
+        self.assertEqual(CoachingSettings.for_user(self.user.id).low_income_threshold, 250)  # refreshed
+
+    def test_signup_and_backfill_create_settings(self):
+        from django.core.management import call_command
+        Client().post("/signup/", {"username": "newbie", "email": "n@example.com", "password": "pw12345!"})
+        self.assertTrue(CoachingSettings.objects.filter(user__username="newbie").exists())
+        call_command("backfill_coaching_settings", stdout=StringIO())
+        self.assertTrue(CoachingSettings.objects.filter(user=self.user).exists())
+
+
+@override_settings(COACH_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TestCase):
+    """Every budgeted view must stay within its declared query budget."""
+
+    def setUp(self):
+        from coach.models import SavedGoal
+        self.user = User.objects.create_user(username="buser", password="pass")
+        self.client = Client()
+        self.client.login(username="buser", password="pass")
+        today = date.today()
+        for i in range(20):
+            Income.objects.create(user=self.user, amount=100 + i, date=today - timedelta(days=i), income_type="business")
+            CashEntry.objects.create(user=self.user, amount=30, date=today - timedelta(days=i), description="food", is_income=False)
+        self.goal = SavedGoal.objects.create(user=self.user, name="g", target_amount=100)
+
+    def test_views_within_budget(self):
+        for url in ["/income/variability/", "/dashboard/", "/coach/low-income-alert/",
+                    "/coach/expense-analysis/", "/coach/advice/", "/coach/goals/",
+                    f"/coach/goals/{self.goal.id}/", "/coach/buffer/", "/coach/heatmap/",
+                    "/coach/ui/dashboard/", "/coach/ui/advice/", "/coach/ui/heatmap/", "/coach/ui/goals/"]:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, url)
+            self.assertIn("db;dur=", res["Server-Timing"])
+
+    def test_budget_violation_raises(self):
+        from coach.metrics import QueryBudgetExceeded
+        with override_settings(COACH_QUERY_BUDGETS={"coach.views.health": 0}):
+            self.client.get("/coach/health/")  # no queries, fine
+        with override_settings(COACH_QUERY_BUDGETS={"accounts.views.dashboard_view": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/dashboard/")
+
+    def test_metrics_endpoint(self):
+        self.client.get("/coach/low-income-alert/")
+        self.client.get("/coach/low-income-alert/")
+        self.assertEqual(self.client.get("/coach/metrics/").status_code, 403)
+        with override_settings(COACH_METRICS_TOKEN="s3cret"):
+            self.assertEqual(Client().get("/coach/metrics/", HTTP_AUTHORIZATION="Bearer nope").status_code, 403)
+            body = Client().get("/coach/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('coach_request_queries_count{view="coach.views.low_income_alert"}', body)
+        self.assertIn('coach_cache_hits_total{view="coach.views.low_income_alert"}', body)
+
+
+class AgentRunTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="auser", password="pass")
+        User.objects.create_user(username="nodata", password="pass")
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+
+    def test_run_is_recorded(self):
+        from django.core.management import call_command
+        from coach.models import AgentRun
+        out = StringIO()
+        call_command("run_coach_agent", "--profile", "--profile-limit=5", stdout=out)
+        run = AgentRun.objects.get()
+        self.assertEqual(run.users_scanned, 2)
+        self.assertEqual((run.users_evaluated, run.users_skipped), (1, 1))
+        self.assertEqual(run.cards_created, {"low_income": 1})
+        self.assertGreater(run.query_count, 0)
+        self.assertEqual(set(run.phase_timings), {"load", "evaluate", "write"})
+        self.assertIn("function calls", out.getvalue())
+
+    def test_cards_counted_once_across_overlapping_runs(self):
+        from coach.agent import insert_cards
+        from coach.models import make_dedup_key
+
+        def card(tag):
+            return AdviceCard(user=self.user, title="t", body="b", tag=tag,
+                              dedup_key=make_dedup_key(self.user.id, tag, 2))
+        self.assertEqual(len(insert_cards([card("low_income")])), 1)
+        with self.assertNumQueries(2):  # the insert, then the key re-read; no probe before the write
+            self.assertEqual(insert_cards([card("low_income")]), [])  # already issued
+        # a key taken while the batch is inserted: the others still go in, counted once
+        inserted = insert_cards([card("high_expense"), card("high_expense"), card("savings")])
+        self.assertEqual(sorted(c.tag for c in inserted), ["high_expense", "savings"])
+        self.assertTrue(all(c.pk for c in inserted))
+        self.assertEqual(AdviceCard.objects.filter(user=self.user).count(), 3)
+
+
+class BenchmarkCompareTest(TestCase):
+    def test_compare_flags_slowdowns_and_extra_queries(self):
+        from benchmarks.runner import compare
+        def report(ms, queries):
+            return {"scales": {"small": {
+                "endpoints": {"/coach/advice/": {"median_ms": ms, "queries": queries}},
+                "agent": {"median_ms": ms, "queries": queries},
+            }}}
+        self.assertEqual(compare(report(11, 3), report(10, 3), threshold=0.2), [])
+        problems = compare(report(15, 4), report(10, 3), threshold=0.2)
+        self.assertEqual(len(problems), 4)
+        self.assertIn("small /coach/advice/: median 10ms -> 15ms", problems)
+        broken = report(10, 3)
+        broken["scales"]["small"]["endpoints"]["/coach/advice/"].update(status=500, ok=False)
+        self.assertEqual(compare(broken, report(10, 3)), ["small /coach/advice/: status 500"])
+
+    def test_endpoints_skip_unbenchmarkable_routes(self):
+        from benchmarks.runner import SKIPPED, endpoints, status_ok
+        paths = set(endpoints())
+        self.assertIn("/coach/advice/", paths)
+        self.assertFalse(paths & set(SKIPPED))
+        self.assertTrue(status_ok("/logout/", 302))
+        self.assertFalse(status_ok("/coach/advice/", 302))
+
+
+class GenerateLoadDataTest(TestCase):
+    def test_deterministic_bulk_generation(self):
+        from django.core.management import call_command
+        from coach.models import SavedGoal
+        out = StringIO()
+        call_command("generate_load_data", "--users=3", "--days=20", "--seed=7", "--prefix=la", stdout=out)
+        call_command("generate_load_data", "--users=3", "--days=20", "--seed=7", "--prefix=lb", stdout=out)
+        for model in (Income, CashEntry):
+            a = list(model.objects.filter(user__username__startswith="la").order_by("id").values_list("amount", "date"))
+            b = list(model.objects.filter(user__username__startswith="lb").order_by("id").values_list("amount", "date"))
+            self.assertTrue(a)
+            self.assertEqual(a, b)
+        self.assertEqual(CoachingSettings.objects.filter(user__username__startswith="la").count(), 3)
+        self.assertFalse(SavedGoal.objects.filter(projection_updated_at=None).exists())
+        from coach.models import PendingEvaluation
+        self.assertEqual(PendingEvaluation.objects.filter(user__username__startswith="la").count(), 3)
+
+
+class LoadTestHarnessTest(TestCase):
+    def test_recorder_summary(self):
+        from loadtest.runner import Recorder, percentile
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertAlmostEqual(percentile([0.0, 1.0], 95), 0.95)
+        rec = Recorder()
+        rec.add("advice", 0.5, True)  # before warmup ends: ignored
+        rec.recording = True
+        for ms, ok in [(10, True), (20, True), (30, False), (40, True)]:
+            rec.add("advice", ms / 1000, ok)
+        summary = rec.summary(elapsed=2)
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["rps"], 2.0)
+        self.assertEqual(summary["endpoints"]["advice"]["error_rate"], 0.25)
+        self.assertEqual(summary["endpoints"]["advice"]["p50_ms"], 25.0)
+
+
+@override_settings(COACH_RATE_LIMITS={})
+class LoadTestClientTest(LiveServerTestCase):
+    """The asyncio client, session login and success rules against a live server."""
+
+    def test_session_login_and_replay(self):
+        import asyncio
+        from loadtest import runner
+        User.objects.create_user(username="load0", password="load-pass")
+        # one virtual user: the live server threads share one in-memory SQLite connection
+        report = asyncio.run(runner.run(self.live_server_url, [("load0", "load-pass")], [1],
+                                        duration=0.5, warmup=0, seed=1, log=lambda msg: None))
+        level = report["levels"][1]
+        self.assertGreater(level["requests"], 0)
+        self.assertEqual(level["error_rate"], 0.0, level["endpoints"])
+
+    def test_expired_session_redirect_is_a_failure(self):
+        import asyncio
+        from loadtest.client import Session
+        from loadtest.runner import response_ok
+
+        async def fetch():
+            s = Session(self.live_server_url)
+            try:
+                return await s.request("GET", "/coach/advice/")
+            finally:
+                await s.close()
+        res = asyncio.run(fetch())
+        self.assertEqual(res.status, 302)
+        self.assertFalse(response_ok("GET", res))
+        self.assertFalse(response_ok("POST", res))
+
+
+class CategorizationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cat", password="pass")
+        self.client = Client()
+        self.client.login(username="cat", password="pass")
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_rules(self):
+        from accounts.models import Category
+        from coach.categorize import classify
+        self.assertEqual(classify("  COFFEE!! "), Category.DINING)
+        self.assertEqual(classify("Uber Eats"), Category.DINING)  # longest keyword wins over "uber"
+        self.assertEqual(classify("Uber to work"), Category.TRANSPORT)
+        self.assertEqual(classify("business lunch"), Category.DINING)  # "bus" only as a whole word
+        self.assertEqual(classify("DMart"), Category.GROCERIES)  # regex fallback
+        self.assertEqual(classify("xyz"), Category.UNCATEGORIZED)
+
+    def test_messy_descriptions_share_a_bucket(self):
+        for desc in ("coffee", "Coffee", "coffee ", "COFFEE", "cafe"):
+            CashEntry.objects.create(user=self.user, amount=5, date=date.today(), description=desc, is_income=False)
+        CashEntry.objects.create(user=self.user, amount=50, date=date.today(), description="groceries", is_income=False)
+        top = self.client.get("/coach/expense-analysis/").json()["top_expenses"]
+        self.assertEqual([t["category"] for t in top], ["groceries", "dining"])
+        self.assertEqual(top[1]["amount"], 25.0)
+
+    def test_edited_description_is_reclassified(self):
+        from accounts.models import Category
+        from coach.categorize import set_override
+        e = CashEntry.objects.create(user=self.user, amount=5, date=date.today(), description="coffee", is_income=False)
+        self.assertEqual(e.category, Category.DINING)
+        e.description = "Uber to work"
+        e.save()
+        self.assertEqual(CashEntry.objects.get(pk=e.pk).category, Category.TRANSPORT)
+        set_override(self.user.id, "chai", Category.GROCERIES)
+        e.description = "chai"
+        e.save()
+        self.assertEqual(CashEntry.objects.get(pk=e.pk).category, Category.GROCERIES)  # the override wins
+        e.description, e.category = "coffee", Category.TRANSPORT  # chosen in the same save: kept
+        e.save()
+        self.assertEqual(CashEntry.objects.get(pk=e.pk).category, Category.TRANSPORT)
+        e.amount = 6
+        e.save()
+        self.assertEqual(CashEntry.objects.get(pk=e.pk).category, Category.TRANSPORT)
+
+    def test_override_and_backfill(self):
+        from django.core.management import call_command
+        from accounts.models import Category
+        e = CashEntry.objects.create(user=self.user, amount=5, date=date.today(), description="Chai", is_income=False)
+        self.assertEqual(e.category, Category.UNCATEGORIZED)
+        r = self.client.post("/coach/categories/", {"description": "chai ", "category": "dining"},
+                             content_type="application/json")
+        self.assertEqual(r.json()["entries_updated"], 1)
+        e2 = CashEntry.objects.create(user=self.user, amount=5, date=date.today(), description="CHAI", is_income=False)
+        self.assertEqual(e2.category, Category.DINING)
+        self.assertEqual(self.client.get("/coach/categories/").json()["overrides"],
+                         [{"description": "chai", "category": "dining"}])
+        self.assertEqual(self.client.post("/coach/categories/", {"description": "x", "category": "nope"},
+                                          content_type="application/json").status_code, 400)
+
+        CashEntry.objects.filter(user=self.user).update(category=Category.UNCATEGORIZED)
+        call_command("categorize_entries", "--batch-size=1", stdout=StringIO())
+        self.assertEqual(set(CashEntry.objects.values_list("category", flat=True)), {Category.DINING})
+
+
+class PeriodStatementTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="stmt", password="pass")
+        self.client = Client()
+        self.client.login(username="stmt", password="pass")
+        self.today = date.today()
+        self.last_month = (self.today.replace(day=1) - timedelta(days=1)).replace(day=10)
+        Income.objects.create(user=self.user, amount=500, date=self.last_month, income_type="business")
+        CashEntry.objects.create(user=self.user, amount=20, date=self.last_month, description="Coffee", is_income=False)
+        CashEntry.objects.create(user=self.user, amount=100, date=self.today, description="rent", is_income=False)
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()  # category overrides are cached per user id, and ids are reused
+
+    def test_closed_periods_are_frozen(self):
+        from coach import reports
+        from coach.models import PeriodSnapshot
+        rows = reports.statement(self.user.id, reports.MONTH, 3)
+        self.assertEqual([r["closed"] for r in rows], [True, True, False])
+        prev = rows[1]
+        self.assertEqual(prev["income_by_type"], {"business": 500.0})
+        self.assertEqual(prev["expenses_by_category"], {"dining": 20.0})
+        self.assertEqual(prev["net"], 480.0)
+        self.assertEqual(rows[2]["expenses"], 100.0)
+        self.assertEqual(PeriodSnapshot.objects.filter(user=self.user).count(), 2)  # open month not stored
+
+        with self.assertNumQueries(4):  # stored rows + 3 grouped queries for the open month
+            self.assertEqual(reports.statement(self.user.id, reports.MONTH, 3), rows)
+
+        # a backdated entry drops the frozen month it lands in
+        CashEntry.objects.create(user=self.user, amount=5, date=self.last_month, description="bus", is_income=False)
+        self.assertEqual(reports.statement(self.user.id, reports.MONTH, 3)[1]["expenses"], 25.0)
+
+    def test_moves_and_recategorization_refreeze(self):
+        from django.core.management import call_command
+        from accounts.models import Category
+        from coach import reports
+        from coach.categorize import set_override
+        from coach.models import PeriodSnapshot
+        reports.statement(self.user.id, reports.MONTH, 3)
+        # moving an entry out of a closed month drops that month too
+        entry = CashEntry.objects.get(description="Coffee")
+        entry.date = self.today
+        entry.save()
+        rows = reports.statement(self.user.id, reports.MONTH, 3)
+        self.assertEqual((rows[1]["expenses"], rows[2]["expenses"]), (0.0, 120.0))
+        entry.date = self.last_month
+        entry.save()
+        reports.statement(self.user.id, reports.MONTH, 3)
+
+        set_override(self.user.id, "coffee", Category.GROCERIES)
+        self.assertEqual(reports.statement(self.user.id, reports.MONTH, 3)[1]["expenses_by_category"],
+                         {"groceries": 20.0})
+        # frozen while uncategorized, then backfilled
+        CashEntry.objects.filter(description="Coffee").update(category=Category.UNCATEGORIZED)
+        PeriodSnapshot.objects.filter(user=self.user).delete()
+        self.assertEqual(reports.statement(self.user.id, reports.MONTH, 3)[1]["expenses_by_category"],
+                         {"uncategorized": 20.0})
+        call_command("categorize_entries", stdout=StringIO())
+        self.assertEqual(reports.statement(self.user.id, reports.MONTH, 3)[1]["expenses_by_category"],
+                         {"groceries": 20.0})
+        # nothing changes: frozen statements and the ledger version stay
+        from coach import versions
+        frozen, version = PeriodSnapshot.objects.filter(user=self.user).count(), versions.versions(self.user.id)
+        out = StringIO()
+        call_command("categorize_entries", "--all", stdout=out)
+        self.assertIn("0 changed", out.getvalue())
+        self.assertEqual(PeriodSnapshot.objects.filter(user=self.user).count(), frozen)
+        self.assertEqual(versions.versions(self.user.id), version)
+
+    def test_endpoint_and_goal_deltas(self):
+        from coach.models import SavedGoal
+        g = SavedGoal.objects.create(user=self.user, name="Trip", target_amount=1000)
+        self.client.post("/coach/goals/bulk/", {"contributions": [{"goal_id": g.id, "delta": 75}]},
+                         content_type="application/json")
+        r = self.client.get("/coach/statements/?period=week&count=2")
+        self.assertEqual(r.status_code, 200)
+        current = r.json()["statements"][-1]
+        self.assertEqual(current["goal_deltas"], {str(g.id): 75.0})
+        self.assertEqual(self.client.get("/coach/statements/?period=year").status_code, 400)
+
+
+class LedgerSeriesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="series", password="pass")
+        self.client = Client()
+        self.client.login(username="series", password="pass")
+
+    def test_zero_filled_buckets(self):
+        Income.objects.create(user=self.user, amount=100, date=date(2026, 3, 2), income_type="business")
+        CashEntry.objects.create(user=self.user, amount=30, date=date(2026, 3, 4), description="bus", is_income=False)
+        CashEntry.objects.create(user=self.user, amount=10, date=date(2026, 3, 16), description="tips", is_income=True)
+        r = self.client.get("/coach/series/?from=2026-03-01&to=2026-03-22&granularity=week").json()
+        self.assertEqual(r["buckets"], ["2026-02-23", "2026-03-02", "2026-03-09", "2026-03-16"])
+        self.assertEqual(r["income"], [0.0, 100.0, 0.0, 0.0])
+        self.assertEqual(r["net"], [0.0, 70.0, 0.0, 10.0])
+        day = self.client.get("/coach/series/?from=2026-03-01&to=2026-03-05").json()
+        self.assertEqual(day["expenses"], [0.0, 0.0, 0.0, 30.0])
+        self.assertEqual(self.client.get("/coach/series/?granularity=hour").status_code, 400)
+        clamped = self.client.get("/coach/series/?granularity=month&from=1950-01-01&to=2026-03-01").json()
+        self.assertEqual(clamped["from"], "2024-03-01")  # 730 days, not 76 years
+        self.assertEqual(len(clamped["buckets"]), 24)
+
+
+class LedgerSnapshotTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ledger", password="pass")
+        self.today = date.today()
+        Income.objects.create(user=self.user, amount=100, date=self.today - timedelta(days=2), income_type="business")
+        CashEntry.objects.create(user=self.user, amount=20, date=self.today - timedelta(days=2), description="tips", is_income=True)
+        CashEntry.objects.create(user=self.user, amount=5, date=self.today, description="bus", is_income=False)
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_build_slice_and_roundtrip(self):
+        from coach.ledger import LedgerSnapshot, snapshot_for
+        s = snapshot_for(self.user.id)
+        self.assertEqual(len(s), 2)
+        self.assertEqual(s.totals(), (10000, 2000, 500))
+        self.assertEqual(s.totals(self.today), (0, 0, 500))
+        self.assertEqual(s.daily_earnings(), {self.today - timedelta(days=2): 12000})
+        self.assertEqual(s.recent_earnings(3), [12000])
+        self.assertEqual(LedgerSnapshot.from_bytes(s.to_bytes()), s)
+        with self.assertNumQueries(1):  # the version lookup
+            self.assertEqual(snapshot_for(self.user.id), s)
+
+    def test_create_patches_cached_snapshot(self):
+        from coach.ledger import build, snapshot_for
+        snapshot_for(self.user.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            CashEntry.objects.create(user=self.user, amount=7, date=self.today - timedelta(days=1),
+                                     description="tea", is_income=False)
+        callbacks[-1]()  # the patch
+        with self.assertNumQueries(1):  # the version lookup
+            patched = snapshot_for(self.user.id)
+        self.assertEqual(patched, build([self.user.id])[self.user.id])
+
+    def test_write_during_rebuild_is_not_counted_twice(self):
+        from unittest import mock
+        from coach import ledger
+        real_build = ledger.build
+
+        def build_after_a_write(user_ids):  # commits after the version read, before the build
+            Income.objects.create(user=self.user, amount=7, date=self.today, income_type="business")
+            return real_build(user_ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(ledger, "build", build_after_a_write):
+                self.assertEqual(ledger.snapshot_for(self.user.id).totals()[0], 10700)
+        self.assertEqual(ledger.snapshot_for(self.user.id).totals()[0], 10700)  # patch() found nothing to patch
+
+    def test_unpatched_and_bulk_writes_make_the_snapshot_stale(self):
+        from coach import versions
+        from coach.ledger import snapshot_for
+        self.assertEqual(snapshot_for(self.user.id).totals()[0], 10000)
+        # the after-commit patch never runs here, as for a write made by another process
+        Income.objects.create(user=self.user, amount=900, date=self.today, income_type="business")
+        self.assertEqual(snapshot_for(self.user.id).totals()[0], 100000)
+        # bulk_create sends no signals; bulk writers bump the version themselves
+        Income.objects.bulk_create([Income(user=self.user, amount=1, date=self.today, income_type="business")])
+        versions.bump(self.user.id, kinds=(versions.LEDGER,))
+        self.assertEqual(snapshot_for(self.user.id).totals()[0], 100100)
+
+
+class AggregateStoreTest(TestCase):
+    def setUp(self):
+        import tempfile
+        self.user = User.objects.create_user(username="agg", password="pass")
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        CashEntry.objects.create(user=self.user, amount=80, date=date.today(), description="rent", is_income=False)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = f"{self.dir.name}/aggregates.bin"
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.dir.cleanup()
+
+    def test_rebuild_read_and_check(self):
+        from coach.aggstore import AggregateStore
+        store = AggregateStore(self.path)
+        store.rebuild([self.user.id])
+        aggs = store.get_many([self.user.id])[self.user.id]
+        self.assertEqual((aggs.recent_days, aggs.recent_sum, aggs.cash_out_30), (1, 5000, 8000))
+        self.assertEqual(store.check([self.user.id]), [])
+
+        # a new entry makes the record disagree until it is refreshed
+        Income.objects.create(user=self.user, amount=10, date=date.today(), income_type="personal")
+        self.assertNotIn(self.user.id, store.get_many([self.user.id]))  # ledger version moved
+        self.assertEqual(len(store.check([self.user.id])), 1)
+        store.refresh([self.user.id])
+        self.assertEqual(store.check([self.user.id]), [])
+        self.assertIsNone(store.read(self.user.id + 1000))
+
+    def test_agent_uses_store(self):
+        from django.core.management import call_command
+        from coach import agent
+        with override_settings(COACH_AGGREGATE_STORE=self.path):
+            call_command("aggregate_store", "--rebuild", "--check", stdout=StringIO())
+            stats = agent.run()
+        self.assertEqual(stats["cards"], 2)  # low income + high expense
+
+
+class AgentStartupTest(TestCase):
+    def test_agent_settings_skip_the_web_stack(self):
+        from benchmarks import startup
+        _, heavy, _ = startup.cold_start(startup.BATCH_SETTINGS)  # the time budget: run_benchmarks --startup
+        self.assertEqual(heavy, "[]")
+
+    def test_check_flags_budget_and_heavy_modules(self):
+        from benchmarks import startup
+        report = {startup.BATCH_SETTINGS: {"median_ms": 900.0, "heavy_modules": "[]"}}
+        self.assertEqual(startup.check(report, budget_ms=1000), [])
+        report[startup.BATCH_SETTINGS] = {"median_ms": 1200.0, "heavy_modules": '["rest_framework"]'}
+        self.assertEqual(len(startup.check(report, budget_ms=1000)), 2)
+
+    def test_slowest_imports_parses_importtime(self):
+        from benchmarks import startup
+        self.assertEqual(startup.slowest_imports("import time: self [us] | cumulative | imported package\n"
+                                                 "import time:       10 |        250 | coach.agent\n"), [(250, "coach.agent")])
+
+
+class SchedulerTest(TestCase):
+    def test_lease_allows_one_active_scheduler(self):
+        from django.utils import timezone
+        from coach.scheduler import acquire_lease, release_lease
+        now = timezone.now()
+        self.assertTrue(acquire_lease("a", 60, now=now))
+        self.assertFalse(acquire_lease("b", 60, now=now))
+        self.assertTrue(acquire_lease("a", 60, now=now + timedelta(seconds=30)))  # renewal
+        self.assertTrue(acquire_lease("b", 60, now=now + timedelta(seconds=91)))  # expired: taken over
+        self.assertFalse(acquire_lease("a", 60, now=now + timedelta(seconds=92)))
+        release_lease("b")
+        self.assertTrue(acquire_lease("a", 60, now=now + timedelta(seconds=93)))
+
+    def test_runs_due_jobs_and_reschedules_with_jitter(self):
+        from coach.scheduler import Job, Scheduler
+        calls = []
+        def boom():
+            raise RuntimeError("boom")
+        scheduler = Scheduler([Job("a", lambda: calls.append("a") or "ok", 60, 5), Job("b", boom, 60, 0)], owner="me")
+        self.assertTrue(scheduler.renew())
+        scheduler.next_run = dict.fromkeys(scheduler.next_run, 0)
+        ran = dict(scheduler.run_due())
+        self.assertEqual(ran["a"], "ok")
+        self.assertIsInstance(ran["b"], RuntimeError)  # a failing job doesn't stop the others
+        self.assertEqual(scheduler.run_due(), [])  # nothing due for another minute
+        self.assertEqual(calls, ["a"])
+
+        standby = Scheduler(scheduler.jobs, owner="other")
+        self.assertEqual(standby.run_due(force=True), [])
+        scheduler.release()
+        self.assertEqual([name for name, _ in standby.run_due(force=True)], ["a", "b"])
+
+    @override_settings(COACH_SCHEDULER={"jobs": {"prune": {"interval": None}}})
+    def test_config_merges_defaults_and_rejects_unknown_jobs(self):
+        from coach.scheduler import get_config
+        _, _, jobs = get_config()
+        names = [j.name for j in jobs]
+        self.assertIn("agent", names)
+        self.assertNotIn("prune", names)
+        self.assertEqual([j.name for j in get_config(["queue"])[2]], ["queue"])
+        with self.assertRaises(ValueError):
+            get_config(["nope"])
+
+    def test_process_cache_is_dropped_after_each_job(self):
+        from django.core.cache import cache
+        from coach.scheduler import Job, Scheduler
+        scheduler = Scheduler([Job("projections", lambda: cache.set("seen", 1), 60, 0)], owner="me")
+        scheduler.run_due(force=True)
+        scheduler.release()
+        self.assertIsNone(cache.get("seen"))  # a LocMemCache never hears of other processes' saves
+
+    def test_statements_and_projections_jobs(self):
+        from coach.models import SavedGoal
+        from coach.scheduler import JOB_FUNCTIONS, get_config
+        user = User.objects.create_user(username="sched", password="pass")
+        Income.objects.create(user=user, amount=300, date=date.today() - timedelta(days=70), income_type="business")
+        SavedGoal.objects.create(user=user, name="Trip", target_amount=1000)
+        self.assertIn("projections", [j.name for j in get_config()[2]])
+        self.assertTrue(JOB_FUNCTIONS["statements"]().endswith("across 1 users"))
+        self.assertEqual(JOB_FUNCTIONS["projections"](), "projections refreshed for 1 goals across 1 users")
+        self.assertIsNotNone(SavedGoal.objects.get(user=user).projected_completion)
+
+
+class HistoryGuardTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="guard", password="pass")
+        Income.objects.create(user=self.user, amount=50, date=date.today(), income_type="personal")
+        self.client = Client()
+        self.client.login(username="guard", password="pass")
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_window_params_are_clamped_and_validated(self):
+        self.assertEqual(self.client.get("/coach/expense-analysis/?days=3650").json()["days"], 730)
+        self.assertEqual(self.client.get("/coach/heatmap/?weeks=520").status_code, 200)
+        self.assertEqual(self.client.get("/coach/buffer/?months=-5").json()["months"], 1)
+        self.assertEqual(self.client.get("/coach/heatmap/?weeks=abc").status_code, 400)
+        self.assertEqual(self.client.get("/income/variability/?days=1e9").status_code, 400)
+        self.assertEqual(self.client.get("/coach/ui/heatmap/?weeks=200").status_code, 200)
+        self.assertEqual(self.client.get("/coach/ui/heatmap/?weeks=abc").status_code, 400)
+
+    @override_settings(COACH_RATE_LIMITS={"history": {"capacity": 2, "per_second": 0.01}})
+    def test_token_bucket_returns_429_but_not_for_revalidation(self):
+        first = self.client.get("/coach/heatmap/")
+        self.assertEqual(self.client.get("/coach/heatmap/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get("/coach/heatmap/?weeks=8").status_code, 200)
+        limited = self.client.get("/coach/heatmap/?weeks=9")
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreater(int(limited["Retry-After"]), 1)
+
+    def test_token_refill(self):
+        from coach.throttle import take_token
+        with self.settings(COACH_RATE_LIMITS={"s": {"capacity": 2, "per_second": 1}}):
+            self.assertEqual(take_token("s", 1, now=100), 0)
+            self.assertEqual(take_token("s", 1, now=100), 0)
+            self.assertAlmostEqual(take_token("s", 1, now=100), 1)
+            self.assertEqual(take_token("s", 1, now=101), 0)
+
+    def test_concurrent_identical_calls_share_one_computation(self):
+        import threading
+        import time
+        from coach.throttle import coalesce
+        started, release, calls, results = threading.Event(), threading.Event(), [], []
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"n": len(calls)}
+        leader = threading.Thread(target=lambda: results.append(coalesce("k", compute)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(coalesce("k", compute, "test.view")))
+        follower.start()
+        from coach.metrics import REGISTRY
+        for _ in range(500):  # until the follower is waiting on the leader
+            if REGISTRY.counters["coach_coalesced_total"].get("test.view"):
+                break
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(coalesce("k", lambda: "again"), "again")  # nothing in flight any more
+
+    def test_coalesce_waiters_give_up_on_a_stuck_leader(self):
+        import threading
+        from coach.throttle import coalesce
+        started, release = threading.Event(), threading.Event()
+        def stuck():
+            started.set()
+            release.wait(5)
+            return "leader"
+        leader = threading.Thread(target=lambda: coalesce("stuck", stuck))
+        leader.start()
+        started.wait(5)
+        self.assertEqual(coalesce("stuck", lambda: "own", timeout=0.05), "own")
+        release.set()
+        leader.join(5)
+
+
+class SupportAdminTest(TestCase):
+    def setUp(self):
+        from coach.models import SavedGoal
+        self.staff = User.objects.create_superuser(username="support", password="pass")
+        self.user = User.objects.create_user(username="customer", password="pass")
+        CoachingSettings.objects.create(user=self.user)
+        for i in range(3):
+            Income.objects.create(user=self.user, amount=10, date=date(2024, 12, 30) + timedelta(days=i * 20),
+                                  income_type="personal")
+        CashEntry.objects.create(user=self.user, description="coffee", amount=3, date=date.today(), is_income=False)
+        SavedGoal.objects.create(user=self.user, name="bike", target_amount=200, current_amount=50)
+        SavedGoal.objects.create(user=self.user, name="trip", target_amount=100, current_amount=25)
+        AdviceCard.objects.create(user=self.user, title="t", body="b", tag="low_income")
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_changelists_render(self):
+        for url in ("/admin/accounts/income/", "/admin/accounts/cashentry/?q=customer", "/admin/coach/advicecard/",
+                    "/admin/coach/savedgoal/?o=6", "/admin/coach/coachingsettings/",
+                    "/admin/accounts/income/?date__year=2025"):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        page = self.client.get("/admin/coach/coachingsettings/").content.decode()
+        self.assertIn("75.00", page)  # goals saved total, annotated per user
+        self.assertIn("25.0", self.client.get("/admin/coach/savedgoal/").content.decode())
+        self.assertEqual(self.client.get("/admin/accounts/income/?q=nobody").context["cl"].result_count, 0)
+
+    def test_calendar_date_hierarchy(self):
+        from accounts.admin import CalendarQuerySet
+        qs = CalendarQuerySet(Income)
+        self.assertEqual(qs.dates("date", "year"), [date(2024, 1, 1), date(2025, 1, 1)])
+        self.assertEqual(qs.filter(date__year=2025).dates("date", "month", "DESC"), [date(2025, 2, 1), date(2025, 1, 1)])
+        self.assertEqual(len(CalendarQuerySet(AdviceCard).datetimes("created_at", "day")), 1)
+
+    def test_estimated_count_paginator(self):
+        from accounts.paginators import EstimatedCountPaginator
+        paginator = EstimatedCountPaginator(Income.objects.order_by("id"), 2)
+        self.assertEqual(paginator.count, 3)
+        paginator = EstimatedCountPaginator(Income.objects.order_by("id"), 2)
+        paginator.exact_below = 1  # use the primary key range estimate
+        ids = list(Income.objects.values_list("id", flat=True))
+        self.assertEqual(paginator.count, max(ids) - min(ids) + 1)
+        paginator = EstimatedCountPaginator(Income.objects.filter(user=self.user).order_by("id"), 2)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 2)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisioningTest(TestCase):
+    def rows(self, n, prefix="partner"):
+        return [{"username": f"{prefix}{i}", "email": f"{prefix}{i}@example.com", "password": f"pw{i}"} for i in range(n)]
+
+    def test_creates_users_settings_and_goals_in_batches(self):
+        from django.contrib.auth import authenticate
+        from coach.models import SavedGoal
+        from coach.provisioning import STARTER_GOALS, provision
+        report = provision(self.rows(12), batch_size=5, workers=2)
+        self.assertEqual(report["created"], 12)
+        self.assertEqual([b["users"] for b in report["batches"]], [5, 5, 2])
+        self.assertEqual(set(report["users"]), {f"partner{i}" for i in range(12)})
+        self.assertEqual(CoachingSettings.objects.filter(user__username__startswith="partner").count(), 12)
+        self.assertEqual(SavedGoal.objects.filter(user__username__startswith="partner").count(), 12 * len(STARTER_GOALS))
+        self.assertIsNotNone(authenticate(username="partner11", password="pw11"))
+        from coach.models import PendingEvaluation
+        self.assertEqual(PendingEvaluation.objects.filter(user__username__startswith="partner").count(), 12)
+
+    def test_invalid_or_taken_rows_create_nothing(self):
+        from coach.provisioning import ProvisioningError, provision
+        User.objects.create_user(username="partner1")
+        rows = self.rows(3) + [{"username": "bad name!"}, {"username": "partner0"}]
+        with self.assertRaises(ProvisioningError) as ctx:
+            provision(rows, workers=1)
+        self.assertEqual([i for i, _ in ctx.exception.problems], [1, 3, 4])
+        self.assertEqual(User.objects.filter(username__startswith="partner").count(), 1)
+        report = provision(self.rows(3), skip_existing=True, starter_goals=False, workers=1)
+        self.assertEqual((report["created"], report["skipped"]), (2, ["partner1"]))
+        self.assertFalse(CoachingSettings.objects.filter(user__username="partner1").exists())  # left untouched
+
+    def test_api_is_staff_only(self):
+        import json
+        User.objects.create_user(username="plain", password="pass")
+        User.objects.create_user(username="ops", password="pass", is_staff=True)
+        client = Client()
+        client.login(username="plain", password="pass")
+        body = json.dumps({"users": self.rows(2)})
+        self.assertEqual(client.post("/coach/provision/", body, content_type="application/json").status_code, 403)
+        client.login(username="ops", password="pass")
+        resp = client.post("/coach/provision/", body, content_type="application/json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["created"], 2)
+        resp = client.post("/coach/provision/", body, content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(len(resp.json()["problems"]), 2)
+        with self.settings(COACH_PROVISION_MAX_USERS=3):
+            resp = client.post("/coach/provision/", json.dumps({"users": self.rows(4, "big")}),
+                               content_type="application/json")
+        self.assertEqual(resp.status_code, 400)  # bigger imports: manage.py provision_users
+        self.assertFalse(User.objects.filter(username__startswith="big").exists())
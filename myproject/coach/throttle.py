@@ -0,0 +1,170 @@
+# coach/throttle.py
+"""
+Guards for the endpoints that scan ledger history.
+
+  - bounded_int() parses a window parameter (days, weeks, months) and clamps
+    it to COACH_PARAM_BOUNDS, so no query string can ask for decades of
+    history. Anything that isn't an integer is a 400. bounded_span() does the
+    same for an explicit date range, using the "days" bound.
+  - @throttle(scope) is a per-user token bucket kept in the cache
+    (COACH_RATE_LIMITS). Each computed response takes one token, and tokens
+    refill at a steady rate. An empty bucket answers 429 with Retry-After. It
+    sits inside @condition, so a 304 revalidation costs no token.
+  - coalesce() lets identical concurrent requests of one user (same view,
+    same query string) in this process share a single computation. The first
+    request computes and the others wait for its result, for at most
+    COALESCE_WAIT_SECONDS; then they compute it themselves.
+
+The bucket is stored as a single "theoretical arrival time" (GCRA), one
+cache read and one write per request, in the default cache. That cache must
+be shared (Redis, Memcached) when there is more than one worker process:
+with a per-process LocMemCache every worker keeps its own bucket, and a user
+gets `capacity` requests per worker. Two processes can race on the same
+bucket and let a request through; it is a guard against runaway clients, not
+an exact quota.
+"""
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseBadRequest
+
+from .metrics import REGISTRY
+
+DEFAULT_BOUNDS = {"days": (1, 730), "weeks": (1, 104), "months": (1, 24)}
+DEFAULT_RATE_LIMITS = {"history": {"capacity": 20, "per_second": 0.5}}
+COALESCE_WAIT_SECONDS = 30
+
+
+class BadParameter(ValueError):
+    pass
+
+
+def bounded_int(request, name, default):
+    """
+    request.GET[name] as an int clamped to COACH_PARAM_BOUNDS[name] (a None
+    default means the upper bound). BadParameter if it isn't an integer.
+    """
+    low, high = _bounds(name)
+    raw = request.GET.get(name)
+    try:
+        value = default if raw in (None, "") else int(raw)
+    except ValueError:
+        raise BadParameter(f"{name} must be an integer")
+    return high if value is None else min(max(value, low), high)
+
+
+def bounded_span(start, end):
+    """`start`, moved forward if [start, end) is longer than the COACH_PARAM_BOUNDS "days" bound."""
+    return max(start, end - timedelta(days=_bounds("days")[1]))
+
+
+def _bounds(name):
+    return getattr(settings, "COACH_PARAM_BOUNDS", DEFAULT_BOUNDS).get(name, DEFAULT_BOUNDS[name])
+
+
+def bad_parameter(view_func):
+    """Turn BadParameter raised by the view into a 400."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except BadParameter as e:
+            return HttpResponseBadRequest(str(e))
+    return wrapper
+
+
+# --------- token bucket ----------
+def _limits(scope):
+    return getattr(settings, "COACH_RATE_LIMITS", DEFAULT_RATE_LIMITS).get(scope)
+
+
+def take_token(scope, user_id, now=None):
+    """
+    Spend one token of the user's bucket. Returns 0 if allowed, else seconds
+    until a token is available. Per process unless the cache is shared.
+    """
+    limits = _limits(scope)
+    if not limits:
+        return 0
+    now = time.time() if now is None else now
+    interval = 1 / limits["per_second"]
+    key = f"throttle:{scope}:{user_id}"
+    # the bucket is empty while tat - now exceeds the burst the capacity allows
+    tat = max(cache.get(key, now), now)
+    wait = tat - now - (limits["capacity"] - 1) * interval
+    if wait > 0:
+        return wait
+    cache.set(key, tat + interval, int(limits["capacity"] * interval) + 1)
+    return 0
+
+
+def throttle(scope):
+    """Per-user rate limit on a view (see COACH_RATE_LIMITS); place it inside @condition."""
+    def decorator(view_func):
+        view = f"{view_func.__module__}.{view_func.__qualname__}"
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            wait = take_token(scope, request.user.id)
+            if wait:
+                REGISTRY.count("coach_throttled_total", view)
+                response = HttpResponse("Too many requests", status=429, content_type="text/plain")
+                response["Retry-After"] = str(int(wait) + 1)
+                return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------- coalescing ----------
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesce(key, compute, view=None, timeout=None):
+    """
+    compute(), shared with any concurrent caller passing the same key. A
+    caller that waited `timeout` seconds (COALESCE_WAIT_SECONDS) for another
+    one's result computes it itself.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+    if not leader:
+        if view:
+            REGISTRY.count("coach_coalesced_total", view)
+        if not call.done.wait(COALESCE_WAIT_SECONDS if timeout is None else timeout):
+            return compute()
+        if call.error is not None:
+            raise call.error
+        return call.result
+    try:
+        call.result = compute()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+
+
+def request_key(request, view):
+    """Coalescing key: same user, same view, same query string."""
+    return (view, request.user.id, request.GET.urlencode())
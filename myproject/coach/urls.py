@@ -1,17 +1,24 @@
 # coach/urls.py
 from django.urls import path
-from . import views
+from . import stream, views
 
 urlpatterns = [
     path('health/', views.health),
+    path('metrics/', views.metrics),
     path('low-income-alert/', views.low_income_alert),
 
     path('expense-analysis/', views.expense_analysis),
+    path('categories/', views.categories),
+    path('provision/', views.provision_users),
     path('advice/', views.advice_feed),
+    path('stream/', stream.advice_stream),
 
     path('goals/', views.goals_list_create),
+    path('goals/bulk/', views.goals_bulk),
     path('goals/<int:pk>/', views.goal_detail),
 
+    path('series/', views.ledger_series),
+    path('statements/', views.statements),
     path('buffer/', views.emergency_buffer),
     path('heatmap/', views.weekly_heatmap),
 ]
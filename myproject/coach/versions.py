@@ -0,0 +1,104 @@
+# coach/versions.py
+"""
+Validators for conditional GET on the coach API.
+
+Aggregate endpoints are validated by per-user data versions stored in the
+database (coach.models.DataVersion): one counter per kind of data (ledger,
+goals, settings), bumped by the signals in coach/signals.py and by the bulk
+paths that bypass signals. The bump runs inside the writer's transaction, so
+it commits or rolls back with the data, and every process -- other web
+workers, the scheduler, management commands -- sees it. A poll with a
+matching If-None-Match costs one primary-key lookup.
+
+The advice feed is validated from the table itself (see advice_etag): one
+indexed aggregate instead of loading and serializing the cards.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from django.db.models import Count, F, Max, Q
+from django.views.decorators.http import condition
+
+from .models import AdviceCard, DataVersion
+
+LEDGER = "ledger"
+GOALS = "goals"
+SETTINGS = "settings"
+KINDS = (LEDGER, GOALS, SETTINGS)
+
+
+def versions(user_id, *kinds):
+    """Current version of each kind for one user; one primary-key lookup."""
+    row = DataVersion.objects.filter(user_id=user_id).values_list(*kinds).first()
+    return row or (0,) * len(kinds)
+
+
+def many(user_ids, *kinds):
+    """{user_id: versions tuple} for many users in one query (0 for users never bumped)."""
+    user_ids = list(user_ids)
+    found = {uid: tuple(v) for uid, *v in DataVersion.objects.filter(user_id__in=user_ids)
+             .values_list("user_id", *kinds)}
+    return {uid: found.get(uid, (0,) * len(kinds)) for uid in user_ids}
+
+
+def bump(*user_ids, kinds=(LEDGER,)):
+    """
+    Move the given kinds of versions forward for these users. Call it in the
+    transaction that writes the data: a poll can then never see the new data
+    under the old version.
+    """
+    user_ids = sorted(set(user_ids))
+    step = {kind: F(kind) + 1 for kind in kinds}
+    for i in range(0, len(user_ids), 500):
+        chunk = user_ids[i:i + 500]
+        if DataVersion.objects.filter(user_id__in=chunk).update(**step) < len(chunk):
+            # first bump for some users: seed them with the clock, so a re-created
+            # row never hands out a version an old cache entry was stored under
+            seed = time.time_ns()
+            DataVersion.objects.bulk_create([DataVersion(user_id=uid, **{k: seed for k in KINDS}) for uid in chunk],
+                                            ignore_conflicts=True)
+            DataVersion.objects.filter(user_id__in=chunk).update(**step)
+
+
+def _request_digest(request):
+    # path and query string: /coach/goals/1/ and /coach/goals/2/ never share a tag
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()[:8]
+
+
+def etag_for(*kinds, daily=False):
+    """
+    etag_func for django.views.decorators.http.condition(). `daily` mixes in
+    today's date for endpoints whose window is relative to today.
+    """
+    def etag(request, *args, **kwargs):
+        parts = [str(request.user.id), *map(str, versions(request.user.id, *kinds)), _request_digest(request)]
+        if daily:
+            parts.append(date.today().isoformat())
+        return "-".join(parts)
+    return etag
+
+
+def advice_etag(request, *args, **kwargs):
+    """
+    New cards move max(id), deletions move the count, mark-read moves the
+    unread count. (No Last-Modified: a mark-read doesn't change created_at.)
+    """
+    s = AdviceCard.objects.filter(user=request.user).aggregate(
+        last_id=Max("id"), total=Count("id"), unread=Count("id", filter=Q(read=False)))
+    return f"{request.user.id}-{s['last_id']}-{s['total']}-{s['unread']}-{_request_digest(request)}"
+
+
+def conditional(etag_func):
+    """condition(etag_func=...) for GET/HEAD only; writes skip the validator lookup."""
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in ("GET", "HEAD"):
+                return conditional_view(request, *args, **kwargs)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
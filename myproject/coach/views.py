@@ -1,37 +1,63 @@
 # coach/views.py
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
-from django.views.decorators.http import require_GET, require_http_methods
-from django.utils import timezone
-from django.db.models import Sum
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET, require_http_methods
 from datetime import timedelta, date
-import statistics
+import hmac
 
 from .models import CoachingSettings, SavedGoal, AdviceCard
-from .group_a_client import get_daily_income, get_transactions, fallback_mock_data
-from accounts.models import Income, CashEntry  # direct access if needed
+from . import categorize, goals, provisioning, reports, series, versions
+from .metrics import REGISTRY, query_budget, record_cache
+from .responses import FastJsonResponse
+from .throttle import bad_parameter, bounded_int, bounded_span, coalesce, request_key, throttle
+from .group_a_client import get_daily_income_cents, fallback_mock_data
+from accounts.fields import SumCents, as_units, parse_amount, to_cents
+from accounts.models import CashEntry, Category  # direct access if needed
 
 CACHE_TIMEOUT = 60  # seconds, tweak as needed
 
 # --------- Health (keep) ----------
 def health(request):
-    return JsonResponse({"status": "ok", "module": "coach"})
+    return FastJsonResponse({"status": "ok", "module": "coach"})
+
+
+# --------- Metrics (Prometheus text format) ----------
+@require_GET
+def metrics(request):
+    """Staff sessions, or a scraper sending "Authorization: Bearer <COACH_METRICS_TOKEN>"."""
+    token = getattr(settings, "COACH_METRICS_TOKEN", None)
+    sent = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not request.user.is_staff and not (token and hmac.compare_digest(sent.encode(), token.encode())):
+        return HttpResponseForbidden("metrics are restricted")
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # --------- Low income alert (cache it) ----------
+@query_budget(8)
 @login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, versions.SETTINGS))
 @require_GET
 def low_income_alert(request):
-    cache_key = f"low_income:{request.user.id}"
+    return FastJsonResponse(low_income_status(request.user))
+
+
+def low_income_status(user):
+    """Low-income check payload for one user (also pushed by coach.stream)."""
+    # keyed by data version: a ledger/settings change never serves the old result
+    ledger_v, settings_v = versions.versions(user.id, versions.LEDGER, versions.SETTINGS)
+    cache_key = f"low_income:{user.id}:{ledger_v}:{settings_v}"
     cached = cache.get(cache_key)
+    record_cache(bool(cached))
     if cached:
-        return JsonResponse(cached)
+        return cached
 
-    data = get_daily_income(request.user)
+    data = get_daily_income_cents(user)
     used_fallback = False
     if not data:
-        data = fallback_mock_data()
+        data = {d: to_cents(v) for d, v in fallback_mock_data().items()}
         used_fallback = True
 
     # sort by date and compute average of last 3 days
@@ -40,29 +66,33 @@ def low_income_alert(request):
     if not totals:
         resp = {"status": "no_data", "message": "No income data"}
         cache.set(cache_key, resp, CACHE_TIMEOUT)
-        return JsonResponse(resp)
+        return resp
 
     last_three = totals[-3:] if len(totals) >= 3 else totals
     avg_recent = sum(last_three) / len(last_three)
 
-    settings_obj, _ = CoachingSettings.objects.get_or_create(user=request.user)
-    threshold = settings_obj.low_income_threshold
+    settings_obj = CoachingSettings.for_user(user.id)
+    threshold = to_cents(settings_obj.low_income_threshold)
 
     status = "low_income_warning" if avg_recent < threshold else "normal"
     resp = {
         "status": status,
-        "average_recent": round(avg_recent, 2),
-        "threshold": threshold,
+        "average_recent": as_units(avg_recent),
+        "threshold": as_units(threshold),
         "data_points": len(totals),
         "used_fallback": used_fallback
     }
     cache.set(cache_key, resp, CACHE_TIMEOUT)
-    return JsonResponse(resp)
+    return resp
 
 
 # --------- Expense Analysis ----------
+@query_budget(8)
 @login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, daily=True))
 @require_GET
+@bad_parameter
+@throttle("history")
 def expense_analysis(request):
     """
     Returns:
@@ -70,47 +100,84 @@ def expense_analysis(request):
       - total_cash_income
       - total_expenses (cash entries where is_income=False)
       - expense_ratio = expenses / income
-      - top expense descriptions
+      - top expense categories (see coach.categorize)
     Optional query params:
-      - days=30 (analysis window)
+      - days=30 (analysis window, clamped to COACH_PARAM_BOUNDS)
     """
-    days = int(request.GET.get("days", 30))
-    cache_key = f"expense_analysis:{request.user.id}:{days}"
+    days = bounded_int(request, "days", 30)
+    ledger_v, = versions.versions(request.user.id, versions.LEDGER)
+    cache_key = f"expense_analysis:{request.user.id}:{days}:{ledger_v}:{date.today()}"
     cached = cache.get(cache_key)
+    record_cache(bool(cached))
     if cached:
-        return JsonResponse(cached)
+        return FastJsonResponse(cached)
+    try:
+        result = coalesce(cache_key, lambda: _expense_analysis(request.user.id, days), "coach.views.expense_analysis")
+    except ValueError:
+        return HttpResponseBadRequest("days out of range")
+    cache.set(cache_key, result, CACHE_TIMEOUT)
+    return FastJsonResponse(result)
 
-    # window
-    since = date.today() - timedelta(days=days)
-    incomes_qs = Income.objects.filter(user=request.user, date__gte=since)
-    cash_qs = CashEntry.objects.filter(user=request.user, date__gte=since)
 
-    total_income = float(incomes_qs.aggregate(Sum('amount'))['amount__sum'] or 0)
-    total_cash_income = float(cash_qs.filter(is_income=True).aggregate(Sum('amount'))['amount__sum'] or 0)
-    total_expenses = float(cash_qs.filter(is_income=False).aggregate(Sum('amount'))['amount__sum'] or 0)
-    # include incomes as part of total income (already done)
-    net_income = total_income + total_cash_income
+def _expense_analysis(user_id, days):
+    # window; totals in integer cents from one series query
+    since, until = date.today() - timedelta(days=days), date.today() + timedelta(days=1)
+    window = series.series(user_id, since, until, series.MONTH)
+    total_cash_income = sum(window.cash_income)
+    total_expenses = sum(window.expenses)
+    # include incomes as part of total income
+    net_income = sum(window.income) + total_cash_income
+    cash_qs = CashEntry.objects.filter(user_id=user_id, date__gte=since, date__lt=until)
 
     expense_ratio = (total_expenses / net_income) if net_income > 0 else None
 
-    # top expense descriptions
-    descs = cash_qs.filter(is_income=False).values('description').annotate(total=Sum('amount')).order_by('-total')[:5]
-    top_expenses = [{"description": d['description'] or "unknown", "amount": float(d['total'])} for d in descs]
+    # top expense categories ("Coffee", "coffee " and "cafe" are one bucket); grouped on the indexed column
+    cats = cash_qs.filter(is_income=False).values('category').annotate(total=SumCents('amount')).order_by('-total')[:5]
+    top_expenses = [{"category": categorize.slug(c['category']), "description": Category(c['category']).label,
+                     "amount": as_units(c['total'])} for c in cats]
 
-    result = {
+    return {
         "days": days,
-        "total_income": round(net_income, 2),
-        "total_cash_income": round(total_cash_income, 2),
-        "total_expenses": round(total_expenses, 2),
+        "total_income": as_units(net_income),
+        "total_cash_income": as_units(total_cash_income),
+        "total_expenses": as_units(total_expenses),
         "expense_ratio": round(expense_ratio, 2) if expense_ratio is not None else None,
         "top_expenses": top_expenses
     }
-    cache.set(cache_key, result, CACHE_TIMEOUT)
-    return JsonResponse(result)
+
+
+# --------- Expense categories ----------
+@query_budget(6)
+@login_required
+@require_http_methods(["GET","POST"])
+def categories(request):
+    """
+    GET: the category list and the user's overrides.
+    POST {"description": "chai", "category": "dining"}: always file that
+    description (normalized) under that category, including existing entries.
+    """
+    if request.method == "GET":
+        overrides = categorize.overrides_for([request.user.id])[request.user.id]
+        return FastJsonResponse({
+            "categories": [{"id": c.value, "slug": categorize.slug(c), "label": c.label} for c in Category],
+            "overrides": [{"description": d, "category": categorize.slug(c)} for d, c in sorted(overrides.items())],
+        })
+    import json
+    try:
+        body = json.loads(request.body.decode() or "{}")
+        category = categorize.from_slug(body["category"])
+        updated = categorize.set_override(request.user.id, body["description"], category)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return HttpResponseBadRequest("description and a valid category required")
+    return FastJsonResponse({"description": categorize.normalize(body["description"]),
+                             "category": categorize.slug(category), "entries_updated": updated})
 
 
 # --------- Advice feed ----------
+@gzip_page
+@query_budget(4)
 @login_required
+@condition(etag_func=versions.advice_etag)
 @require_GET
 def advice_feed(request):
     """
@@ -120,37 +187,37 @@ def advice_feed(request):
     qs = AdviceCard.objects.filter(user=request.user)
     if unread_only:
         qs = qs.filter(read=False)
-    cards = []
-    for c in qs[:50]:
-        cards.append({
-            "id": c.id,
-            "title": c.title,
-            "body": c.body,
-            "tag": c.tag,
-            "created_at": c.created_at,
-            "read": c.read,
-            "meta": c.meta
-        })
-    return JsonResponse({"cards": cards})
+    cards = qs.values("id", "title", "body", "tag", "created_at", "read", "meta")[:50]
+    return FastJsonResponse({"cards": list(cards)})
 
 
 # --------- Goals endpoints (simple) ----------
+@gzip_page
+@query_budget(6)
 @login_required
+@versions.conditional(versions.etag_for(versions.GOALS))
 @require_http_methods(["GET","POST"])
 def goals_list_create(request):
+    """
+    GET: goals with progress + projected completion.
+    Optional query params:
+      - ordering=created|progress|-progress|eta|-eta
+      - min_progress=50 (percent)
+      - eta_before=YYYY-MM-DD
+    """
     if request.method == "GET":
-        qs = SavedGoal.objects.filter(user=request.user).order_by('-created_at')
-        data = []
-        for g in qs:
-            data.append({
-                "id": g.id,
-                "name": g.name,
-                "target_amount": g.target_amount,
-                "current_amount": g.current_amount,
-                "deadline": g.deadline,
-                "progress": round(g.progress(),2)
-            })
-        return JsonResponse({"goals": data})
+        ordering = goals.ORDERINGS.get(request.GET.get("ordering", "created"))
+        if ordering is None:
+            return HttpResponseBadRequest("invalid ordering")
+        qs = goals.with_progress(SavedGoal.objects.filter(user=request.user))
+        try:
+            if "min_progress" in request.GET:
+                qs = qs.filter(progress_pct__gte=float(request.GET["min_progress"]))
+            if "eta_before" in request.GET:
+                qs = qs.filter(projected_completion__lt=date.fromisoformat(request.GET["eta_before"]))
+        except ValueError:
+            return HttpResponseBadRequest("invalid filter value")
+        return FastJsonResponse({"goals": list(goals.goal_rows(qs.order_by(*ordering)))})
     else:  # POST create
         import json
         body = json.loads(request.body.decode() or "{}")
@@ -159,88 +226,236 @@ def goals_list_create(request):
         deadline = body.get("deadline")
         if not name or not target:
             return HttpResponseBadRequest("name and target_amount required")
-        g = SavedGoal.objects.create(user=request.user, name=name, target_amount=float(target),
-                                     deadline=deadline)
-        return JsonResponse({"id": g.id, "name": g.name})
+        try:
+            target = parse_amount(target)
+        except ValueError:
+            return HttpResponseBadRequest("invalid target_amount")
+        g = SavedGoal(user=request.user, name=name, target_amount=target, deadline=deadline)
+        goals.project_goals([g], goals.savings_rates([request.user.id])[request.user.id])
+        g.save()
+        return FastJsonResponse({"id": g.id, "name": g.name, "projected_completion": g.projected_completion})
 
 
+@query_budget(6)
 @login_required
+@versions.conditional(versions.etag_for(versions.GOALS))
 @require_http_methods(["GET","PUT","DELETE"])
 def goal_detail(request, pk):
     try:
-        g = SavedGoal.objects.get(id=pk, user=request.user)
+        g = goals.with_progress(SavedGoal.objects.all()).get(id=pk, user=request.user)
     except SavedGoal.DoesNotExist:
-        return JsonResponse({"error":"not found"}, status=404)
+        return FastJsonResponse({"error":"not found"}, status=404)
 
     if request.method == "GET":
-        return JsonResponse({
-            "id": g.id,
-            "name": g.name,
-            "target_amount": g.target_amount,
-            "current_amount": g.current_amount,
-            "deadline": g.deadline,
-            "progress": round(g.progress(), 2)
-        })
+        return FastJsonResponse(goals.goal_to_dict(g))
     elif request.method == "DELETE":
         g.delete()
-        return JsonResponse({"deleted": True})
+        return FastJsonResponse({"deleted": True})
     else:  # PUT update
         import json
         data = json.loads(request.body.decode() or "{}")
         g.name = data.get("name", g.name)
-        g.target_amount = float(data.get("target_amount", g.target_amount))
-        g.current_amount = float(data.get("current_amount", g.current_amount))
+        previous = to_cents(g.current_amount)
+        try:
+            g.target_amount = parse_amount(data.get("target_amount", g.target_amount))
+            g.current_amount = parse_amount(data.get("current_amount", g.current_amount))
+        except ValueError:
+            return HttpResponseBadRequest("invalid amount")
         g.deadline = data.get("deadline", g.deadline)
+        g.priority = int(data.get("priority", g.priority))
+        g.weight = float(data.get("weight", g.weight))
+        goals.project_goals([g], goals.savings_rates([request.user.id])[request.user.id])
         g.save()
-        return JsonResponse({"updated": True})
+        goals.record_contributions(request.user.id, {g.id: to_cents(g.current_amount) - previous})
+        return FastJsonResponse({"updated": True, "projected_completion": g.projected_completion})
+
+
+@query_budget(16)
+@login_required
+@require_http_methods(["POST"])
+def goals_bulk(request):
+    """
+    Apply several goal updates in one transaction. Body is either
+      {"contributions": [{"goal_id": 1, "delta": 50}, ...]}
+    or
+      {"allocate": {"amount": 500, "strategy": "priority"|"weight", "goal_ids": [...]}}
+    Returns the new progress of every affected goal.
+    """
+    import json
+    try:
+        body = json.loads(request.body.decode() or "{}")
+        unallocated = None
+        if "contributions" in body:
+            deltas = {}
+            for c in body["contributions"]:
+                gid = int(c["goal_id"])
+                deltas[gid] = deltas.get(gid, 0) + parse_amount(c["delta"])
+            updated = goals.apply_contributions(request.user, deltas)
+        elif "allocate" in body:
+            alloc = body["allocate"]
+            updated, unallocated = goals.allocate_to_goals(
+                request.user, parse_amount(alloc["amount"]), alloc.get("strategy", "priority"), alloc.get("goal_ids"))
+        else:
+            return HttpResponseBadRequest("contributions or allocate required")
+    except goals.GoalNotFound as e:
+        return FastJsonResponse({"error": "not found", "goal_ids": e.args[0]}, status=404)
+    except goals.GoalOverdrawn as e:
+        return FastJsonResponse({"error": "would go below zero", "goal_ids": e.args[0]}, status=400)
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest("invalid payload")
+    resp = {"goals": [goals.goal_to_dict(g) for g in updated]}
+    if unallocated is not None:
+        resp["unallocated"] = float(unallocated)
+    return FastJsonResponse(resp)
+
+
+# --------- Bulk provisioning (staff) ----------
+@login_required
+@require_http_methods(["POST"])
+def provision_users(request):
+    """
+    Create users with their coach settings and starter goals in one
+    transaction (coach/provisioning.py). Staff only; no query budget, as
+    queries grow with the number of batches. Passwords are hashed inline, so
+    a request takes at most COACH_PROVISION_MAX_USERS users; bigger imports
+    use `manage.py provision_users`. Body:
+      {"users": [{"username": ..., "email": ..., "password": ...}, ...],
+       "starter_goals": true, "skip_existing": false}
+    Returns {"created", "skipped", "users": {username: id}, "batches", "seconds"}.
+    """
+    import json
+    if not request.user.is_staff:
+        return FastJsonResponse({"error": "staff only"}, status=403)
+    try:
+        body = json.loads(request.body.decode() or "{}")
+        rows = body["users"]
+        if not isinstance(rows, list):
+            raise TypeError("users must be a list")
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest("invalid payload")
+    limit = provisioning.max_users()
+    if len(rows) > limit:
+        return HttpResponseBadRequest(f"at most {limit} users per request; use manage.py provision_users")
+    try:
+        report = provisioning.provision(rows, starter_goals=bool(body.get("starter_goals", True)),
+                                        skip_existing=bool(body.get("skip_existing", False)), workers=1)
+    except provisioning.ProvisioningError as e:
+        return FastJsonResponse({"error": "invalid rows",
+                                 "problems": [{"row": i, "error": msg} for i, msg in e.problems]}, status=400)
+    return FastJsonResponse(report, status=201)
+
+
+# --------- Period statements ----------
+@gzip_page
+@query_budget(8)
+@login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, versions.GOALS, daily=True))
+@require_GET
+def statements(request):
+    """
+    Monthly or weekly statements, oldest first; closed periods come from
+    frozen snapshots (coach/reports.py).
+    Optional query params:
+      - period=month|week
+      - count=12 (1..reports.MAX_PERIODS)
+    """
+    period = request.GET.get("period", reports.MONTH)
+    if period not in (reports.MONTH, reports.WEEK):
+        return HttpResponseBadRequest("period must be month or week")
+    try:
+        count = min(max(int(request.GET.get("count", 12)), 1), reports.MAX_PERIODS)
+    except ValueError:
+        return HttpResponseBadRequest("invalid count")
+    return FastJsonResponse({"period": period, "statements": reports.statement(request.user.id, period, count)})
+
+
+# --------- Time series ----------
+@gzip_page
+@query_budget(4)
+@login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, daily=True))
+@require_GET
+@throttle("history")
+def ledger_series(request):
+    """
+    Bucketed income / cash income / expenses / net over [from, to).
+    Optional query params:
+      - from=YYYY-MM-DD (default: 30 days before `to`; moved forward so the
+        range spans at most the COACH_PARAM_BOUNDS "days" bound)
+      - to=YYYY-MM-DD (exclusive, default: tomorrow)
+      - granularity=day|week|month
+    Returns parallel arrays, one slot per bucket (gaps are zero).
+    """
+    granularity = request.GET.get("granularity", series.DAY)
+    try:
+        end = date.fromisoformat(request.GET["to"]) if "to" in request.GET else date.today() + timedelta(days=1)
+        start = date.fromisoformat(request.GET["from"]) if "from" in request.GET else end - timedelta(days=30)
+        if start > end:
+            raise ValueError("from is after to")
+        start = bounded_span(start, end)
+        s = coalesce(request_key(request, "coach.views.ledger_series"),
+                     lambda: series.series(request.user.id, start, end, granularity), "coach.views.ledger_series")
+    except ValueError as e:
+        return HttpResponseBadRequest(f"invalid range: {e}")
+    return FastJsonResponse({
+        "granularity": granularity,
+        "from": start,
+        "to": end,
+        "buckets": s.buckets,
+        "income": [as_units(v) for v in s.income],
+        "cash_income": [as_units(v) for v in s.cash_income],
+        "expenses": [as_units(v) for v in s.expenses],
+        "net": [as_units(v) for v in series.net(s)],
+    })
 
 
 # --------- Emergency buffer calculator ----------
+@query_budget(4)
 @login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, daily=True))
 @require_GET
+@bad_parameter
 def emergency_buffer(request):
     """
     Calculates recommended emergency buffer = average monthly expense * months_buffer
     months_buffer is from settings or default 3.
     """
-    months = int(request.GET.get("months", 3))
+    months = bounded_int(request, "months", 3)
     # compute avg monthly expense from cash entries (expenses only)
     since = date.today() - timedelta(days=90)  # 3 months window
-    cash_qs = CashEntry.objects.filter(user=request.user, is_income=False, date__gte=since)
-    total_expenses_90 = float(cash_qs.aggregate(Sum('amount'))['amount__sum'] or 0)
+    total_expenses_90 = sum(series.series(request.user.id, since, date.today() + timedelta(days=1),
+                                          series.MONTH).expenses)
     avg_monthly = (total_expenses_90 / 3.0) if total_expenses_90 else 0
     recommended = avg_monthly * months
-    return JsonResponse({
-        "avg_monthly_expense": round(avg_monthly,2),
+    return FastJsonResponse({
+        "avg_monthly_expense": as_units(avg_monthly),
         "months": months,
-        "recommended_buffer": round(recommended,2)
+        "recommended_buffer": as_units(recommended)
     })
 
 
 # --------- Weekly earnings heatmap ----------
+@query_budget(5)
 @login_required
+@condition(etag_func=versions.etag_for(versions.LEDGER, daily=True))
 @require_GET
+@bad_parameter
+@throttle("history")
 def weekly_heatmap(request):
     """
     Returns earnings aggregated by weekday for last N weeks.
     Output format:
       {"weekdays": {"Mon": total, ...}, "raw": [{date: total}, ...]}
     """
-    weeks = int(request.GET.get("weeks", 4))
+    weeks = bounded_int(request, "weeks", 4)
     since = date.today() - timedelta(weeks=weeks)
-    daily = get_daily_income(request.user)
-    # filter by date >= since
-    filtered = {d: amt for d, amt in daily.items() if (d if isinstance(d, date) else date.fromisoformat(str(d))) >= since}
-    # weekday aggregation 0-Mon .. 6-Sun
-    weekday_totals = {0:0,1:0,2:0,3:0,4:0,5:0,6:0}
-    raw = []
-    for d, amt in filtered.items():
-        dobj = d if isinstance(d, date) else date.fromisoformat(str(d))
-        weekday_totals[dobj.weekday()] += amt
-        raw.append({"date": str(dobj), "amount": amt})
-    # map to names
+    daily = coalesce(request_key(request, "coach.views.weekly_heatmap"),
+                     lambda: series.series(request.user.id, since, date.today() + timedelta(days=1), series.DAY),
+                     "coach.views.weekly_heatmap")
+    # weekday aggregation 0-Mon .. 6-Sun; raw lists the days that had earnings
+    raw = [{"date": str(d), "amount": as_units(amt)} for d, amt in zip(daily.buckets, series.earnings(daily)) if amt]
     names = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-    return JsonResponse({
-        "weekdays": {names[k]: round(v,2) for k,v in weekday_totals.items()},
+    return FastJsonResponse({
+        "weekdays": {names[k]: as_units(v) for k,v in series.weekday_totals(daily).items()},
         "raw": raw
     })
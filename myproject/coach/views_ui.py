@@ -2,12 +2,16 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .group_a_client import get_daily_income, fallback_mock_data
+from .group_a_client import fallback_mock_data
 from .models import SavedGoal, AdviceCard, CoachingSettings
-from accounts.models import Income, CashEntry
-from django.db.models import Sum
+from . import goals as goal_engine
+from . import ledger, series
+from .metrics import query_budget
+from .throttle import bad_parameter, bounded_int, throttle
+from accounts.fields import as_units, parse_amount, to_cents
 from datetime import date, timedelta
 
+@query_budget(10)
 @login_required
 def dashboard_page(request):
     """
@@ -18,38 +22,35 @@ def dashboard_page(request):
     - recent incomes/cash (optional)
     """
     # Expense analysis (30 days)
+    # both sections slice the cached columnar ledger (coach/ledger.py)
+    snapshot = ledger.snapshot_for(request.user.id)
     since = date.today() - timedelta(days=30)
-    incomes_qs = Income.objects.filter(user=request.user, date__gte=since)
-    cash_qs = CashEntry.objects.filter(user=request.user, date__gte=since)
-
-    total_income = float(incomes_qs.aggregate(Sum('amount'))['amount__sum'] or 0)
-    total_cash_income = float(cash_qs.filter(is_income=True).aggregate(Sum('amount'))['amount__sum'] or 0)
-    total_expenses = float(cash_qs.filter(is_income=False).aggregate(Sum('amount'))['amount__sum'] or 0)
+    total_income, total_cash_income, total_expenses = snapshot.totals(since)
     net_income = total_income + total_cash_income
     expense_ratio = (total_expenses / net_income) if net_income > 0 else None
 
     # low income check using CoachingSettings + daily incomes
-    daily = get_daily_income(request.user)
+    daily = snapshot.daily_earnings()
     used_fallback = False
     if not daily:
-        daily = fallback_mock_data()
+        daily = {d: to_cents(v) for d, v in fallback_mock_data().items()}
         used_fallback = True
 
     totals = sorted(daily.items(), key=lambda x: x[0])
     totals_only = [v for (_, v) in totals]
     last_three = totals_only[-3:] if len(totals_only) >= 3 else totals_only
     avg_recent = sum(last_three) / len(last_three) if last_three else 0
-    settings_obj, _ = CoachingSettings.objects.get_or_create(user=request.user)
-    low_status = "LOW" if avg_recent < settings_obj.low_income_threshold else "OK"
+    settings_obj = CoachingSettings.for_user(request.user.id)
+    low_status = "LOW" if avg_recent < to_cents(settings_obj.low_income_threshold) else "OK"
 
     # recent advice preview (3)
     recent_advice = AdviceCard.objects.filter(user=request.user).order_by('-created_at')[:3]
 
     context = {
-        "total_income": round(net_income,2),
-        "total_expenses": round(total_expenses,2),
+        "total_income": as_units(net_income),
+        "total_expenses": as_units(total_expenses),
         "expense_ratio": round(expense_ratio,2) if expense_ratio is not None else None,
-        "avg_recent": round(avg_recent,2),
+        "avg_recent": as_units(avg_recent),
         "low_status": low_status,
         "recent_advice": recent_advice,
         "used_fallback": used_fallback,
@@ -57,6 +58,7 @@ def dashboard_page(request):
     return render(request, "coach/dashboard.html", context)
 
 
+@query_budget(4)
 @login_required
 def advice_page(request):
     """
@@ -92,27 +94,24 @@ def mark_advice_read(request):
     return redirect("coach:advice_ui")
 
 
+@query_budget(5)
 @login_required
+@bad_parameter
+@throttle("history")
 def heatmap_page(request):
     """
     Uses the same logic as weekly_heatmap API. Renders a simple heatmap table.
     """
-    weeks = int(request.GET.get("weeks", 4))
+    weeks = bounded_int(request, "weeks", 4)
     since = date.today() - timedelta(weeks=weeks)
-    daily = get_daily_income(request.user)
-    # filter and convert keys to date objects
-    filtered = { (d if isinstance(d, date) else date.fromisoformat(str(d))): amt
-                 for d, amt in daily.items() if (d if isinstance(d, date) else date.fromisoformat(str(d))) >= since }
-    weekday_totals = {0:0,1:0,2:0,3:0,4:0,5:0,6:0}
-    raw = []
-    for d, amt in filtered.items():
-        weekday_totals[d.weekday()] += amt
-        raw.append({"date": str(d), "amount": amt})
+    daily = series.series(request.user.id, since, date.today() + timedelta(days=1), series.DAY)
+    raw = [{"date": str(d), "amount": as_units(amt)} for d, amt in zip(daily.buckets, series.earnings(daily)) if amt]
     names = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-    weekdays = {names[k]: round(v,2) for k,v in weekday_totals.items()}
+    weekdays = {names[k]: as_units(v) for k,v in series.weekday_totals(daily).items()}
     return render(request, "coach/heatmap.html", {"weekdays": weekdays, "raw": raw})
 
 
+@query_budget(8)
 @login_required
 def goals_page(request):
     """
@@ -127,15 +126,18 @@ def goals_page(request):
             messages.error(request, "Please provide a name and target amount.")
         else:
             try:
-                g = SavedGoal.objects.create(
+                g = SavedGoal(
                     user=request.user,
                     name=name,
-                    target_amount=float(target),
+                    target_amount=parse_amount(target),
                     deadline=deadline
                 )
+                goal_engine.project_goals([g], goal_engine.savings_rates([request.user.id])[request.user.id])
+                g.save()
                 messages.success(request, f"Goal '{g.name}' created.")
                 return redirect("coach:goals_ui")
             except Exception as e:
                 messages.error(request, f"Error creating goal: {e}")
-    goals = SavedGoal.objects.filter(user=request.user).order_by('-created_at')
+    ordering = goal_engine.ORDERINGS.get(request.GET.get("ordering", "created"), goal_engine.ORDERINGS["created"])
+    goals = goal_engine.with_progress(SavedGoal.objects.filter(user=request.user)).order_by(*ordering)
     return render(request, "coach/goals.html", {"goals": goals})
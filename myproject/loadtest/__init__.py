@@ -0,0 +1,12 @@
+# loadtest/__init__.py
+"""
+Self-contained HTTP load-test harness for the coach and accounts endpoints.
+
+Stdlib only (asyncio streams, no Django import) so it can run from any machine:
+
+    python manage.py generate_load_data --users 200      # synthetic users load0..load199
+    python -m loadtest --base-url http://127.0.0.1:8000 --users 200 --concurrency 1,16,64
+
+or let it start a local server itself with --start-server. Reports throughput,
+p50/p95/p99 latency and error rate per endpoint for each concurrency level.
+"""
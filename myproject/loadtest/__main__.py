@@ -0,0 +1,55 @@
+# loadtest/__main__.py
+import argparse
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from . import runner
+
+
+def print_report(report):
+    for level, result in report["levels"].items():
+        print(f"\n== concurrency {level}: {result['requests']} requests, {result['rps']} req/s, "
+              f"errors {result['error_rate']:.2%}")
+        print(f"{'endpoint':20} {'req':>7} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'err':>7}")
+        for name, r in result["endpoints"].items():
+            print(f"{name:20} {r['requests']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['error_rate']:>7.2%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="HTTP load test for the coach and accounts endpoints")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=50, help="synthetic users to log in")
+    parser.add_argument("--user-prefix", default="load", help="usernames are <prefix><n> (see generate_load_data)")
+    parser.add_argument("--password", default="load-pass")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each level")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the request mix")
+    parser.add_argument("--start-server", action="store_true", help="start manage.py runserver on --base-url")
+    parser.add_argument("--server-cmd", help="custom server command used with --start-server")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    credentials = [(f"{args.user_prefix}{i}", args.password) for i in range(args.users)]
+    server = None
+    if args.start_server:
+        parts = urlsplit(args.base_url)
+        server = runner.start_server(parts.hostname, parts.port or 80, args.server_cmd)
+    try:
+        report = asyncio.run(runner.run(args.base_url, credentials, levels, args.duration, args.warmup,
+                                        seed=args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
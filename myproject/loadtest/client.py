@@ -0,0 +1,121 @@
+# loadtest/client.py
+"""Minimal asyncio HTTP/1.1 client: keep-alive, chunked bodies and a cookie jar."""
+import asyncio
+import socket
+from urllib.parse import urlencode, urlsplit
+
+
+class Response:
+    __slots__ = ("status", "headers", "cookies", "body")
+
+    def __init__(self, status, headers, cookies, body):
+        self.status = status
+        self.headers = headers
+        self.cookies = cookies
+        self.body = body
+
+
+class Session:
+    """One keep-alive connection plus cookies; roughly what a browser tab does."""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.headers = {}
+        self._reader = self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(self, method, path, form=None, json_body=None, headers=None):
+        body = b""
+        extra = dict(self.headers)
+        if form is not None:
+            body = urlencode(form).encode()
+            extra["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json_body.encode() if isinstance(json_body, str) else json_body
+            extra["Content-Type"] = "application/json"
+        if method != "GET" and "csrftoken" in self.cookies:
+            extra["X-CSRFToken"] = self.cookies["csrftoken"]
+        extra.update(headers or {})
+
+        # a kept-alive connection may have been closed by the server: retry once on a fresh one
+        reused = self._writer is not None
+        try:
+            return await asyncio.wait_for(self._roundtrip(method, path, body, extra), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            return await asyncio.wait_for(self._roundtrip(method, path, body, extra), self.timeout)
+
+    def _quickack(self):
+        # servers that write headers and body separately (wsgiref/runserver) otherwise stall
+        # ~40ms per response on Nagle vs. delayed-ACK; Linux only
+        sock = self._writer.get_extra_info("socket") if self._writer else None
+        if sock is not None and hasattr(socket, "TCP_QUICKACK"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    async def _roundtrip(self, method, path, body, extra):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            sock = self._writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        lines += [f"{k}: {v}" for k, v in extra.items()]
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self._writer.drain()
+        self._quickack()
+
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        version, status = status_line.split(b" ", 2)[:2]
+        headers, cookies = {}, {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                self._quickack()
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                key, _, rest = value.partition("=")
+                cookies[key] = rest.split(";", 1)[0]
+            headers[name] = value
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            payload = b"".join(chunks)
+        elif "content-length" in headers:
+            payload = await reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await reader.read()
+            headers["connection"] = "close"
+
+        self.cookies.update(cookies)
+        if headers.get("connection", "").lower() == "close" or version == b"HTTP/1.0":
+            await self.close()
+        return Response(int(status), headers, cookies, payload)
@@ -0,0 +1,163 @@
+# loadtest/runner.py
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .client import Session
+from .scenario import LOGIN_PATH, LoginFailed, Mix, login_session
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def response_ok(method, res):
+    """
+    2xx is a success. A redirect is a failure (for a GET it usually means an
+    expired session bounced to the login page), except the redirect that
+    follows a successful form POST -- unless that one goes to the login page too.
+    """
+    if res.status < 300:
+        return True
+    if res.status in (302, 303) and method == "POST":
+        return urlsplit(res.headers.get("location", "")).path != LOGIN_PATH
+    return False
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    def add(self, name, seconds, ok):
+        if not self.recording:
+            return
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        total = errors = 0
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            n, e = len(values), self.errors.get(name, 0)
+            total += n
+            errors += e
+            endpoints[name] = {
+                "requests": n,
+                "rps": round(n / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "error_rate": round(e / n, 4),
+            }
+        return {"requests": total, "rps": round(total / elapsed, 2),
+                "error_rate": round(errors / total, 4) if total else 0.0, "endpoints": endpoints}
+
+
+async def _login_all(base_url, credentials, parallel=16):
+    sessions = []
+    sem = asyncio.Semaphore(parallel)
+
+    async def one(username, password):
+        async with sem:
+            s = Session(base_url)
+            await login_session(s, username, password)
+            sessions.append(s)
+
+    results = await asyncio.gather(*(one(u, p) for u, p in credentials), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    return sessions, failures
+
+
+async def _worker(session, mix, recorder, deadline):
+    while time.monotonic() < deadline:
+        name, method, path, body, _ = mix.pick()
+        start = time.perf_counter()
+        try:
+            res = await session.request(method, path, form=body(mix.rng) if body else None)
+            ok = response_ok(method, res)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            ok = False
+            await session.close()
+        recorder.add(name, time.perf_counter() - start, ok)
+
+
+async def run_level(sessions, concurrency, duration, warmup, seed=None):
+    """Replay the mix with `concurrency` virtual users (sessions are reused round-robin)."""
+    recorder = Recorder()
+    mix = Mix(seed=seed)
+    workers = [sessions[i % len(sessions)] for i in range(concurrency)]
+    # sessions shared by several workers would interleave on one socket: give extras a fresh connection
+    seen, clones = set(), []
+    for i, s in enumerate(workers):
+        if id(s) in seen:
+            clone = Session(f"http://{s.host}:{s.port}", s.timeout)
+            clone.cookies, clone.headers = dict(s.cookies), dict(s.headers)
+            workers[i] = clone
+            clones.append(clone)
+        seen.add(id(s))
+
+    start = time.monotonic()
+    deadline = start + warmup + duration
+
+    async def begin_recording():
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+
+    timer = asyncio.create_task(begin_recording())
+    await asyncio.gather(*(_worker(s, mix, recorder, deadline) for s in workers))
+    await timer
+    for c in clones:
+        await c.close()
+    return recorder.summary(duration)
+
+
+async def run(base_url, credentials, levels, duration, warmup, seed=None, log=print):
+    sessions, failures = await _login_all(base_url, credentials)
+    for f in failures[:5]:
+        log(f"login failed: {f}")
+    if not sessions:
+        raise LoginFailed("no user could log in")
+    log(f"{len(sessions)} users logged in ({len(failures)} failed)")
+    report = {"base_url": base_url, "users": len(sessions), "duration": duration, "levels": {}}
+    try:
+        for level in levels:
+            log(f"concurrency {level}: {warmup}s warmup + {duration}s measured")
+            report["levels"][level] = await run_level(sessions, level, duration, warmup, seed)
+    finally:
+        for s in sessions:
+            await s.close()
+    return report
+
+
+def start_server(host, port, command=None):
+    """Start `manage.py runserver` (or a custom command) and wait until it answers /coach/health/."""
+    import urllib.request
+
+    cmd = command.split() if command else [sys.executable, "manage.py", "runserver", "--noreload", f"{host}:{port}"]
+    proc = subprocess.Popen(cmd, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            env=dict(os.environ))
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://{host}:{port}/coach/health/", timeout=1)
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not come up within 20s")
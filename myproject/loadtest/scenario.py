@@ -0,0 +1,60 @@
+# loadtest/scenario.py
+"""Login flows and the weighted request mix replayed by each virtual user."""
+import random
+from datetime import date
+
+
+class LoginFailed(Exception):
+    pass
+
+
+LOGIN_PATH = "/login/"
+
+
+async def login_session(session, username, password):
+    """
+    Django session login: GET the form for the CSRF cookie, then POST
+    credentials. The coach views are session-based (@login_required), so this
+    is the only login flow.
+    """
+    await session.request("GET", LOGIN_PATH)
+    res = await session.request("POST", LOGIN_PATH, form={
+        "username": username, "password": password,
+        "csrfmiddlewaretoken": session.cookies.get("csrftoken", ""),
+    })
+    if res.status != 302 or "sessionid" not in session.cookies:
+        raise LoginFailed(f"{username}: login returned {res.status}")
+
+
+def _cash_entry(rng):
+    return {"description": rng.choice(["coffee", "groceries", "transport"]),
+            "amount": f"{rng.uniform(2, 80):.2f}", "date": date.today().isoformat(), "is_income": ""}
+
+
+# (name, method, path, body builder or None, weight)
+DEFAULT_MIX = [
+    ("advice", "GET", "/coach/advice/", None, 25),
+    ("low_income_alert", "GET", "/coach/low-income-alert/", None, 15),
+    ("goals", "GET", "/coach/goals/", None, 10),
+    ("expense_analysis", "GET", "/coach/expense-analysis/", None, 10),
+    ("heatmap", "GET", "/coach/heatmap/", None, 4),
+    ("buffer", "GET", "/coach/buffer/", None, 4),
+    ("ui_dashboard", "GET", "/coach/ui/dashboard/", None, 10),
+    ("ui_advice", "GET", "/coach/ui/advice/", None, 4),
+    ("dashboard", "GET", "/dashboard/", None, 10),
+    ("cash_add", "POST", "/cash/add/", _cash_entry, 5),
+    ("variability", "GET", "/income/variability/", None, 3),
+]
+
+
+class Mix:
+    def __init__(self, entries=DEFAULT_MIX, seed=None):
+        self.entries = entries
+        self.weights = [e[-1] for e in entries]
+        self.rng = random.Random(seed)
+
+    def pick(self):
+        return self.rng.choices(self.entries, self.weights)[0]
+
+    def names(self):
+        return [e[0] for e in self.entries]
@@ -46,13 +46,17 @@ INSTALLED_APPS = [
 
 INSTALLED_APPS += ["django_crontab"]
 
-# run run_coach_agent every hour
+# the periodic jobs run in the resident `manage.py coach_scheduler` process
+# (coach/scheduler.py); cron is only a fallback for hosts that can't keep it running
 CRONJOBS = [
-    ('0 * * * *', 'django.core.management.call_command', ['run_coach_agent']),
+    # ('0 * * * *', 'django.core.management.call_command', ['run_coach_agent']),
 ]
+# cron jobs start with the trimmed app list (no admin/DRF/static files)
+CRONTAB_DJANGO_SETTINGS_MODULE = 'myproject.settings_agent'
 
 
 MIDDLEWARE = [
+    'coach.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -151,9 +155,74 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
+        # default is 300; entries are per user (ledger snapshot, settings, category overrides).
+        # LocMem is per process: coach_scheduler clears it after every job, and web workers
+        # see each other's settings saves only after COACH_SETTINGS_CACHE_SECONDS. Use a
+        # shared backend (Redis, Memcached) with more than one process.
+        "OPTIONS": {"MAX_ENTRIES": 20000},
     }
 }
 
+# CoachingSettings read-through cache (coach/models.py settings_for); a save
+# only clears the entry in its own process, so keep this short unless the
+# cache backend is shared
+COACH_SETTINGS_CACHE_SECONDS = 60
+
+# per-view query budgets (dotted view path -> max queries) on top of the
+# @query_budget declarations; strict mode raises instead of logging a warning
+COACH_QUERY_BUDGETS = {}
+COACH_QUERY_BUDGET_STRICT = False
+# bearer token for scraping /coach/metrics/ (staff sessions always get in);
+# None: staff only
+COACH_METRICS_TOKEN = None
+
+# advice card retention (coach/retention.py, `manage.py prune_advice`)
+COACH_ADVICE_RETENTION = {
+    "keep_last": 50,     # newest N cards per user always stay hot
+    "keep_days": 30,     # ...as does anything younger than D days
+    "mode": "archive",   # archive | summarize | delete
+    "batch_size": 500,   # rows per delete transaction
+}
+
+# near-real-time advice: ledger writes enqueue a per-user evaluation that
+# `manage.py drain_advice_queue` runs once writes settle (coach/queue.py)
+COACH_EVAL_DEBOUNCE_SECONDS = 30
+COACH_EVAL_MAX_WAIT_SECONDS = 300
+
+# advice push stream (coach/stream.py, GET /coach/stream/, needs an ASGI server)
+COACH_STREAM_HEARTBEAT_SECONDS = 15   # keepalive comment interval per connection
+COACH_STREAM_POLL_SECONDS = 2         # per-process DB poll for cards written elsewhere
+
+# optional memory-mapped per-user aggregate store shared by agent workers
+# (coach/aggstore.py, `manage.py aggregate_store`); None keeps the ORM/cache path
+COACH_AGGREGATE_STORE = None  # e.g. BASE_DIR / 'aggregates.bin'
+
+# history endpoints (coach/throttle.py): window params are clamped to these
+# (min, max) bounds, and each user gets a token bucket per scope (burst of
+# `capacity` computed responses, refilled at `per_second`); None disables a scope.
+# The buckets live in the default cache: per worker process unless it is shared
+COACH_PARAM_BOUNDS = {"days": (1, 730), "weeks": (1, 104), "months": (1, 24)}
+COACH_RATE_LIMITS = {
+    "history": {"capacity": 20, "per_second": 0.5},
+}
+
+# resident job scheduler (coach/scheduler.py, `manage.py coach_scheduler`):
+# intervals/jitter in seconds per job, merged over coach.scheduler.DEFAULTS;
+# an interval of None disables a job
+COACH_SCHEDULER = {
+    "tick_seconds": 5,
+    "lease_seconds": 300,  # one active scheduler; must outlast the slowest job
+    "jobs": {
+        "agent": {"interval": 600, "jitter": 60},
+    },
+}
+
+# bulk user provisioning (coach/provisioning.py, POST /coach/provision/,
+# `manage.py provision_users`); the command hashes passwords in a process
+# pool, the API hashes inline in the web worker
+COACH_PROVISION_MAX_USERS = 200  # per API request
+COACH_PROVISION_WORKERS = None   # provision_users processes; None: one per CPU core
+
 # CELERY_BROKER_URL = 'redis://localhost:6379/0'
 # CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'
 # CELERY_BEAT_SCHEDULE = {
@@ -171,7 +240,9 @@ LOGGING = {
     },
     'handlers': {
         'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
-        'file': {'class': 'logging.FileHandler', 'filename': BASE_DIR / 'logs' / 'app.log', 'formatter': 'simple'},
+        # delay: the file is only opened on the first record, not at startup
+        'file': {'class': 'logging.FileHandler', 'filename': BASE_DIR / 'logs' / 'app.log', 'formatter': 'simple',
+                 'delay': True},
     },
     'loggers': {
         '': {'handlers': ['console','file'], 'level': 'INFO'},
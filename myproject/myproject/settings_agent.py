@@ -0,0 +1,24 @@
+"""
+Settings for batch processes: the cron-launched agent, queue worker and
+maintenance commands.
+
+Same configuration as myproject.settings, minus the apps only the web site
+needs (admin, messages, static files, DRF). Each process then starts with a
+smaller app registry and fewer imports. Use it with
+
+    DJANGO_SETTINGS_MODULE=myproject.settings_agent python manage.py run_coach_agent
+
+(cron jobs get it through CRONTAB_DJANGO_SETTINGS_MODULE).
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'accounts',
+    'coach',
+    'django_crontab',  # `manage.py crontab run` is how cron enters
+]
+
+MIDDLEWARE = []
+ROOT_URLCONF = 'myproject.urls_agent'
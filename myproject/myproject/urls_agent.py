@@ -0,0 +1,7 @@
+"""
+URL configuration for batch processes (myproject.settings_agent).
+
+They serve no requests, so nothing is routed; this keeps the admin and the
+web views out of `manage.py check` in those processes.
+"""
+urlpatterns = []